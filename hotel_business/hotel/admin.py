@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import RolePermission, SeasonalRate, WeekdayRate
+
+
+@admin.register(SeasonalRate)
+class SeasonalRateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'categoryid', 'startdate', 'enddate', 'multiplier')
+    list_filter = ('categoryid',)
+
+
+@admin.register(WeekdayRate)
+class WeekdayRateAdmin(admin.ModelAdmin):
+    list_display = ('weekday', 'categoryid', 'multiplier')
+    list_filter = ('categoryid',)
+
+
+@admin.register(RolePermission)
+class RolePermissionAdmin(admin.ModelAdmin):
+    list_display = ('url_name', 'role')
+    list_filter = ('role',)
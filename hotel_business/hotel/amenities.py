@@ -0,0 +1,147 @@
+# amenities.py
+"""
+Индекс оснащения номеров.
+
+Equipment связывает категории и предметы многие-ко-многим. Чтобы не
+соединять таблицы на каждый запрос, в Category.amenities хранится
+отсортированный список id предметов категории. Сигналы Equipment
+пересчитывают его для затронутых категорий и после фиксации транзакции
+увеличивают версию пространства кеша amenities.
+
+Карта «категория -> предметы» держится в памяти процесса и перечитывается,
+когда версия в кеше изменилась, и не реже раза в AMENITY_MAP_TIMEOUT (после
+очистки кеша счетчик версий начинается заново). Версию видят все процессы
+только при общем кеше (REDIS_URL): с кешем в памяти процесса изменение
+оснащения сбрасывает карту лишь в сохранившем его воркере, поэтому без
+общего кеша этот срок в settings.py короткий. Фильтр
+«есть холодильник и телевизор» сводится к списку подходящих категорий и
+одному условию categoryid IN (...) по индексу внешнего ключа номера.
+"""
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from . import caching
+from .models import Category, Equipment, Item
+
+NAMESPACE = 'amenities'
+
+
+class AmenityMap:
+    """Снимок оснащения: {категория: frozenset(id предметов)} и {id предмета: название}"""
+
+    def __init__(self, categories, items):
+        self.categories = categories
+        self.items = items
+
+    def categories_with(self, item_ids):
+        """Категории, в которых есть все предметы item_ids"""
+        required = set(item_ids)
+        return [category_id for category_id, owned in self.categories.items() if required <= owned]
+
+    def names(self, category_id):
+        """Названия предметов категории по алфавиту"""
+        owned = self.categories.get(category_id, ())
+        return [name for item_id, name in self.items.items() if item_id in owned]
+
+    def filter_rooms(self, rooms, item_ids):
+        """Номера, категории которых оснащены всеми предметами item_ids"""
+        if not item_ids:
+            return rooms
+        return rooms.filter(categoryid__in=self.categories_with(item_ids))
+
+    def annotate(self, rooms):
+        """Добавляет загруженным номерам список amenity_names"""
+        for room in rooms:
+            room.amenity_names = self.names(room.categoryid_id)
+        return rooms
+
+
+def _load():
+    categories = {
+        category_id: frozenset(item_ids or ())
+        for category_id, item_ids in Category.objects.values_list('pk', 'amenities')
+    }
+    items = dict(Item.objects.order_by('name', 'pk').values_list('pk', 'name'))
+    return AmenityMap(categories, items)
+
+
+# (версия пространства amenities, время загрузки, AmenityMap) в этом процессе
+_loaded = (None, 0.0, None)
+
+
+def map_timeout():
+    return getattr(settings, 'AMENITY_MAP_TIMEOUT', caching.default_timeout())
+
+
+def _fresh(current):
+    version, loaded_at, amenity_map = _loaded
+    if version == current and time.monotonic() - loaded_at < map_timeout():
+        return amenity_map
+    return None
+
+
+def get_map():
+    """Карта оснащения из памяти процесса; перечитывается при смене версии"""
+    global _loaded
+    current = caching.version(NAMESPACE)
+    amenity_map = _fresh(current)
+    if amenity_map is None:
+        amenity_map = _load()
+        _loaded = (current, time.monotonic(), amenity_map)
+    return amenity_map
+
+
+async def aget_map():
+    global _loaded
+    current = await caching.aversion(NAMESPACE)
+    amenity_map = _fresh(current)
+    if amenity_map is None:
+        amenity_map = await sync_to_async(_load)()
+        _loaded = (current, time.monotonic(), amenity_map)
+    return amenity_map
+
+
+def invalidate():
+    """Новая версия карты после фиксации текущей транзакции"""
+    transaction.on_commit(lambda: caching.bump(NAMESPACE))
+
+
+def rebuild(category_ids=None):
+    """
+    Пересчитывает Category.amenities по Equipment (по умолчанию для всех
+    категорий). Возвращает число измененных категорий.
+    """
+    items = defaultdict(list)
+    equipment = Equipment.objects.order_by('itemid_id')
+    categories = Category.objects.only('pk', 'amenities')
+    if category_ids is not None:
+        equipment = equipment.filter(categoryid__in=category_ids)
+        categories = categories.filter(pk__in=category_ids)
+    for category_id, item_id in equipment.values_list('categoryid_id', 'itemid_id'):
+        items[category_id].append(item_id)
+
+    changed = []
+    for category in categories:
+        amenities = items.get(category.pk, [])
+        if category.amenities != amenities:
+            category.amenities = amenities
+            changed.append(category)
+    if changed:
+        Category.objects.bulk_update(changed, ['amenities'], batch_size=500)
+        invalidate()
+    return len(changed)
+
+
+def parse_ids(values):
+    """id предметов из списка GET-параметров (некорректные пропускаются)"""
+    result = []
+    for value in values:
+        try:
+            result.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return result
@@ -0,0 +1,124 @@
+# assignment.py
+"""
+Массовое назначение услуг.
+
+Все строки пакета проверяются одним in_bulk на модель и записываются одним
+bulk_create в транзакции. Ошибочные строки не прерывают пакет: они
+возвращаются списком с номером строки и причиной.
+"""
+import datetime
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from . import reporting
+from .models import Reservation, Service, ServiceProvision
+
+# Те же границы, что у поля количества в форме назначения (min="1" max="10")
+MIN_QUANTITY = 1
+MAX_QUANTITY = 10
+
+
+class RowError:
+    """Ошибка в строке пакета (index - номер строки с нуля)"""
+
+    def __init__(self, index, message):
+        self.index = index
+        self.message = message
+
+    def as_dict(self):
+        return {'row': self.index, 'error': self.message}
+
+    def __str__(self):
+        return f'Строка {self.index + 1}: {self.message}'
+
+
+def rows_for_reservations(reservation_ids, service_id, quantity, date):
+    """Строки «эта услуга для каждой брони из набора»"""
+    return [
+        {'reservation': reservation_id, 'service': service_id, 'quantity': quantity, 'date': date}
+        for reservation_id in reservation_ids
+    ]
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(value):
+    if isinstance(value, datetime.date):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def assign_services(rows):
+    """
+    Создает ServiceProvision для строк вида
+    {'reservation': id, 'service': id, 'quantity': n, 'date': 'ГГГГ-ММ-ДД'}.
+    Возвращает (созданные записи, список RowError).
+    """
+    rows = list(rows)
+    reservation_ids = {_int(row.get('reservation')) for row in rows} - {None}
+    service_ids = {_int(row.get('service')) for row in rows} - {None}
+
+    reservations = Reservation.objects.filter(status='active').only('id', 'arrivaldate', 'departuredate') \
+        .in_bulk(reservation_ids)
+    services = Service.objects.filter(is_active=True).only('id').in_bulk(service_ids)
+
+    provisions = []
+    errors = []
+    for index, row in enumerate(rows):
+        reservation = reservations.get(_int(row.get('reservation')))
+        service = services.get(_int(row.get('service')))
+        quantity = _int(row.get('quantity', MIN_QUANTITY))
+        date = _date(row.get('date'))
+
+        if reservation is None:
+            errors.append(RowError(index, 'активное бронирование не найдено'))
+        elif service is None:
+            errors.append(RowError(index, 'услуга не найдена или недоступна'))
+        elif quantity is None or not MIN_QUANTITY <= quantity <= MAX_QUANTITY:
+            errors.append(RowError(index, f'количество должно быть от {MIN_QUANTITY} до {MAX_QUANTITY}'))
+        elif date is None:
+            errors.append(RowError(index, 'неверная дата оказания услуги'))
+        elif not reservation.arrivaldate <= date <= reservation.departuredate:
+            errors.append(RowError(index, 'дата оказания вне периода проживания'))
+        else:
+            provisions.append(ServiceProvision(
+                reservationid=reservation,
+                serviceid=service,
+                quantity=quantity,
+                dateofserviceprovision=date,
+            ))
+
+    with transaction.atomic():
+        created = ServiceProvision.objects.bulk_create(provisions)
+        # bulk_create не отправляет post_save - дни для сводок отмечаются явно
+        reporting.mark_dirty(provision.dateofserviceprovision for provision in created)
+    return created, errors
+
+
+def parse_rows(text):
+    """
+    Строки из текстового поля, по одной на строку:
+    бронь;услуга;количество;дата. Пустые строки пропускаются.
+    """
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        parts = [part.strip() for part in line.replace(',', ';').split(';')]
+        parts += [None] * (4 - len(parts))
+        reservation, service, quantity, date = parts[:4]
+        rows.append({'reservation': reservation, 'service': service, 'quantity': quantity or MIN_QUANTITY,
+                     'date': date})
+    return rows
@@ -0,0 +1,58 @@
+# availability.py
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Number, Reservation
+
+
+class AvailabilityService:
+    """Поиск свободных номеров на интервал дат [arrival, departure)"""
+
+    # Статус брони, при котором номер занят (совпадает с условием частичного индекса)
+    BLOCKING_STATUS = 'active'
+
+    def __init__(self, arrival, departure):
+        if departure <= arrival:
+            raise ValueError('Дата выезда должна быть позже даты заезда.')
+        self.arrival = arrival
+        self.departure = departure
+
+    @classmethod
+    def for_night(cls, date=None):
+        """Интервал в одну ночь, по умолчанию - сегодняшнюю"""
+        date = date or timezone.now().date()
+        return cls(date, date + timedelta(days=1))
+
+    def overlapping_reservations(self):
+        """Брони, пересекающиеся с интервалом (использует индекс reservation_active_dates_idx)"""
+        return Reservation.objects.filter(
+            status=self.BLOCKING_STATUS,
+            arrivaldate__lt=self.departure,
+            departuredate__gt=self.arrival,
+        )
+
+    def annotate_rooms(self, rooms=None):
+        """Добавляет номерам признак is_occupied на интервале"""
+        if rooms is None:
+            rooms = Number.objects.all()
+        occupied = self.overlapping_reservations().filter(numberid=OuterRef('pk'))
+        return rooms.annotate(is_occupied=Exists(occupied))
+
+    def free_rooms(self, category=None, bedcount=None, rooms=None):
+        """Свободные номера одним запросом (anti-join по пересекающимся броням)"""
+        if rooms is None:
+            rooms = Number.objects.all()
+        rooms = rooms.filter(is_available=True)
+        if category:
+            rooms = rooms.filter(categoryid=category)
+        if bedcount:
+            rooms = rooms.filter(bedcount=bedcount)
+        occupied = self.overlapping_reservations().filter(numberid=OuterRef('pk'))
+        return rooms.filter(~Exists(occupied))
+
+    def is_free(self, number):
+        """Проверяет, свободен ли конкретный номер на интервале"""
+        number_id = getattr(number, 'pk', number)
+        return not self.overlapping_reservations().filter(numberid_id=number_id).exists()
@@ -0,0 +1,73 @@
+# backends.py
+"""
+Аутентификация с кешированием пользователя между запросами.
+
+AuthenticationMiddleware на каждый запрос загружает пользователя из сессии
+(SELECT по первичному ключу), а декораторы ролей и шапки страниц читают
+request.user.role и username. Пользователь кешируется на USER_CACHE_TIMEOUT
+секунд; сигналы post_save/post_delete CustomUser удаляют его из кеша, поэтому
+смена роли, пароля или блокировка действуют со следующего запроса.
+
+Сигнал чистит только тот кеш, который видит процесс, сохранивший
+пользователя: с кешем в памяти процесса другие воркеры отдавали бы старые
+данные до истечения времени жизни. Поэтому в settings.py кеш пользователя
+включен только вместе с общим кешем (REDIS_URL). QuerySet.update() сигналов
+не отправляет - после массового изменения пользователей ключи удаляются
+явно (user_cache_key).
+
+В кеше лежат поля пользователя без хеша пароля и готовый хеш сессии
+(get_session_auth_hash), которым AuthenticationMiddleware сверяет сессию.
+У восстановленного пользователя поле password отложено: save() его не
+перезаписывает, а явное обращение читает пароль из базы.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+def user_cache_key(user_id):
+    return f'hotel:user:{user_id}'
+
+
+def _snapshot(user):
+    return {
+        'fields': [(field.attname, getattr(user, field.attname))
+                   for field in user._meta.concrete_fields if field.attname != 'password'],
+        'session_hash': user.get_session_auth_hash(),
+    }
+
+
+def _restore(snapshot):
+    names = [name for name, _ in snapshot['fields']]
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, names, [value for _, value in snapshot['fields']])
+    session_hash = snapshot['session_hash']
+
+    def get_session_auth_hash():
+        # После set_password или чтения пароля из базы хеш считается заново
+        if 'password' in user.__dict__:
+            return type(user).get_session_auth_hash(user)
+        return session_hash
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, у которого get_user сначала смотрит в кеш"""
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, 'USER_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_user(user_id)
+
+        key = user_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return _restore(snapshot)
+        user = super().get_user(user_id)
+        # Неактивные и удаленные не кешируются: None не отличить от промаха
+        if user is not None:
+            cache.set(key, _snapshot(user), timeout)
+        return user
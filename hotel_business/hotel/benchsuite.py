@@ -0,0 +1,197 @@
+# benchsuite.py
+"""
+Набор бенчмарков страниц: каждый маршрут из urls.py открывается под
+пользователями всех ролей на реалистичном объеме данных. Для каждой пары
+«роль - страница» считаются перцентили задержки, число SQL-запросов и
+выделенная память, а код ответа сверяется с ожидаемым для роли
+(querybudget.expected_status). Результат - JSON, который сравнивается с
+прошлым запуском (compare), чтобы ловить регрессии до выкладки.
+"""
+import datetime
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import datagen, occupancy, querybudget, reporting
+from .loadtest import percentile
+from .models import CustomUser, Reservation
+
+ROLES = ('admin', 'manager', 'client', 'guest')
+
+# Объемы данных по умолчанию
+VOLUMES = {
+    'rooms': 300,
+    'guests': 5000,
+    'reservations': 20000,
+    'services': 60,
+    'provisions': 40000,
+}
+
+# Маршруты с параметрами и дополнительные варианты страниц (параметры запроса)
+EXTRA_URLS = [
+    ('export_data', {'dataset': 'reservations'}, {}),
+    ('manager_guests', None, {'q': 'Гость 1'}),
+    ('manager_guests', None, {'sort': 'name_asc'}),
+    ('manager_rooms', None, {'free_only': '1'}),
+    ('manager_services', None, {'q': 'Услуга'}),
+]
+
+# Разница меньше этого (мс) не считается регрессией задержки - шум измерений
+MIN_LATENCY_DELTA_MS = 2.0
+
+
+def seed(volumes, rng):
+    """Реалистичные данные: номера, гости с документами, брони, услуги и оказания"""
+    rooms = datagen.create_rooms(volumes['rooms'], rng=rng)
+    guests = datagen.create_guests(volumes['guests'], prefix='suite', rng=rng)
+    datagen.ReservationTimeline(rooms, guests, active_share=0.3, rng=rng).extend(volumes['reservations'])
+    services = datagen.create_services(volumes['services'], active_share=0.8, rng=rng)
+    reservation_ids = list(Reservation.objects.values_list('pk', flat=True))
+    datagen.create_provisions(volumes['provisions'], reservation_ids, services, rng=rng)
+    # Генератор пишет в обход сигналов - производные таблицы строятся целиком
+    occupancy.rebuild()
+    reporting.rebuild()
+    return guests
+
+
+def urls():
+    """[(имя маршрута, адрес)] для всех страниц"""
+    result = [(name, reverse(name)) for name in querybudget.discover_routes()]
+    for name, kwargs, params in EXTRA_URLS:
+        url = reverse(name, kwargs=kwargs)
+        result.append((name, f'{url}?{urlencode(params)}' if params else url))
+    return result
+
+
+def login_client(role, guests):
+    """
+    Клиент для роли. Роль client входит под сгенерированным гостем с бронями,
+    чтобы личный кабинет показывал реальные данные, остальные роли - под
+    временными пользователями.
+    """
+    if role != 'client':
+        return querybudget.login_client(role)
+    guest = (
+        Reservation.objects.filter(clientid__in=[guest.pk for guest in guests[:100]])
+        .values_list('clientid__user', flat=True).first()
+    )
+    client = Client()
+    client.force_login(CustomUser.objects.get(pk=guest) if guest else guests[0].user)
+    return client
+
+
+def _request(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, url, iterations):
+    """Статус, задержки (мс), число запросов и пик выделенной памяти (КБ) для страницы"""
+    # Прогрев: кеши заполнены, как на работающем сервере
+    response = _request(client, url)
+
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            _request(client, url)
+            timings.append((time.perf_counter() - started) * 1000)
+    query_count = len(queries) / iterations if iterations else 0
+
+    # Память - отдельным проходом: tracemalloc заметно замедляет запрос
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        _request(client, url)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'mean_ms': round(statistics.fmean(timings), 2) if timings else 0.0,
+        'queries': round(query_count, 1),
+        'memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(volumes, iterations, roles=ROLES, rng=None, progress=None):
+    """Прогон всех страниц под всеми ролями; данные создаются в текущей транзакции"""
+    rng = rng or random.Random(42)
+    cache.clear()
+    guests = seed(volumes, rng)
+    pages = urls()
+    results = []
+    with querybudget.allow_test_host():
+        for role in roles:
+            client = login_client(role, guests)
+            for name, url in pages:
+                row = {'role': role, 'route': name, 'url': url,
+                       'expected_status': querybudget.expected_status(role, name),
+                       **measure(client, url, iterations)}
+                results.append(row)
+                if progress:
+                    progress(row)
+    return {'meta': _meta(volumes, iterations), 'results': results}
+
+
+def unexpected(report):
+    """Строки отчета, где код ответа отличается от ожидаемого для роли"""
+    return [row for row in report['results'] if row['status'] != row['expected_status']]
+
+
+def _meta(volumes, iterations):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'volumes': volumes,
+        'iterations': iterations,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Регрессии относительно baseline: задержка p95 или память выросли больше
+    чем на threshold (доля), число запросов выросло, изменился код ответа.
+    """
+    before = {(row['role'], row['url']): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = before.get((row['role'], row['url']))
+        if old is None:
+            continue
+        key = f"{row['role']} {row['url']}"
+        if row['status'] != old['status']:
+            regressions.append(f'{key}: статус {old["status"]} -> {row["status"]}')
+        if row['queries'] > old['queries']:
+            regressions.append(f'{key}: запросов {old["queries"]} -> {row["queries"]}')
+        if row['p95_ms'] > old['p95_ms'] * (1 + threshold) and \
+                row['p95_ms'] - old['p95_ms'] > MIN_LATENCY_DELTA_MS:
+            regressions.append(f'{key}: p95 {old["p95_ms"]} -> {row["p95_ms"]} мс')
+        if row['memory_kb'] > old['memory_kb'] * (1 + threshold) and row['memory_kb'] - old['memory_kb'] > 64:
+            regressions.append(f'{key}: память {old["memory_kb"]} -> {row["memory_kb"]} КБ')
+    return regressions
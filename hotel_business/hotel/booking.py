@@ -0,0 +1,60 @@
+# booking.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .availability import AvailabilityService
+from .models import Number, Reservation
+from .pricing import stay_price
+
+
+class BookingError(Exception):
+    """Бронирование невозможно (номер закрыт или занят на эти даты)"""
+
+
+def book_room(guest, number_id, arrival, departure, actuallypaid=Decimal('0.00')):
+    """
+    Создает бронь без пересечений с другими активными бронями номера.
+
+    Строка номера блокируется SELECT ... FOR UPDATE до конца транзакции, поэтому
+    параллельные брони одного номера выполняются по очереди, а брони разных
+    номеров друг друга не ждут.
+    """
+    service = AvailabilityService(arrival, departure)
+    with transaction.atomic():
+        try:
+            number = (
+                Number.objects.select_for_update(of=('self',))
+                .select_related('categoryid')
+                .get(pk=number_id)
+            )
+        except Number.DoesNotExist:
+            raise BookingError('Номер не найден.')
+
+        if not number.is_available:
+            raise BookingError(f'Номер {number.id} закрыт для бронирования.')
+        if not service.is_free(number):
+            raise BookingError(f'Номер {number.id} уже забронирован на эти даты.')
+
+        return Reservation.objects.create(
+            clientid=guest,
+            numberid=number,
+            arrivaldate=arrival,
+            departuredate=departure,
+            price=stay_price(number.categoryid, arrival, departure),
+            actuallypaid=actuallypaid,
+        )
+
+
+def overlapping_reservations(reservations=None):
+    """Активные брони, пересекающиеся с другой активной бронью того же номера"""
+    if reservations is None:
+        reservations = Reservation.objects.all()
+    conflicts = Reservation.objects.filter(
+        status='active',
+        numberid=OuterRef('numberid'),
+        arrivaldate__lt=OuterRef('departuredate'),
+        departuredate__gt=OuterRef('arrivaldate'),
+    ).exclude(pk=OuterRef('pk'))
+    return reservations.filter(status='active').filter(Exists(conflicts))
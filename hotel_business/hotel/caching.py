@@ -0,0 +1,155 @@
+# caching.py
+"""
+Кеш справочных данных с версионированными ключами.
+
+Ключ включает версию пространства имен (services, rooms, ...). Сигналы
+post_save/post_delete моделей увеличивают версию, и все ключи пространства
+разом становятся недействительными без перебора и удаления. Версии и
+счетчики попаданий и промахов (команда cache_stats) хранятся в том же кеше.
+
+Общими для всех процессов они становятся только с общим кешем (REDIS_URL).
+С кешем в памяти процесса у каждого воркера свои версии и счетчики:
+изменение справочника сбрасывает кеш только в сохранившем его процессе, а
+cache_stats показывает один процесс. Поэтому без REDIS_URL срок
+HOTEL_CACHE_TIMEOUT равен 0 и справочники между запросами не кешируются.
+Значения с явным коротким сроком (число строк, фасеты, статистика панели)
+кешируются и без общего кеша - их устаревание ограничено этим сроком.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+NAMESPACES = ('services', 'rooms', 'guests', 'categories', 'permissions', 'occupancy')
+
+# Группы счетчиков попаданий: пространства имен и составные значения
+STATS_GROUPS = NAMESPACES + ('dashboard',)
+
+# Какие пространства имен устаревают при изменении модели
+MODEL_NAMESPACES = {
+    'hotel.service': ('services',),
+    'hotel.number': ('rooms',),
+    'hotel.guest': ('guests',),
+    # Название и цена категории выводятся в списке номеров
+    'hotel.category': ('categories', 'rooms'),
+    'hotel.rolepermission': ('permissions',),
+    # Брони меняют занятость: число свободных номеров и фасеты поиска
+    'hotel.reservation': ('occupancy',),
+}
+
+_MISSING = object()
+
+
+def default_timeout():
+    return getattr(settings, 'HOTEL_CACHE_TIMEOUT', 300)
+
+
+def _version_key(namespace):
+    return f'hotel:version:{namespace}'
+
+
+def version(namespace):
+    """Текущая версия пространства имен"""
+    return cache.get_or_set(_version_key(namespace), 1, None)
+
+
+def bump(*namespaces):
+    """Делает недействительными все ключи указанных пространств имен"""
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), 2, None)
+
+
+def bump_for_model(model):
+    bump(*MODEL_NAMESPACES.get(model._meta.label_lower, ()))
+
+
+def make_key(namespaces, name):
+    """Ключ, зависящий от версий одного или нескольких пространств имен"""
+    if isinstance(namespaces, str):
+        namespaces = (namespaces,)
+    versions = cache.get_many([_version_key(ns) for ns in namespaces])
+    parts = [f'{ns}.{versions.get(_version_key(ns)) or version(ns)}' for ns in namespaces]
+    return f"hotel:{':'.join(parts)}:{name}"
+
+
+def _count(group, outcome):
+    key = f'hotel:stats:{group}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_or_set(namespaces, name, compute, timeout=None, group=None):
+    """
+    Значение из кеша или результат compute(), сохраненный под версионированным
+    ключом. group - группа счетчиков (по умолчанию первое пространство имен).
+    """
+    if group is None:
+        group = namespaces if isinstance(namespaces, str) else namespaces[0]
+    key = make_key(namespaces, name)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count(group, 'hit')
+        return value
+    _count(group, 'miss')
+    value = compute()
+    timeout = default_timeout() if timeout is None else timeout
+    if timeout:
+        cache.set(key, value, timeout)
+    return value
+
+
+async def aversion(namespace):
+    return await cache.aget_or_set(_version_key(namespace), 1, None)
+
+
+async def amake_key(namespaces, name):
+    if isinstance(namespaces, str):
+        namespaces = (namespaces,)
+    versions = await cache.aget_many([_version_key(ns) for ns in namespaces])
+    parts = [f'{ns}.{versions.get(_version_key(ns)) or await aversion(ns)}' for ns in namespaces]
+    return f"hotel:{':'.join(parts)}:{name}"
+
+
+async def _acount(group, outcome):
+    key = f'hotel:stats:{group}:{outcome}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, None)
+
+
+async def aget_or_set(namespaces, name, acompute, timeout=None, group=None):
+    """Асинхронный get_or_set: acompute - корутинная функция без аргументов"""
+    if group is None:
+        group = namespaces if isinstance(namespaces, str) else namespaces[0]
+    key = await amake_key(namespaces, name)
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        await _acount(group, 'hit')
+        return value
+    await _acount(group, 'miss')
+    value = await acompute()
+    timeout = default_timeout() if timeout is None else timeout
+    if timeout:
+        await cache.aset(key, value, timeout)
+    return value
+
+
+def stats():
+    """{группа: {'hit': n, 'miss': n}}"""
+    result = {group: {'hit': 0, 'miss': 0} for group in STATS_GROUPS}
+    for key, value in cache.get_many(_stats_keys()).items():
+        _, _, group, outcome = key.split(':')
+        result[group][outcome] = value
+    return result
+
+
+def reset_stats():
+    cache.delete_many(_stats_keys())
+
+
+def _stats_keys():
+    return [f'hotel:stats:{group}:{outcome}' for group in STATS_GROUPS for outcome in ('hit', 'miss')]
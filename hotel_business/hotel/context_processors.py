@@ -1,15 +1,48 @@
 # context_processors.py
+"""
+Профиль гостя в контексте шаблонов. Между запросами профиль кешируется на
+GUEST_PROFILE_CACHE_TIMEOUT секунд; сигналы Guest удаляют его из кеша, что
+видно всем процессам только при общем кеше (см. settings.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
 from .models import Guest
 
+_MISSING = object()
 
-def guest_profile(request):
-    """Добавляет профиль гостя в контекст всех шаблонов"""
-    context = {}
 
-    if request.user.is_authenticated:
-        try:
-            context['guest'] = Guest.objects.get(user=request.user)
-        except Guest.DoesNotExist:
-            context['guest'] = None
+def guest_cache_key(user_id):
+    return f'hotel:guest_profile:{user_id}'
+
+
+def _load_guest(user):
+    timeout = getattr(settings, 'GUEST_PROFILE_CACHE_TIMEOUT', 0)
+    key = guest_cache_key(user.pk)
+    if timeout:
+        guest = cache.get(key, _MISSING)
+        if guest is not _MISSING:
+            return guest
+
+    try:
+        guest = Guest.objects.get(user_id=user.pk)
+    except Guest.DoesNotExist:
+        guest = None
 
-    return context
\ No newline at end of file
+    if timeout:
+        cache.set(key, guest, timeout)
+    return guest
+
+
+def get_guest(request):
+    """Профиль гостя текущего пользователя; загружается не больше одного раза за запрос"""
+    if not hasattr(request, '_cached_guest'):
+        user = request.user
+        request._cached_guest = _load_guest(user) if user.is_authenticated else None
+    return request._cached_guest
+
+
+def guest_profile(request):
+    """Добавляет профиль гостя в контекст всех шаблонов (запрос выполняется только при обращении)"""
+    return {'guest': SimpleLazyObject(lambda: get_guest(request))}
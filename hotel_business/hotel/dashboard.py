@@ -0,0 +1,91 @@
+# dashboard.py
+"""
+Статистика панели менеджера одним запросом к базе.
+
+Показатели номеров - условные COUNT по hotel_number, показатели остальных
+таблиц - скалярные подзапросы (Subquery) в том же SELECT. Запрос
+группируется по константе, поэтому возвращает ровно одну строку, даже если
+таблица номеров пуста. Результат кешируется на короткое время, поэтому
+стоимость панели не зависит от числа открытых вкладок.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Sum, Value
+from django.utils import timezone
+
+from . import caching
+from .models import Guest, Number, Reservation, RoomNight, Service
+
+
+def _one_row(queryset):
+    """Агрегаты queryset одной строкой: GROUP BY по константе сводится к отсутствию GROUP BY"""
+    return queryset.order_by().annotate(_all=Value(1)).values('_all')
+
+
+def _scalar(queryset, aggregate):
+    """Скалярный подзапрос с агрегатом по всем строкам queryset"""
+    return Subquery(_one_row(queryset).annotate(value=aggregate).values('value'))
+
+
+def _month_bounds(today):
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _metrics(today):
+    month_start, month_end = _month_bounds(today)
+    booked = Reservation.objects.exclude(status='cancelled')
+    in_service = Q(is_available=True)
+    occupied = Exists(RoomNight.objects.filter(date=today, numberid=OuterRef('pk')))
+    return {
+        'guests_count': _scalar(Guest.objects.all(), Count('pk')),
+        'services_count': _scalar(Service.objects.filter(is_active=True), Count('pk')),
+        'rooms_count': Count('pk'),
+        'in_service_rooms_count': Count('pk', filter=in_service),
+        'available_rooms_count': Count('pk', filter=in_service & ~occupied),
+        'occupied_rooms_count': Count('pk', filter=in_service & occupied),
+        'arrivals_today': _scalar(booked.filter(arrivaldate=today), Count('pk')),
+        'departures_today': _scalar(booked.filter(departuredate=today), Count('pk')),
+        'active_reservations_count': _scalar(Reservation.objects.filter(status='active'), Count('pk')),
+        'revenue_month': _scalar(
+            booked.filter(arrivaldate__gte=month_start, arrivaldate__lt=month_end),
+            Sum('actuallypaid'),
+        ),
+    }
+
+
+def collect_stats(today=None):
+    """Все показатели панели за один запрос"""
+    today = today or timezone.now().date()
+    metrics = _metrics(today)
+    stats = _one_row(Number.objects.all()).annotate(**metrics).values(*metrics).get()
+    stats['revenue_month'] = Decimal(str(stats['revenue_month'] or 0)).quantize(Decimal('0.01'))
+    in_service = stats['in_service_rooms_count']
+    stats['occupancy_percent'] = round(100 * stats['occupied_rooms_count'] / in_service) if in_service else 0
+    return stats
+
+
+def get_stats(today=None):
+    """Показатели панели из кеша (время жизни - DASHBOARD_STATS_TIMEOUT)"""
+    today = today or timezone.now().date()
+    return caching.get_or_set(
+        ('guests', 'services', 'rooms'), f'dashboard:{today.isoformat()}',
+        lambda: collect_stats(today),
+        timeout=getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 30),
+        group='dashboard',
+    )
+
+
+async def aget_stats(today=None):
+    """get_stats для async-представлений: запрос выполняется в потоке ORM"""
+    today = today or timezone.now().date()
+    return await caching.aget_or_set(
+        ('guests', 'services', 'rooms'), f'dashboard:{today.isoformat()}',
+        lambda: sync_to_async(collect_stats)(today),
+        timeout=getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 30),
+        group='dashboard',
+    )
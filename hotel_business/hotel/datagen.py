@@ -0,0 +1,156 @@
+# datagen.py
+"""Генерация синтетических данных для бенчмарков и нагрузочных проверок"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .models import Category, CustomUser, Document, Guest, Number, Reservation, Service, ServiceProvision
+
+BATCH_SIZE = 5000
+
+CATEGORY_NAMES = ['Эконом', 'Стандарт', 'Комфорт', 'Полулюкс', 'Люкс']
+
+
+def _batches(iterable, size=BATCH_SIZE):
+    batch = []
+    for obj in iterable:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_insert(model, objects, batch_size=BATCH_SIZE):
+    """bulk_create пачками, возвращает созданные объекты с pk"""
+    created = []
+    for batch in _batches(objects, batch_size):
+        created.extend(model.objects.bulk_create(batch))
+    return created
+
+
+def create_categories(count=len(CATEGORY_NAMES), rng=random):
+    categories = [
+        Category(
+            name=CATEGORY_NAMES[i % len(CATEGORY_NAMES)],
+            price=Decimal(2000 + 1500 * (i % len(CATEGORY_NAMES))),
+            description='Сгенерированная категория',
+        )
+        for i in range(count)
+    ]
+    return bulk_insert(Category, categories)
+
+
+def create_rooms(count, categories=None, rng=random):
+    """Номера, равномерно распределенные по категориям и этажам"""
+    categories = categories or create_categories(rng=rng)
+    rooms = (
+        Number(
+            floor=1 + i // 20,
+            roomcount=rng.randint(1, 3),
+            bedcount=rng.randint(1, 4),
+            categoryid=categories[i % len(categories)],
+        )
+        for i in range(count)
+    )
+    return bulk_insert(Number, rooms)
+
+
+def create_guests(count, prefix='bench', rng=random):
+    """Пользователи-клиенты вместе с документами и профилями гостя"""
+    suffix = rng.randrange(10 ** 6)
+    users = bulk_insert(CustomUser, (
+        CustomUser(
+            username=f'{prefix}_{suffix}_{i}',
+            email=f'{prefix}_{suffix}_{i}@example.com',
+            password='!',
+            role='client',
+        )
+        for i in range(count)
+    ))
+    documents = bulk_insert(Document, (
+        Document(
+            series=rng.randint(1000, 9999),
+            number=suffix * 1000 + i,
+            dateofissue=date(2015, 1, 1) + timedelta(days=rng.randint(0, 3000)),
+            whoissued='Сгенерированный документ',
+        )
+        for i in range(count)
+    ))
+    # Телефон уникален, поэтому номера выбираются без повторов
+    phones = rng.sample(range(900000000, 1000000000), count)
+    return bulk_insert(Guest, (
+        Guest(
+            user=user,
+            fullname=f'Гость {suffix} {i}',
+            phonenumber=phones[i],
+            dateofbirth=date(1960, 1, 1) + timedelta(days=rng.randint(0, 15000)),
+            documentid=document,
+            discount=Decimal(rng.choice(['0.00', '0.00', '0.05', '0.10', '0.15'])),
+        )
+        for i, (user, document) in enumerate(zip(users, documents))
+    ))
+
+
+def create_services(count, active_share=1.0, rng=random):
+    """Услуги каталога; active_share - доля активных"""
+    return bulk_insert(Service, (
+        Service(
+            name=f'Услуга {i}',
+            price=Decimal(rng.randint(100, 5000)),
+            description='Сгенерированная услуга',
+            is_active=rng.random() < active_share,
+        )
+        for i in range(count)
+    ))
+
+
+def create_provisions(count, reservation_ids, services, start=date(2020, 1, 1), days=3650, rng=random):
+    """Оказанные услуги по случайным броням, не удерживая их в памяти"""
+    provisions = (
+        ServiceProvision(
+            reservationid_id=rng.choice(reservation_ids),
+            serviceid=rng.choice(services),
+            quantity=rng.randint(1, 3),
+            dateofserviceprovision=start + timedelta(days=rng.randint(0, days)),
+        )
+        for _ in range(count)
+    )
+    for batch in _batches(provisions):
+        ServiceProvision.objects.bulk_create(batch)
+    return count
+
+
+class ReservationTimeline:
+    """Непересекающиеся брони: у каждого номера своя «лента» заездов подряд"""
+
+    def __init__(self, rooms, guests, start=date(2020, 1, 1), active_share=1.0, rng=random):
+        self.rooms = rooms
+        self.guests = guests
+        self.active_share = active_share
+        self.rng = rng
+        self.cursors = {room.pk: start + timedelta(days=rng.randint(0, 7)) for room in rooms}
+
+    def _generate(self, count):
+        for i in range(count):
+            room = self.rooms[i % len(self.rooms)]
+            arrival = self.cursors[room.pk] + timedelta(days=self.rng.randint(0, 3))
+            departure = arrival + timedelta(days=self.rng.randint(1, 7))
+            self.cursors[room.pk] = departure
+            price = room.categoryid.price * (departure - arrival).days
+            yield Reservation(
+                clientid=self.rng.choice(self.guests),
+                numberid=room,
+                arrivaldate=arrival,
+                departuredate=departure,
+                price=price,
+                actuallypaid=price,
+                status='active' if self.rng.random() < self.active_share else 'completed',
+            )
+
+    def extend(self, count):
+        """Добавляет count броней, не удерживая их в памяти"""
+        for batch in _batches(self._generate(count)):
+            Reservation.objects.bulk_create(batch)
+        return count
@@ -0,0 +1,166 @@
+# export.py
+"""
+Потоковая выгрузка гостей, броней и оказанных услуг в CSV/JSON.
+
+Строки читаются через values_list().iterator(chunk_size) (на PostgreSQL -
+серверный курсор) и сразу кодируются, поэтому потребление памяти не зависит
+от числа строк. Используется в представлении export_data и одноименной
+команде.
+
+Под ASGI синхронный итератор ответа Django собирает целиком
+(sync_to_async(list)), поэтому для ASGI есть astream(): асинхронный
+итератор, который забирает блоки по одному через sync_to_async.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef
+
+from .models import Guest, Reservation, ServiceProvision
+
+CHUNK_SIZE = 2000
+
+FORMATS = ('csv', 'json', 'jsonl')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _guests(date_from, date_to):
+    guests = Guest.objects.all()
+    if date_from or date_to:
+        # Гости, проживавшие в отеле в указанный период
+        stays = Reservation.objects.filter(clientid=OuterRef('pk'))
+        if date_from:
+            stays = stays.filter(departuredate__gte=date_from)
+        if date_to:
+            stays = stays.filter(arrivaldate__lte=date_to)
+        guests = guests.filter(Exists(stays))
+    return guests
+
+
+def _by_date(queryset, field):
+    def build(date_from, date_to):
+        result = queryset
+        if date_from:
+            result = result.filter(**{f'{field}__gte': date_from})
+        if date_to:
+            result = result.filter(**{f'{field}__lte': date_to})
+        return result
+    return build
+
+
+# Набор данных: (запрос с учетом периода, выгружаемые поля)
+DATASETS = {
+    'guests': (_guests, (
+        'id', 'fullname', 'phonenumber', 'dateofbirth', 'discount',
+        'documentid__series', 'documentid__number', 'user__email',
+    )),
+    'reservations': (_by_date(Reservation.objects.all(), 'arrivaldate'), (
+        'id', 'clientid_id', 'numberid_id', 'arrivaldate', 'departuredate',
+        'price', 'actuallypaid', 'status', 'created_at',
+    )),
+    'provisions': (_by_date(ServiceProvision.objects.all(), 'dateofserviceprovision'), (
+        'id', 'reservationid_id', 'reservationid__clientid_id', 'serviceid_id',
+        'serviceid__name', 'serviceid__price', 'quantity', 'dateofserviceprovision',
+    )),
+}
+
+
+class _Echo:
+    """Буфер для csv.writer, возвращающий строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def rows(dataset, date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    """Заголовок и итератор кортежей значений набора данных"""
+    try:
+        build, fields = DATASETS[dataset]
+    except KeyError:
+        raise ValueError(f'Неизвестный набор данных: {dataset}')
+    queryset = build(date_from, date_to).order_by('pk').values_list(*fields)
+    return fields, queryset.iterator(chunk_size=chunk_size)
+
+
+def encode(fields, values, fmt='csv'):
+    """Строки выгрузки в формате fmt по одной"""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in values:
+            yield writer.writerow(row)
+    elif fmt == 'jsonl':
+        for row in values:
+            yield json.dumps(dict(zip(fields, map(_plain, row))), ensure_ascii=False) + '\n'
+    elif fmt == 'json':
+        separator = '[\n'
+        for row in values:
+            yield separator + json.dumps(dict(zip(fields, map(_plain, row))), ensure_ascii=False)
+            separator = ',\n'
+        yield '[]\n' if separator == '[\n' else '\n]\n'
+    else:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+
+
+def to_bytes(chunks, compress=False, buffer_size=64 * 1024):
+    """
+    Кодирует строки в UTF-8, при compress - в gzip. Мелкие строки
+    склеиваются в блоки около buffer_size байт.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            block = b''.join(buffer)
+            buffer, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b''.join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def stream(dataset, fmt='csv', date_from=None, date_to=None, compress=False, chunk_size=CHUNK_SIZE):
+    """Байты выгрузки набора данных"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+    fields, values = rows(dataset, date_from, date_to, chunk_size)
+    return to_bytes(encode(fields, values, fmt), compress)
+
+
+async def astream(*args, **kwargs):
+    """stream() для ASGI; курсор живет в одном потоке (thread_sensitive)"""
+    chunks = stream(*args, **kwargs)
+    try:
+        while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def filename(dataset, fmt, compress=False):
+    return f"{dataset}.{fmt}{'.gz' if compress else ''}"
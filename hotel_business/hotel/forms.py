@@ -2,6 +2,24 @@ from django import forms
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.core.exceptions import ValidationError
 from .models import CustomUser, Guest, Document
+from .search import MAX_BIGINT
+
+
+class DatabaseUniqueMixin:
+    """
+    Уникальность не проверяется запросами при валидации формы: ее обеспечивают
+    ограничения базы, а нарушение при сохранении превращается в ошибку поля
+    (см. registration.py).
+    """
+    # Поля, входящие в Meta.constraints модели
+    database_unique_fields = ()
+
+    def _get_validation_exclusions(self):
+        # Иначе full_clean проверит ограничения модели запросами exists()
+        return super()._get_validation_exclusions() | set(self.database_unique_fields)
+
+    def validate_unique(self):
+        pass
 
 
 class LoginForm(AuthenticationForm):
@@ -19,7 +37,7 @@ class LoginForm(AuthenticationForm):
     )
 
 
-class UserRegistrationForm(UserCreationForm):
+class UserRegistrationForm(DatabaseUniqueMixin, UserCreationForm):
     email = forms.EmailField(
         required=True,
         widget=forms.EmailInput(attrs={
@@ -44,6 +62,8 @@ class UserRegistrationForm(UserCreationForm):
         input_formats=['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y']  # Добавляем форматы дат
     )
 
+    database_unique_fields = ('username', 'email')
+
     class Meta:
         model = CustomUser
         fields = ['username', 'email', 'phone_number', 'date_of_birth', 'password1', 'password2']
@@ -69,20 +89,12 @@ class UserRegistrationForm(UserCreationForm):
         self.fields['password1'].help_text = ''
         self.fields['password2'].help_text = ''
 
-    def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if CustomUser.objects.filter(email=email).exists():
-            raise ValidationError('Пользователь с таким email уже существует.')
-        return email
-
     def clean_username(self):
-        username = self.cleaned_data.get('username')
-        if CustomUser.objects.filter(username=username).exists():
-            raise ValidationError('Пользователь с таким логином уже существует.')
-        return username
+        # Без запроса UserCreationForm: логин без учета регистра проверяет ограничение базы
+        return self.cleaned_data.get('username')
 
 
-class GuestRegistrationForm(forms.ModelForm):
+class GuestRegistrationForm(DatabaseUniqueMixin, forms.ModelForm):
     fullname = forms.CharField(
         max_length=255,
         widget=forms.TextInput(attrs={
@@ -109,14 +121,8 @@ class GuestRegistrationForm(forms.ModelForm):
         model = Guest
         fields = ['fullname', 'phonenumber', 'dateofbirth']
 
-    def clean_phonenumber(self):
-        phonenumber = self.cleaned_data.get('phonenumber')
-        if Guest.objects.filter(phonenumber=phonenumber).exists():
-            raise ValidationError('Гость с таким номером телефона уже существует.')
-        return phonenumber
 
-
-class DocumentForm(forms.ModelForm):
+class DocumentForm(DatabaseUniqueMixin, forms.ModelForm):
     series = forms.IntegerField(
         widget=forms.NumberInput(attrs={
             'class': 'form-control',
@@ -149,13 +155,32 @@ class DocumentForm(forms.ModelForm):
         model = Document
         fields = ['series', 'number', 'dateofissue', 'whoissued']
 
+class BoundedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField, для которого id вне диапазона ключей - неверный выбор, а не ошибка базы"""
+
+    def to_python(self, value):
+        try:
+            out_of_range = abs(int(value)) > MAX_BIGINT
+        except (TypeError, ValueError):
+            out_of_range = False
+        if out_of_range:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return super().to_python(value)
+
+
+class BookingForm(forms.Form):
+    guest = BoundedModelChoiceField(queryset=Guest.objects.all())
+    number = forms.IntegerField(min_value=1, max_value=MAX_BIGINT)
+    arrivaldate = forms.DateField(input_formats=['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y'])
+    departuredate = forms.DateField(input_formats=['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y'])
+    actuallypaid = forms.DecimalField(max_digits=9, decimal_places=2, min_value=0, required=False)
+
     def clean(self):
         cleaned_data = super().clean()
-        series = cleaned_data.get('series')
-        number = cleaned_data.get('number')
+        arrival = cleaned_data.get('arrivaldate')
+        departure = cleaned_data.get('departuredate')
 
-        if series and number:
-            if Document.objects.filter(series=series, number=number).exists():
-                raise ValidationError('Документ с такой серией и номером уже существует.')
+        if arrival and departure and departure <= arrival:
+            raise ValidationError('Дата выезда должна быть позже даты заезда.')
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
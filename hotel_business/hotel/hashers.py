@@ -0,0 +1,17 @@
+# hashers.py
+"""
+PBKDF2 с настраиваемым числом итераций (PASSWORD_HASH_ITERATIONS).
+
+В нагрузочных окружениях хеширование пароля (сотни миллисекунд CPU на вход
+или регистрацию) заслоняет работу с базой и сессиями. Число итераций
+записывается в сам хеш, поэтому пароли с другим значением проверяются как
+раньше и перехешируются при следующем входе.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
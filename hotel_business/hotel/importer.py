@@ -0,0 +1,378 @@
+# importer.py
+"""
+Массовая загрузка справочников и гостей из CSV/JSONL.
+
+Файл читается построчно, внешние ключи (категория, предмет по названию)
+разрешаются по словарям в памяти, загруженным одним запросом. Дубликаты
+существующих записей и строк самого файла пропускаются. Новые объекты
+пишутся bulk_create пачками, каждая пачка - в своей транзакции; ключи строк
+пачки считаются занятыми только после ее фиксации. Значения проверяются по
+ограничениям полей модели (длина, разрядность, диапазон) еще в prepare(),
+так что неверное значение - ошибка строки, а не прерванная загрузка.
+bulk_create не отправляет post_save, поэтому версии кеша сбрасываются
+явно в конце загрузки.
+"""
+import csv
+import gzip
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_date
+
+from . import amenities, caching, reporting
+from .models import Category, CustomUser, Document, Equipment, Guest, Item, Number
+from .search import MAX_INT
+
+BATCH_SIZE = 5000
+
+
+class RowSkipped(Exception):
+    """Строка - дубликат уже существующей записи"""
+
+
+def read_rows(path):
+    """Строки файла .csv или .jsonl (можно .gz) как словари"""
+    opener = gzip.open if path.endswith('.gz') else open
+    name = path[:-3] if path.endswith('.gz') else path
+    with opener(path, 'rt', encoding='utf-8', newline='') as source:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(source)
+        elif name.endswith(('.jsonl', '.ndjson')):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError('Поддерживаются файлы .csv и .jsonl')
+
+
+def _required(row, name):
+    value = row.get(name)
+    if value is None or str(value).strip() == '':
+        raise ValueError(f'не заполнено поле {name}')
+    return str(value).strip()
+
+
+def _int(row, name, default=None):
+    if default is not None and not str(row.get(name) or '').strip():
+        return default
+    try:
+        value = int(_required(row, name))
+    except ValueError as e:
+        raise ValueError(f'поле {name}: ожидается целое число') from e
+    if abs(value) > MAX_INT:
+        raise ValueError(f'поле {name}: число вне допустимого диапазона')
+    return value
+
+
+def _decimal(row, name, default=None):
+    if default is not None and not str(row.get(name) or '').strip():
+        return default
+    try:
+        value = Decimal(_required(row, name))
+    except InvalidOperation as e:
+        raise ValueError(f'поле {name}: ожидается число') from e
+    if not value.is_finite():
+        raise ValueError(f'поле {name}: ожидается конечное число')
+    return value
+
+
+def _date(row, name):
+    try:
+        value = parse_date(_required(row, name))
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValueError(f'поле {name}: ожидается дата ГГГГ-ММ-ДД')
+    return value
+
+
+def _validate(obj, *names):
+    """Проверка полей names объекта по ограничениям модели; ошибки - ValueError"""
+    errors = []
+    for name in names:
+        field = obj._meta.get_field(name)
+        try:
+            setattr(obj, field.attname, field.clean(getattr(obj, field.attname), obj))
+        except ValidationError as e:
+            errors.append(f'поле {name}: ' + ' '.join(e.messages))
+    if errors:
+        raise ValueError('; '.join(errors))
+    return obj
+
+
+def _bool(row, name, default=True):
+    value = str(row.get(name) or '').strip().lower()
+    if not value:
+        return default
+    return value in ('1', 'true', 'yes', 'да')
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class Importer:
+    """
+    Базовый загрузчик: prepare() превращает строку в объект, flush() пишет пачку.
+
+    Занятые в базе ключи уникальности хранятся в множествах-атрибутах
+    (например, names). prepare() отмечает ключи строки через stage(), и в
+    множества они попадают только после фиксации пачки: если база отклонила
+    пачку, ее ключи свободны для следующих строк.
+    """
+    namespaces = ()
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.staged = defaultdict(set)
+
+    def taken(self, name, key):
+        """Ключ занят в базе или строкой текущей пачки"""
+        return key in getattr(self, name) or key in self.staged[name]
+
+    def stage(self, name, key):
+        self.staged[name].add(key)
+
+    def prepare(self, row):
+        raise NotImplementedError
+
+    def flush(self, batch):
+        raise NotImplementedError
+
+    def _write(self, batch, result):
+        try:
+            with transaction.atomic():
+                result.created += self.flush([obj for _, obj in batch])
+        except (DatabaseError, ValidationError, ArithmeticError) as e:
+            result.errors.extend((line, f'пачка отклонена базой: {e}') for line, _ in batch)
+        else:
+            for name, keys in self.staged.items():
+                getattr(self, name).update(keys)
+        finally:
+            self.staged.clear()
+
+    def run(self, rows):
+        result = ImportResult()
+        started = time.perf_counter()
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            result.rows += 1
+            try:
+                batch.append((line, self.prepare(row)))
+            except RowSkipped:
+                result.skipped += 1
+            except (ValueError, TypeError, AttributeError) as e:
+                result.errors.append((line, str(e)))
+            if len(batch) >= self.batch_size:
+                self._write(batch, result)
+                batch = []
+        if batch:
+            self._write(batch, result)
+
+        if self.namespaces:
+            caching.bump(*self.namespaces)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+
+class CategoryImporter(Importer):
+    """name, price, description"""
+    namespaces = ('categories', 'rooms')
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.names = set(Category.objects.values_list('name', flat=True))
+
+    def prepare(self, row):
+        name = _required(row, 'name')
+        if self.taken('names', name):
+            raise RowSkipped
+        category = Category(name=name, price=_decimal(row, 'price'), description=row.get('description') or '')
+        _validate(category, 'name', 'price')
+        self.stage('names', name)
+        return category
+
+    def flush(self, batch):
+        return len(Category.objects.bulk_create(batch))
+
+
+class ItemImporter(Importer):
+    """name"""
+    namespaces = (amenities.NAMESPACE,)
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.names = set(Item.objects.values_list('name', flat=True))
+
+    def prepare(self, row):
+        name = _required(row, 'name')
+        if self.taken('names', name):
+            raise RowSkipped
+        item = _validate(Item(name=name), 'name')
+        self.stage('names', name)
+        return item
+
+    def flush(self, batch):
+        return len(Item.objects.bulk_create(batch))
+
+
+class _CategoryLookup:
+    """Словарь «название категории -> id» (при повторах названий - первая категория)"""
+
+    def __init__(self):
+        self.categories = {}
+        for pk, name in Category.objects.order_by('-pk').values_list('pk', 'name'):
+            self.categories[name] = pk
+
+    def category_id(self, row):
+        name = _required(row, 'category')
+        try:
+            return self.categories[name]
+        except KeyError:
+            raise ValueError(f'категория «{name}» не найдена')
+
+
+class EquipmentImporter(_CategoryLookup, Importer):
+    """category, item (названия)"""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        Importer.__init__(self, batch_size)
+        _CategoryLookup.__init__(self)
+        self.items = dict(Item.objects.order_by('-pk').values_list('name', 'pk'))
+        self.pairs = set(Equipment.objects.values_list('categoryid_id', 'itemid_id'))
+
+    def prepare(self, row):
+        category_id = self.category_id(row)
+        name = _required(row, 'item')
+        try:
+            item_id = self.items[name]
+        except KeyError:
+            raise ValueError(f'предмет «{name}» не найден')
+        if self.taken('pairs', (category_id, item_id)):
+            raise RowSkipped
+        self.stage('pairs', (category_id, item_id))
+        return Equipment(categoryid_id=category_id, itemid_id=item_id)
+
+    def flush(self, batch):
+        created = Equipment.objects.bulk_create(batch)
+        # bulk_create не отправляет сигналы - индекс оснащения пересчитывается явно
+        amenities.rebuild({equipment.categoryid_id for equipment in created})
+        return len(created)
+
+
+class RoomImporter(_CategoryLookup, Importer):
+    """floor, roomcount, bedcount, category (название), is_available"""
+    namespaces = ('rooms',)
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        Importer.__init__(self, batch_size)
+        _CategoryLookup.__init__(self)
+
+    def prepare(self, row):
+        room = Number(
+            floor=_int(row, 'floor'),
+            roomcount=_int(row, 'roomcount'),
+            bedcount=_int(row, 'bedcount'),
+            categoryid_id=self.category_id(row),
+            is_available=_bool(row, 'is_available'),
+        )
+        return _validate(room, 'floor', 'roomcount', 'bedcount')
+
+    def flush(self, batch):
+        created = Number.objects.bulk_create(batch)
+        # Новые номера меняют число номеров в эксплуатации в текущих сводках
+        reporting.mark_dirty(reporting.current_dates())
+        return len(created)
+
+
+class GuestImporter(Importer):
+    """
+    fullname, phonenumber, dateofbirth, discount, series, number, dateofissue,
+    whoissued, username, email. Для каждого гостя создается пользователь-клиент
+    без пароля (вход после сброса пароля): хеширование сотен тысяч паролей
+    заняло бы часы. Документ каждого гостя новый: строка с серией и номером
+    уже известного документа - ошибка, а не привязка к чужому паспорту.
+    """
+    namespaces = ('guests',)
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.phones = set(Guest.objects.values_list('phonenumber', flat=True))
+        # Логин уникален без учета регистра, email - среди непустых (ограничения CustomUser)
+        self.usernames = {name.lower() for name in CustomUser.objects.values_list('username', flat=True)}
+        self.emails = set(CustomUser.objects.exclude(email='').values_list('email', flat=True))
+        self.documents = set(Document.objects.values_list('series', 'number'))
+        self.password = make_password(None)
+
+    def prepare(self, row):
+        phone = _int(row, 'phonenumber')
+        if self.taken('phones', phone):
+            raise RowSkipped
+        username = str(row.get('username') or '').strip() or f'guest_{phone}'
+        if self.taken('usernames', username.lower()):
+            raise ValueError(f'имя пользователя {username} уже занято')
+        email = str(row.get('email') or '').strip()
+        if email and self.taken('emails', email):
+            raise ValueError(f'email {email} уже занят')
+
+        key = (_int(row, 'series'), _int(row, 'number'))
+        if self.taken('documents', key):
+            raise ValueError(f'документ серии {key[0]} номер {key[1]} уже зарегистрирован')
+        document = Document(
+            series=key[0],
+            number=key[1],
+            dateofissue=_date(row, 'dateofissue'),
+            whoissued=_required(row, 'whoissued'),
+        )
+
+        guest = Guest(
+            fullname=_required(row, 'fullname'),
+            phonenumber=phone,
+            dateofbirth=_date(row, 'dateofbirth'),
+            discount=_decimal(row, 'discount', Decimal('0.00')),
+        )
+        user = CustomUser(username=username, email=email, password=self.password, role='client')
+        _validate(document, 'whoissued')
+        _validate(guest, 'fullname', 'discount')
+        _validate(user, 'username', 'email')
+
+        self.stage('phones', phone)
+        self.stage('usernames', username.lower())
+        if email:
+            self.stage('emails', email)
+        self.stage('documents', key)
+        return user, document, guest
+
+    def flush(self, batch):
+        users = CustomUser.objects.bulk_create([user for user, _, _ in batch])
+        documents = Document.objects.bulk_create([document for _, document, _ in batch])
+
+        guests = []
+        for user, document, (_, _, guest) in zip(users, documents, batch):
+            guest.user_id = user.pk
+            guest.documentid_id = document.pk
+            guests.append(guest)
+        return len(Guest.objects.bulk_create(guests))
+
+
+IMPORTERS = {
+    'categories': CategoryImporter,
+    'items': ItemImporter,
+    'equipment': EquipmentImporter,
+    'rooms': RoomImporter,
+    'guests': GuestImporter,
+}
@@ -0,0 +1,204 @@
+# loadtest.py
+"""
+Нагрузочная проверка страниц: запросы в несколько потоков (или корутин)
+с подсчетом запросов в секунду и перцентилей задержки.
+
+Два режима:
+- по HTTP к запущенным развертываниям (например, gunicorn и uvicorn на
+  одной базе) - сравнение реальных WSGI- и ASGI-серверов;
+- внутри процесса: django.test.Client (WSGIHandler, потоки) против
+  AsyncClient (ASGIHandler, корутины) - когда серверов под рукой нет.
+
+Успешным считается только ответ с ожидаемым кодом (expected_status):
+перенаправление на вход вместо страницы - ошибка, а не быстрый ответ.
+Поэтому перенаправления не выполняются, а возвращаются как ответ 3xx.
+"""
+import asyncio
+import http.cookiejar
+import threading
+import time
+import urllib.parse
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import AsyncClient, Client
+from django.urls import resolve
+
+from . import querybudget
+
+
+def percentile(values, share):
+    """Перцентиль share (0..1) отсортированного списка"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def expected_status(path, role):
+    """Код ответа на GET path для пользователя с ролью role (None - без входа)"""
+    return querybudget.expected_status(role, resolve(urllib.parse.urlsplit(path).path).url_name)
+
+
+class Result:
+    def __init__(self, target, path, latencies, errors, elapsed, unexpected=None):
+        self.target = target
+        self.path = path
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        # {код ответа: сколько раз} для ответов с неожиданным кодом
+        self.unexpected = dict(unexpected or {})
+
+    @property
+    def rps(self):
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'target': self.target,
+            'path': self.path,
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'rps': round(self.rps, 1),
+            'p50_ms': round(percentile(self.latencies, 0.50), 2),
+            'p95_ms': round(percentile(self.latencies, 0.95), 2),
+            'p99_ms': round(percentile(self.latencies, 0.99), 2),
+            'unexpected': self.unexpected,
+        }
+
+
+def _run_threads(fetch, count, concurrency, expected):
+    """fetch() -> код ответа; count вызовов в concurrency потоков"""
+    latencies = []
+    errors = 0
+    unexpected = Counter()
+    lock = threading.Lock()
+
+    def worker(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            status = fetch()
+        except Exception:
+            status = None
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            if status == expected:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+                if status is not None:
+                    unexpected[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(count)))
+    return latencies, errors, time.perf_counter() - started, unexpected
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Перенаправление не выполняется: opener поднимает HTTPError с кодом 3xx"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpTarget:
+    """Развертывание, доступное по HTTP; сессия общая для всех потоков"""
+
+    def __init__(self, name, base_url):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def _open(self, request):
+        """Код ответа; ответы 3xx-5xx не считаются исключением"""
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.close()
+            return e.code
+
+    def login(self, username, password):
+        """Вход через форму; успешный вход отвечает перенаправлением в кабинет"""
+        login_url = self.base_url + '/login/'
+        self._open(login_url)
+        token = next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+        data = urllib.parse.urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': token,
+        }).encode()
+        request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+        status = self._open(request)
+        if status != 302 or not any(cookie.name == 'sessionid' for cookie in self.cookies):
+            raise ValueError(f'{self.name}: не удалось войти под {username} (код {status})')
+
+    def run(self, path, count, concurrency, expected=200):
+        url = self.base_url + path
+        latencies, errors, elapsed, unexpected = _run_threads(lambda: self._open(url), count, concurrency, expected)
+        return Result(self.name, path, latencies, errors, elapsed, unexpected)
+
+
+class WsgiTarget:
+    """WSGIHandler внутри процесса: по клиенту на поток"""
+    name = 'wsgi'
+
+    def __init__(self, user=None):
+        self.user = user
+        self.local = threading.local()
+
+    def _client(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+            if self.user is not None:
+                client.force_login(self.user)
+        return client
+
+    def run(self, path, count, concurrency, expected=200):
+        latencies, errors, elapsed, unexpected = _run_threads(
+            lambda: self._client().get(path).status_code, count, concurrency, expected
+        )
+        return Result(self.name, path, latencies, errors, elapsed, unexpected)
+
+
+class AsgiTarget:
+    """ASGIHandler внутри процесса: concurrency корутин в одном цикле событий"""
+    name = 'asgi'
+
+    def __init__(self, user=None):
+        self.client = AsyncClient()
+        if user is not None:
+            self.client.force_login(user)
+
+    def run(self, path, count, concurrency, expected=200):
+        return asyncio.run(self._run(path, count, concurrency, expected))
+
+    async def _run(self, path, count, concurrency, expected):
+        latencies = []
+        errors = 0
+        unexpected = Counter()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status = (await self.client.get(path)).status_code
+                except Exception:
+                    status = None
+                if status == expected:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+                    if status is not None:
+                        unexpected[status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(count)))
+        return Result(self.name, path, latencies, errors, time.perf_counter() - started, unexpected)
@@ -0,0 +1,68 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from hotel import datagen
+from hotel.availability import AvailabilityService
+
+
+class Command(BaseCommand):
+    help = 'Замер времени поиска свободных номеров при росте числа броней (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Количество броней на каждом шаге, через запятую')
+        parser.add_argument('--rooms', type=int, default=500)
+        parser.add_argument('--guests', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Не откатывать сгенерированные данные')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes должен быть списком чисел через запятую')
+
+        rng = random.Random(options['seed'])
+        start = date(2020, 1, 1)
+        # Окно запроса фиксировано, чтобы менялся только объем истории броней
+        service = AvailabilityService(start + timedelta(days=30), start + timedelta(days=33))
+
+        with transaction.atomic():
+            rooms = datagen.create_rooms(options['rooms'], rng=rng)
+            guests = datagen.create_guests(options['guests'], rng=rng)
+            timeline = datagen.ReservationTimeline(rooms, guests, start=start, rng=rng)
+
+            created = 0
+            self.stdout.write(f"{'броней':>10} {'медиана, мс':>12} {'p95, мс':>10} {'свободно':>9}")
+            for size in sizes:
+                created += timeline.extend(size - created)
+                self._analyze()
+
+                timings = []
+                free_count = 0
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    free_count = len(service.free_rooms().values_list('pk', flat=True))
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f'{created:>10} {statistics.median(timings):>12.2f} {p95:>10.2f} {free_count:>9}'
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def _analyze(self):
+        """Обновляет статистику планировщика после массовой вставки"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE hotel_reservation')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
@@ -0,0 +1,64 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hotel import datagen, export
+from hotel.models import Reservation, ServiceProvision
+
+
+def _export(options):
+    """Выгружает оказанные услуги в никуда; возвращает число байт"""
+    fields, values = export.rows('provisions')
+    if options['naive']:
+        values = list(values)
+    written = 0
+    for chunk in export.to_bytes(export.encode(fields, values, options['format']), options['gzip']):
+        written += len(chunk)
+    return written
+
+
+class Command(BaseCommand):
+    help = (
+        'Время и пиковая память потоковой выгрузки оказанных услуг (данные откатываются). '
+        'Память - пик объектов Python за время выгрузки (tracemalloc), отдельным проходом: '
+        'пиковый RSS процесса после генерации данных выгрузку уже не отражает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--naive', action='store_true',
+                            help='Для сравнения сначала загрузить весь набор в память')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            rooms = datagen.create_rooms(50, rng=rng)
+            guests = datagen.create_guests(200, rng=rng)
+            datagen.ReservationTimeline(rooms, guests, rng=rng).extend(1000)
+            services = datagen.create_services(20, rng=rng)
+            reservation_ids = list(Reservation.objects.values_list('pk', flat=True))
+            datagen.create_provisions(options['rows'], reservation_ids, services, rng=rng)
+            total = ServiceProvision.objects.count()
+
+            started = time.perf_counter()
+            written = _export(options)
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            try:
+                _export(options)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.stdout.write(f'Строк: {total}, байт: {written}, время: {elapsed:.1f} с '
+                              f'({total / elapsed:.0f} строк/с)')
+            self.stdout.write(f'Пик памяти Python при выгрузке: {peak / (1024 * 1024):.1f} МБ')
+            transaction.set_rollback(True)
@@ -0,0 +1,76 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from hotel import datagen
+from hotel.models import Guest
+from hotel.search import search_guests
+
+
+def legacy_search(queryset, query):
+    """Прежний поиск manager_guests: шесть icontains через OR"""
+    return queryset.filter(
+        Q(fullname__icontains=query) |
+        Q(phonenumber__icontains=query) |
+        Q(user__email__icontains=query) |
+        Q(user__username__icontains=query) |
+        Q(documentid__series__icontains=query) |
+        Q(documentid__number__icontains=query)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Сравнение планов и времени прежнего и нового поиска гостей (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--explain', action='store_true', help='Печатать планы запросов')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            guests = datagen.create_guests(options['guests'], prefix='search', rng=rng)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            sample = rng.choice(guests)
+            queries = [
+                sample.fullname.split()[-1],
+                str(sample.phonenumber)[:5],
+                str(sample.documentid.number),
+                sample.user.username[:8],
+            ]
+
+            base = Guest.objects.select_related('user', 'documentid')
+            self.stdout.write(f"{'запрос':<20} {'прежний, мс':>12} {'новый, мс':>10} {'найдено':>9}")
+            for query in queries:
+                legacy = legacy_search(base, query).order_by('id')
+                current = search_guests(base, query).order_by('-search_rank', 'id')
+                legacy_ms = self._measure(lambda: list(legacy[:50]), options['repeat'])
+                current_ms = self._measure(lambda: list(current[:50]), options['repeat'])
+                self.stdout.write(
+                    f'{query:<20} {legacy_ms:>12.2f} {current_ms:>10.2f} {current.count():>9}'
+                )
+                if options['explain']:
+                    self.stdout.write('--- прежний план ---')
+                    self.stdout.write(legacy[:50].explain())
+                    self.stdout.write('--- новый план ---')
+                    self.stdout.write(current[:50].explain())
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _measure(run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,97 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from hotel import querybudget
+from hotel.loadtest import percentile
+from hotel.models import CustomUser
+
+SESSION_BACKENDS = ('db', 'cached_db', 'cache', 'signed_cookies')
+
+DASHBOARDS = {
+    'admin': 'admin_dashboard',
+    'manager': 'manager_dashboard',
+    'client': 'client_dashboard',
+}
+
+PASSWORD = 'Bench-password-2024'
+
+
+class Command(BaseCommand):
+    help = (
+        'Вход через login_view с переходом на панель роли и последующие запросы панели '
+        'для каждого хранилища сессий, с кешем пользователя и без него: задержка и '
+        'SQL-запросы. Пользователь и сессии создаются в откатываемой транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help='Входов на конфигурацию')
+        parser.add_argument('--requests', type=int, default=50, help='Запросов панели после входа')
+        parser.add_argument('--role', choices=DASHBOARDS, default='client')
+        parser.add_argument('--backend', action='append', dest='backends', choices=SESSION_BACKENDS,
+                            help='Хранилище сессий (можно несколько, по умолчанию все)')
+        parser.add_argument('--hasher-iterations', type=int, default=1000,
+                            help='Итерации PBKDF2 пароля (0 - значение по умолчанию Django)')
+
+    def handle(self, *args, **options):
+        iterations = options['hasher_iterations'] or None
+        self.stdout.write(
+            f"Роль: {options['role']}, итераций PBKDF2: {iterations or 'по умолчанию'}\n"
+            f"{'сессии':<15} {'кеш польз.':>10} {'вход p50':>9} {'вход p95':>9} {'запр.':>6} "
+            f"{'панель p50':>11} {'панель p95':>11} {'запр.':>6}"
+        )
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations), querybudget.allow_test_host(), \
+                transaction.atomic():
+            user = CustomUser(username='loginbench', role=options['role'])
+            user.set_password(PASSWORD)
+            user.save()
+            for backend in options['backends'] or SESSION_BACKENDS:
+                for user_cache in (0, 300):
+                    cache.clear()
+                    with override_settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{backend}',
+                                           USER_CACHE_TIMEOUT=user_cache):
+                        login, page = self._measure(options['role'], options['logins'], options['requests'])
+                    self.stdout.write(
+                        f"{backend:<15} {'да' if user_cache else 'нет':>10} "
+                        f"{login['p50']:>9.1f} {login['p95']:>9.1f} {login['queries']:>6} "
+                        f"{page['p50']:>11.2f} {page['p95']:>11.2f} {page['queries']:>6}"
+                    )
+            transaction.set_rollback(True)
+        cache.clear()
+
+    def _measure(self, role, logins, requests):
+        dashboard = reverse(DASHBOARDS[role])
+        login_times, page_times = [], []
+        login_queries = page_queries = 0
+        for _ in range(logins):
+            client = Client()
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(reverse('login'), {'username': 'loginbench', 'password': PASSWORD})
+                if response.status_code != 302 or response.url != dashboard:
+                    raise CommandError(f'Вход не удался: {response.status_code} {response.get("Location")}')
+                client.get(dashboard)
+            login_times.append((time.perf_counter() - started) * 1000)
+            login_queries = len(queries)
+
+        # Установившийся режим: сессия и пользователь уже прочитаны хотя бы раз
+        for _ in range(requests):
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(dashboard)
+            page_times.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{dashboard}: код {response.status_code}')
+            page_queries = len(queries)
+
+        login_times.sort()
+        page_times.sort()
+        return (
+            {'p50': percentile(login_times, 0.5), 'p95': percentile(login_times, 0.95), 'queries': login_queries},
+            {'p50': percentile(page_times, 0.5), 'p95': percentile(page_times, 0.95), 'queries': page_queries},
+        )
@@ -0,0 +1,76 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hotel import datagen, pricing
+from hotel.models import Reservation, SeasonalRate, WeekdayRate
+
+
+class Command(BaseCommand):
+    help = 'Сравнение пакетного пересчета цен броней с расчетом по одной брони (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=20000)
+        parser.add_argument('--rooms', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = date(2020, 1, 1)
+
+        with transaction.atomic():
+            rooms = datagen.create_rooms(options['rooms'], rng=rng)
+            guests = datagen.create_guests(500, rng=rng)
+            datagen.ReservationTimeline(rooms, guests, start=start, rng=rng).extend(options['reservations'])
+            for year in range(start.year, start.year + 10):
+                SeasonalRate.objects.create(name=f'Лето {year}', startdate=date(year, 6, 1),
+                                            enddate=date(year, 8, 31), multiplier=Decimal('1.250'))
+            for weekday in (4, 5):
+                WeekdayRate.objects.create(weekday=weekday, multiplier=Decimal('1.100'))
+
+            stays = list(
+                Reservation.objects.values_list('pk', 'numberid__categoryid', 'arrivaldate', 'departuredate')
+            )
+
+            # По одной брони: запрос тарифов и расчет ночь за ночью
+            started = time.perf_counter()
+            single = {
+                pk: pricing.RateTable.load([category_id], arrival, departure).stay_price(category_id, arrival, departure)
+                for pk, category_id, arrival, departure in stays
+            }
+            single_time = time.perf_counter() - started
+
+            # По одной брони, но без запросов: общий снимок тарифов, ночь за ночью
+            table = pricing.RateTable.load()
+            started = time.perf_counter()
+            nightly = {
+                pk: table.stay_price(category_id, arrival, departure)
+                for pk, category_id, arrival, departure in stays
+            }
+            nightly_time = time.perf_counter() - started
+
+            # Пакетно: одна загрузка тарифов, накопленные суммы по категориям
+            started = time.perf_counter()
+            batched = pricing.stay_prices(stays, pricing.RateTable.load())
+            batched_time = time.perf_counter() - started
+
+            if not single == nightly == batched:
+                raise CommandError('Результаты пакетного расчета расходятся с расчетом по одной брони')
+
+            # Сгенерированные брони в прошлом - пересчитываются все, а не только open_reservations()
+            started = time.perf_counter()
+            seen, changed = pricing.reprice(Reservation.objects.exclude(status='cancelled'))
+            reprice_time = time.perf_counter() - started
+
+            self.stdout.write(f'Броней: {len(stays)}')
+            self.stdout.write(f'По одной брони: {single_time:.2f} с ({len(stays) / single_time:.0f} броней/с)')
+            self.stdout.write(f'По одной брони без запросов: {nightly_time:.2f} с '
+                              f'({len(stays) / nightly_time:.0f} броней/с)')
+            self.stdout.write(f'Пакетно:        {batched_time:.2f} с ({len(stays) / batched_time:.0f} броней/с), '
+                              f'ускорение ×{single_time / batched_time:.0f}')
+            self.stdout.write(f'reprice с записью: {reprice_time:.2f} с, изменено цен: {changed} из {seen}')
+            transaction.set_rollback(True)
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from hotel.loadtest import percentile
+from hotel.models import CustomUser, Document, Guest
+from hotel.registration import Registration
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = ('Регистрации в секунду при всплеске параллельных регистраций; часть заявок '
+            'повторяет телефон или email другой заявки и должна получить отказ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registrations', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--conflicts', type=float, default=0.1,
+                            help='Доля заявок с уже занятыми телефоном или email')
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help='MD5 вместо PBKDF2: измерить работу с базой без хеширования пароля')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Не удалять созданных пользователей')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write(self.style.WARNING(
+                'SQLite допускает одну пишущую транзакцию - ожидаются ошибки "database is locked". '
+                'Запускайте на PostgreSQL.'
+            ))
+
+        rng = random.Random(options['seed'])
+        prefix = f'regbench{rng.randrange(10 ** 6)}'
+        series = rng.randint(1000, 9999)
+        requests = [self._data(prefix, series, i) for i in range(options['registrations'])]
+        for data in requests:
+            if rng.random() < options['conflicts']:
+                other = rng.choice(requests)
+                field = rng.choice(['phonenumber', 'email'])
+                data[field] = other[field]
+
+        hashers = FAST_HASHERS if options['fast_hasher'] else None
+        with override_settings(PASSWORD_HASHERS=hashers) if hashers else nullcontext():
+            queries = self._queries_per_registration(prefix, series)
+            outcomes, latencies, wall = self._burst(requests, options['threads'])
+
+        try:
+            duplicates = self._duplicates(prefix)
+        finally:
+            if not options['keep']:
+                documents = list(Guest.objects.filter(user__username__startswith=prefix)
+                                 .values_list('documentid', flat=True))
+                CustomUser.objects.filter(username__startswith=prefix).delete()
+                Document.objects.filter(pk__in=documents).delete()
+
+        latencies.sort()
+        total = len(requests)
+        self.stdout.write(f'SQL-запросов на регистрацию: {queries}')
+        self.stdout.write(
+            f"Заявок: {total}, потоков: {options['threads']}, время: {wall:.2f} с "
+            f"({outcomes['registered'] / wall:.1f} регистраций/с, {total / wall:.1f} заявок/с)"
+        )
+        self.stdout.write(
+            f"Зарегистрировано: {outcomes['registered']}, отказов по уникальности: {outcomes['rejected']}, "
+            f"ошибок БД: {outcomes['db_error']}"
+        )
+        self.stdout.write(
+            f'Задержка, мс: p50={percentile(latencies, 0.50):.1f} '
+            f'p95={percentile(latencies, 0.95):.1f} p99={percentile(latencies, 0.99):.1f}'
+        )
+        if duplicates:
+            raise CommandError(f'Нарушена уникальность: {duplicates}')
+        self.stdout.write(self.style.SUCCESS('Дубликатов телефонов и email нет'))
+
+    @staticmethod
+    def _data(prefix, series, i):
+        return {
+            'username': f'{prefix}_{i}',
+            'email': f'{prefix}_{i}@example.com',
+            'password1': 'Bench-password-2024',
+            'password2': 'Bench-password-2024',
+            'fullname': f'Тестовый гость {i}',
+            'phonenumber': str(600000000 + i),
+            'date_of_birth': '1990-01-01',
+            'series': str(series),
+            'number': str(i + 1),
+            'dateofissue': '2015-01-01',
+            'whoissued': 'Сгенерированный документ',
+        }
+
+    def _queries_per_registration(self, prefix, series):
+        """Запросы одной регистрации (в откатываемой транзакции)"""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                Registration(self._data(f'{prefix}probe', series, 10 ** 8)).register()
+            transaction.set_rollback(True)
+        return len(queries)
+
+    @staticmethod
+    def _burst(requests, threads):
+        outcomes = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        def attempt(data):
+            started = time.perf_counter()
+            try:
+                outcome = 'registered' if Registration(data).register() else 'rejected'
+            except DatabaseError:
+                outcome = 'db_error'
+            finally:
+                connections.close_all()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                outcomes[outcome] += 1
+                latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(attempt, requests))
+        return outcomes, latencies, time.perf_counter() - started
+
+    @staticmethod
+    def _duplicates(prefix):
+        guests = Guest.objects.filter(user__username__startswith=prefix)
+        users = CustomUser.objects.filter(username__startswith=prefix)
+        phones = guests.values('phonenumber').annotate(n=Count('id')).filter(n__gt=1).count()
+        emails = users.values('email').annotate(n=Count('id')).filter(n__gt=1).count()
+        return {name: count for name, count in (('телефоны', phones), ('email', emails)) if count}
+
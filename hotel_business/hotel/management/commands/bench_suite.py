@@ -0,0 +1,69 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hotel import benchsuite
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк всех страниц из urls.py под ролями admin, manager, client и guest на '
+        'сгенерированных данных: перцентили задержки, SQL-запросы на запрос и выделенная память. '
+        'Результат сохраняется в JSON (--output) и сравнивается с прошлым запуском (--compare). '
+        'Данные откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in benchsuite.VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=value)
+        parser.add_argument('--iterations', type=int, default=10, help='Запросов на страницу для каждой роли')
+        parser.add_argument('--role', action='append', dest='roles', choices=benchsuite.ROLES,
+                            help='Роль (можно несколько, по умолчанию все)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument('--compare', help='JSON прошлого запуска для поиска регрессий')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95 и памяти (доля, по умолчанию 0.2)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Не удалось прочитать {options["compare"]}: {e}')
+
+        volumes = {name: options[name] for name in benchsuite.VOLUMES}
+        self.stdout.write(f"{'роль':<8} {'страница':<44} {'код':>4} {'p50':>8} {'p95':>8} {'p99':>8} "
+                          f"{'запр.':>6} {'КБ':>8}")
+
+        with transaction.atomic():
+            report = benchsuite.run(
+                volumes, options['iterations'], roles=options['roles'] or benchsuite.ROLES,
+                rng=random.Random(options['seed']), progress=self._print,
+            )
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+        errors = [f"{row['role']} {row['url']}: {row['status']} вместо {row['expected_status']}"
+                  for row in benchsuite.unexpected(report)]
+        if errors:
+            raise CommandError('Неожиданный код ответа: ' + '; '.join(errors))
+        if baseline is not None:
+            regressions = benchsuite.compare(baseline, report, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессии относительно базового запуска: ' + '; '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно базового запуска нет'))
+
+    def _print(self, row):
+        self.stdout.write(
+            f"{row['role']:<8} {row['url']:<44} {row['status']:>4} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['queries']:>6} {row['memory_kb']:>8.1f}"
+        )
@@ -0,0 +1,113 @@
+import copy
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from hotel import profiling, querybudget
+from hotel.loadtest import percentile
+from hotel.templatetags import navigation
+
+PAGES = (
+    'manager_dashboard', 'manager_guests', 'manager_services', 'manager_rooms',
+    'manager_assignment', 'manager_reports', 'manager_folios',
+)
+
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# Название, загрузчики, сохранять ли отрисованные меню и адреса между запросами
+CONFIGURATIONS = (
+    ('без кеша', PLAIN_LOADERS, False),
+    ('загрузчик', [('django.template.loaders.cached.Loader', PLAIN_LOADERS)], False),
+    ('загрузчик+меню', [('django.template.loaders.cached.Loader', PLAIN_LOADERS)], True),
+)
+
+
+def _templates(loaders):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0].pop('APP_DIRS', None)
+    templates[0]['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def _forget_navigation():
+    navigation._rendered.clear()
+    navigation._reverse.cache_clear()
+
+
+class Command(BaseCommand):
+    help = (
+        'Время отрисовки шаблонов страниц менеджера (мс, медиана и p95) без кеша шаблонов, '
+        'с кешированным загрузчиком и с закешированными шапкой и меню. Время шаблона '
+        'измеряется профилировщиком (hotel.profiling) и включает ленивые запросы из шаблона. '
+        'Данные создаются в откатываемой транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=50, help='Объем сгенерированных данных')
+        parser.add_argument('--iterations', type=int, default=50, help='Запросов на страницу')
+        parser.add_argument('--page', action='append', dest='pages', choices=PAGES,
+                            help='Страница (можно несколько, по умолчанию все)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or PAGES
+        header = f"{'страница':<20}" + ''.join(f'{name:>22}' for name, _, _ in CONFIGURATIONS)
+        self.stdout.write(header)
+        self.stdout.write(f"{'':<20}" + f"{'p50 / p95':>22}" * len(CONFIGURATIONS))
+
+        # Профиль каждого запроса не выводится в лог, только в буфер recent()
+        logger = logging.getLogger('hotel.profiling')
+        level = logger.level
+        logger.setLevel(logging.WARNING)
+        try:
+            results = self._run(pages, options)
+        finally:
+            logger.setLevel(level)
+            _forget_navigation()
+            cache.clear()
+
+        for page in pages:
+            self.stdout.write(f'{page:<20}' + ''.join(
+                f'{f"{p50:.2f} / {p95:.2f}":>22}' for p50, p95 in results[page]
+            ))
+
+    def _run(self, pages, options):
+        with transaction.atomic(), querybudget.allow_test_host(), \
+                override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0):
+            querybudget.seed(options['scale'], random.Random(options['seed']))
+            results = {page: [] for page in pages}
+            for name, loaders, keep_navigation in CONFIGURATIONS:
+                with override_settings(TEMPLATES=_templates(loaders)):
+                    cache.clear()
+                    _forget_navigation()
+                    # Новый клиент - новый обработчик с профилировщиком в цепочке middleware
+                    client = querybudget.login_client('manager')
+                    for page in pages:
+                        results[page].append(self._measure(client, page, options['iterations'], keep_navigation))
+            transaction.set_rollback(True)
+        return results
+
+    @staticmethod
+    def _measure(client, page, iterations, keep_navigation):
+        url = reverse(page)
+        timings = []
+        # Первый запрос прогревает кеши и компилирует шаблоны
+        for i in range(iterations + 1):
+            if not keep_navigation:
+                _forget_navigation()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: код {response.status_code}')
+            if i:
+                timings.append(profiling.recent()[0]['template_ms'])
+        timings.sort()
+        return percentile(timings, 0.5), percentile(timings, 0.95)
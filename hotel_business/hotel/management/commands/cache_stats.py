@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from hotel import caching
+
+
+class Command(BaseCommand):
+    help = ('Счетчики попаданий и промахов кеша справочных данных '
+            '(с кешем в памяти процесса показывает только данные этого процесса)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счетчики')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'группа':<12} {'версия':>7} {'попадания':>10} {'промахи':>8} {'доля':>6}")
+        for group, counters in caching.stats().items():
+            total = counters['hit'] + counters['miss']
+            ratio = f"{counters['hit'] / total:.0%}" if total else '-'
+            version = caching.version(group) if group in caching.NAMESPACES else '-'
+            self.stdout.write(
+                f"{group:<12} {version:>7} {counters['hit']:>10} {counters['miss']:>8} {ratio:>6}"
+            )
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счетчики обнулены'))
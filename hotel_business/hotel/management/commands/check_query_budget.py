@@ -0,0 +1,48 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hotel import querybudget
+
+
+class Command(BaseCommand):
+    help = ('Рендерит все страницы из urls.py на двух объемах данных и завершается ошибкой, '
+            'если число SQL-запросов растет вместе с числом строк (N+1). Данные откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=5)
+        parser.add_argument('--large', type=int, default=50)
+        parser.add_argument('--role', default='admin', help='Роль пользователя, под которым открываются страницы')
+        parser.add_argument('--tolerance', type=int, default=0, help='Допустимый рост числа запросов')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        routes = querybudget.discover_routes()
+
+        with querybudget.allow_test_host(), transaction.atomic():
+            client = querybudget.login_client(options['role'])
+            querybudget.seed(options['small'], rng)
+            small = querybudget.measure(client, routes)
+            querybudget.seed(options['large'] - options['small'], rng)
+            large = querybudget.measure(client, routes)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'маршрут':<24} {'статус':>6} {'малый':>6} {'большой':>8}")
+        for name in routes:
+            status, count = large[name]
+            self.stdout.write(f'{name:<24} {status:>6} {small[name][1]:>6} {count:>8}')
+
+        errors = dict.fromkeys(querybudget.unexpected(options['role'], small)
+                               + querybudget.unexpected(options['role'], large))
+        regressions = querybudget.compare(small, large, options['tolerance'])
+        if errors:
+            raise CommandError('Неожиданный код ответа: ' + '; '.join(
+                f'{name}: {status} вместо {expected}' for name, status, expected in errors
+            ))
+        if regressions:
+            raise CommandError('Превышен бюджет запросов: ' + '; '.join(
+                f'{name}: {before} -> {after}' for name, before, after in regressions
+            ))
+        self.stdout.write(self.style.SUCCESS('Число запросов не зависит от объема данных'))
@@ -0,0 +1,38 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hotel import queryplans
+
+
+class Command(BaseCommand):
+    help = ('Проверяет по EXPLAIN, что горячие запросы используют индексы, на сгенерированном '
+            'объеме данных (данные откатываются). Завершается ошибкой при последовательном сканировании.')
+
+    def add_arguments(self, parser):
+        for name, value in queryplans.VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=value)
+        parser.add_argument('--no-seed', action='store_true', help='Проверить на текущих данных без генерации')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        failures = []
+        with transaction.atomic():
+            if not options['no_seed']:
+                volumes = {name: options[name] for name in queryplans.VOLUMES}
+                queryplans.seed(volumes, random.Random(options['seed']))
+            queryplans.prepare()
+
+            for title, plan, table_scan in queryplans.plans():
+                if table_scan:
+                    failures.append(title)
+                    self.stdout.write(self.style.ERROR(f'SEQ SCAN  {title}'))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'INDEX     {title}'))
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'Последовательное сканирование в запросах: {", ".join(failures)}')
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from hotel import export
+
+
+def _date(value):
+    if value is None:
+        return None
+    try:
+        result = parse_date(value)
+    except ValueError:
+        result = None
+    if result is None:
+        raise CommandError(f'Неверная дата: {value} (ожидается ГГГГ-ММ-ДД)')
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка гостей, броней или оказанных услуг в CSV/JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(export.DATASETS))
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--from', dest='date_from', help='Начало периода, ГГГГ-ММ-ДД')
+        parser.add_argument('--to', dest='date_to', help='Конец периода, ГГГГ-ММ-ДД')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать вывод gzip')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+        parser.add_argument('-o', '--output', default='-', help='Файл вывода (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        chunks = export.stream(
+            options['dataset'], options['format'],
+            _date(options['date_from']), _date(options['date_to']),
+            compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+
+        started = time.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        self.stderr.write(f'Записано {written} байт за {time.perf_counter() - started:.1f} с')
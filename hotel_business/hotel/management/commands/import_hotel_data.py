@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hotel import importer
+
+# Сколько ошибок строк выводить подробно
+MAX_ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = 'Загрузка категорий, предметов, оснащения, номеров или гостей из CSV/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(importer.IMPORTERS))
+        parser.add_argument('path', help='Файл .csv или .jsonl (можно сжатый .gz)')
+        parser.add_argument('--batch-size', type=int, default=importer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        loader = importer.IMPORTERS[options['kind']](batch_size=options['batch_size'])
+        try:
+            result = loader.run(importer.read_rows(options['path']))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Не удалось прочитать {options["path"]}: {e}')
+
+        for line, message in result.errors[:MAX_ERRORS_SHOWN]:
+            self.stderr.write(f'Строка {line}: {message}')
+        if len(result.errors) > MAX_ERRORS_SHOWN:
+            self.stderr.write(f'... и еще {len(result.errors) - MAX_ERRORS_SHOWN} ошибок')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {result.rows}, создано: {result.created}, дубликатов: {result.skipped}, '
+            f'ошибок: {len(result.errors)} за {result.elapsed:.1f} с ({result.rate:.0f} строк/с)'
+        ))
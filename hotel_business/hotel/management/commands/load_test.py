@@ -0,0 +1,116 @@
+import contextlib
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404
+
+from hotel import loadtest, querybudget
+from hotel.models import CustomUser
+
+DEFAULT_PATHS = ['/', '/manager/', '/manager/rooms/', '/manager/services/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение запросов в секунду и задержки WSGI- и ASGI-развертываний. '
+        'Пример: gunicorn hotel_business.wsgi -w 4 -b :8000 и '
+        'uvicorn hotel_business.asgi:application --workers 4 --port 8001 на одной базе, затем '
+        'load_test --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001. '
+        'Без --target сравниваются обработчики WSGI и ASGI внутри процесса. '
+        'Страницы менеджера закрыты без входа: для них нужен --username.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', default=[], metavar='ИМЯ=URL',
+                            help='Развертывание для проверки по HTTP (можно несколько)')
+        parser.add_argument('--path', action='append', dest='paths', help='Страница (можно несколько)')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на страницу')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--username', help='Войти под этим пользователем (страницы менеджера)')
+        parser.add_argument('--password', help='Пароль для входа по HTTP')
+        parser.add_argument('--role', help='Роль пользователя для ожидаемых кодов ответа '
+                                           '(по умолчанию - роль пользователя в базе)')
+        parser.add_argument('--json', dest='json_path', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        user = self._user(options)
+        role = options['role'] or (user.role if user is not None else None)
+        if options['username'] and role is None:
+            raise CommandError(f'Пользователь {options["username"]} не найден в базе: укажите --role')
+        self._check_paths(paths, role)
+        targets = self._targets(options, user)
+
+        # Клиенты внутри процесса ходят с хостом testserver, которого нет в ALLOWED_HOSTS
+        in_process = contextlib.nullcontext() if options['target'] else querybudget.allow_test_host()
+
+        results = []
+        self.stdout.write(f"{'цель':<8} {'страница':<28} {'запр/с':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ошибок':>7}")
+        with in_process:
+            for path in paths:
+                for target in targets:
+                    # Прогрев: первые запросы заполняют кеши и открывают соединения
+                    target.run(path, min(options['concurrency'], options['requests']), options['concurrency'])
+                    result = target.run(path, options['requests'], options['concurrency'])
+                    row = result.as_dict()
+                    results.append(row)
+                    self.stdout.write(
+                        f"{row['target']:<8} {path:<28} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+                        f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>7}"
+                    )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+        failed = sorted({f"{row['target']} {row['path']}" for row in results if not row['requests']})
+        if failed:
+            raise CommandError('Ни одного успешного ответа: ' + ', '.join(failed))
+        unexpected = [
+            f"{row['target']} {row['path']}: "
+            + ', '.join(f'{status} x{count}' for status, count in row['unexpected'].items())
+            for row in results if row['unexpected']
+        ]
+        if unexpected:
+            raise CommandError('Неожиданные коды ответа: ' + '; '.join(unexpected))
+
+    @staticmethod
+    def _user(options):
+        if not options['username']:
+            return None
+        user = CustomUser.objects.filter(username=options['username']).first()
+        if user is None and not options['target']:
+            raise CommandError(f'Пользователь {options["username"]} не найден')
+        return user
+
+    @staticmethod
+    def _check_paths(paths, role):
+        """Страница должна отвечать 200: иначе измерялось бы перенаправление на вход"""
+        for path in paths:
+            try:
+                expected = loadtest.expected_status(path, role)
+            except Resolver404:
+                raise CommandError(f'{path}: страница не найдена')
+            if expected == 302:
+                who = f'для роли {role}' if role else 'без входа'
+                raise CommandError(f'{path}: страница закрыта {who} - укажите --username с доступом к ней')
+            if expected != 200:
+                raise CommandError(f'{path}: на GET страница отвечает {expected}')
+
+    def _targets(self, options, user):
+        if options['target']:
+            targets = []
+            for spec in options['target']:
+                name, sep, url = spec.partition('=')
+                if not sep or not url:
+                    raise CommandError(f'--target ожидается в виде ИМЯ=URL, получено: {spec}')
+                target = loadtest.HttpTarget(name, url)
+                if options['username']:
+                    try:
+                        target.login(options['username'], options['password'] or '')
+                    except (ValueError, OSError) as e:
+                        raise CommandError(str(e))
+                targets.append(target)
+            return targets
+
+        return [loadtest.WsgiTarget(user), loadtest.AsgiTarget(user)]
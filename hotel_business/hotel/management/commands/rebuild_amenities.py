@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hotel import amenities
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает индекс оснащения категорий (Category.amenities) по таблице Equipment'
+
+    def handle(self, *args, **options):
+        changed = amenities.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено категорий: {changed}'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hotel import occupancy
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобирает таблицу занятости номеров по ночам (RoomNight)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=occupancy.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = occupancy.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано ночей: {total} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from hotel import pricing
+from hotel.models import Reservation
+
+
+def _date(value):
+    try:
+        result = parse_date(value)
+    except ValueError:
+        result = None
+    if result is None:
+        raise CommandError(f'Неверная дата: {value} (ожидается ГГГГ-ММ-ДД)')
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет стоимости броней по текущим ценам категорий и тарифам. Без --status и --from '
+        'пересчитываются только активные брони, проживание по которым еще не закончилось; '
+        'завершенные брони - только при явном --status или --from.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Брони с заездом не раньше, ГГГГ-ММ-ДД')
+        parser.add_argument('--to', dest='date_to', help='Брони с заездом не позже, ГГГГ-ММ-ДД')
+        parser.add_argument('--status', action='append', choices=['active', 'completed', 'cancelled'],
+                            help='Статусы броней (при --from без --status - все, кроме отмененных)')
+        parser.add_argument('--batch-size', type=int, default=pricing.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать изменения')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            reservations = Reservation.objects.filter(status__in=options['status'])
+        elif options['date_from']:
+            reservations = Reservation.objects.exclude(status='cancelled')
+        else:
+            reservations = pricing.open_reservations()
+        for name, lookup in (('date_from', 'arrivaldate__gte'), ('date_to', 'arrivaldate__lte')):
+            if options[name]:
+                reservations = reservations.filter(**{lookup: _date(options[name])})
+
+        started = time.perf_counter()
+        seen, changed = pricing.reprice(reservations, options['batch_size'], options['dry_run'])
+        verb = 'Изменится' if options['dry_run'] else 'Изменено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Броней: {seen}, {verb.lower()} цен: {changed} за {time.perf_counter() - started:.1f} с'
+        ))
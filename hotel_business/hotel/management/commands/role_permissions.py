@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLPattern, get_resolver
+
+from hotel import permissions
+from hotel.models import CustomUser, RolePermission
+
+
+class Command(BaseCommand):
+    help = ('Доступ ролей к страницам: без параметров - таблица маршрутов и ролей; '
+            '--grant/--revoke РОЛЬ МАРШРУТ меняют доступ без перезапуска сервера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grant', nargs=2, metavar=('ROLE', 'URL_NAME'), action='append', default=[])
+        parser.add_argument('--revoke', nargs=2, metavar=('ROLE', 'URL_NAME'), action='append', default=[])
+
+    def handle(self, *args, **options):
+        url_names = [pattern.name for pattern in get_resolver().url_patterns
+                     if isinstance(pattern, URLPattern) and pattern.name]
+        roles = dict(CustomUser.ROLE_CHOICES)
+        for role, url_name in options['grant'] + options['revoke']:
+            if role not in roles:
+                raise CommandError(f'Неизвестная роль {role}; допустимые: {", ".join(roles)}')
+            if url_name not in url_names:
+                raise CommandError(f'Неизвестный маршрут {url_name}')
+
+        for role, url_name in options['grant']:
+            _, created = RolePermission.objects.get_or_create(role=role, url_name=url_name)
+            self.stdout.write(f'{role} -> {url_name}: ' + ('выдан' if created else 'уже был'))
+        for role, url_name in options['revoke']:
+            deleted = RolePermission.objects.filter(role=role, url_name=url_name).delete()[0]
+            self.stdout.write(f'{role} -> {url_name}: ' + ('отозван' if deleted else 'не был выдан'))
+
+        public = permissions.public_url_names()
+        permission_map = permissions.get_map()
+        for url_name in url_names:
+            if url_name in public:
+                allowed = 'все (публичный)'
+            else:
+                allowed = ', '.join(sorted(permission_map.get(url_name, ()))) or 'никто'
+            self.stdout.write(f'{url_name:<24} {allowed}')
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from hotel import reporting
+
+
+def _date(value):
+    if value is None:
+        return None
+    try:
+        result = parse_date(value)
+    except ValueError:
+        result = None
+    if result is None:
+        raise CommandError(f'Неверная дата: {value} (ожидается ГГГГ-ММ-ДД)')
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Пересчет суточных сводок DailyStats за измененные дни (или полностью с --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать всю историю (после массовых загрузок в обход сигналов)')
+        parser.add_argument('--from', dest='date_from', help='Начало периода для --full, ГГГГ-ММ-ДД')
+        parser.add_argument('--to', dest='date_to', help='Конец периода для --full, ГГГГ-ММ-ДД')
+        parser.add_argument('--limit', type=int, help='Не больше стольких дней за запуск')
+        parser.add_argument('--verify', action='store_true',
+                            help='После пересчета сверить сводки с прямым пересчетом по броням и услугам')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['full']:
+            days, rows = reporting.rebuild(_date(options['date_from']), _date(options['date_to']))
+        else:
+            days, rows = reporting.process_dirty(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано дней: {days}, строк сводки: {rows} за {time.perf_counter() - started:.1f} с'
+        ))
+
+        if options['verify']:
+            problems = reporting.verify()
+            for problem in problems:
+                self.stderr.write(problem)
+            if problems:
+                raise CommandError(f'Сводки расходятся с прямым пересчетом: {len(problems)}')
+            self.stdout.write(self.style.SUCCESS('Сводки совпадают с прямым пересчетом'))
@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+
+from hotel import datagen
+from hotel.booking import BookingError, book_room, overlapping_reservations
+from hotel.models import Category, CustomUser, Document, Reservation
+
+
+class Command(BaseCommand):
+    help = 'Параллельные брони нескольких номеров: проверка отсутствия пересечений и задержек'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--rooms', type=int, default=5,
+                            help='Мало номеров и узкое окно дат - больше конкурирующих броней')
+        parser.add_argument('--days', type=int, default=30, help='Ширина окна дат заезда')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Не удалять сгенерированные данные')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write(self.style.WARNING(
+                'SQLite не поддерживает SELECT ... FOR UPDATE и блокирует базу целиком - '
+                'ожидаются ошибки "database is locked". Запускайте на PostgreSQL.'
+            ))
+
+        rng = random.Random(options['seed'])
+        rooms = datagen.create_rooms(options['rooms'], rng=rng)
+        guests = datagen.create_guests(options['threads'], prefix='stress', rng=rng)
+        start = date.today() + timedelta(days=365)
+
+        requests = []
+        for _ in range(options['bookings']):
+            arrival = start + timedelta(days=rng.randint(0, options['days']))
+            requests.append((
+                rng.choice(guests),
+                rng.choice(rooms).pk,
+                arrival,
+                arrival + timedelta(days=rng.randint(1, 5)),
+            ))
+
+        outcomes = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        def attempt(request):
+            guest, number_id, arrival, departure = request
+            started = time.perf_counter()
+            try:
+                book_room(guest, number_id, arrival, departure)
+                outcome = 'booked'
+            except BookingError:
+                outcome = 'conflict'
+            except DatabaseError:
+                outcome = 'db_error'
+            finally:
+                connections.close_all()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                outcomes[outcome] += 1
+                latencies.append(elapsed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(attempt, requests))
+        wall = time.perf_counter() - started
+
+        room_ids = [room.pk for room in rooms]
+        overlaps = overlapping_reservations(
+            Reservation.objects.filter(numberid__in=room_ids)
+        ).count()
+
+        latencies.sort()
+        self.stdout.write(
+            f"Запросов: {len(requests)}, потоков: {options['threads']}, время: {wall:.2f} с "
+            f"({len(requests) / wall:.1f} запр/с)"
+        )
+        self.stdout.write(
+            f"Создано: {outcomes['booked']}, отказов по занятости: {outcomes['conflict']}, "
+            f"ошибок БД: {outcomes['db_error']}"
+        )
+        self.stdout.write(
+            f'Задержка, мс: p50={self._percentile(latencies, 0.50):.1f} '
+            f'p95={self._percentile(latencies, 0.95):.1f} p99={self._percentile(latencies, 0.99):.1f}'
+        )
+
+        if not options['keep']:
+            documents = [guest.documentid_id for guest in guests]
+            # Номера и брони удаляются каскадно вместе с категориями
+            Category.objects.filter(pk__in={room.categoryid_id for room in rooms}).delete()
+            CustomUser.objects.filter(guest_profile__in=guests).delete()
+            Document.objects.filter(pk__in=documents).delete()
+
+        if overlaps:
+            raise CommandError(f'Обнаружены пересекающиеся брони: {overlaps}')
+        self.stdout.write(self.style.SUCCESS('Пересечений броней нет'))
+
+    @staticmethod
+    def _percentile(values, fraction):
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * fraction))]
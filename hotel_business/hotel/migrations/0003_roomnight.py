@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+
+def fill_room_nights(apps, schema_editor):
+    Reservation = apps.get_model('hotel', 'Reservation')
+    RoomNight = apps.get_model('hotel', 'RoomNight')
+    batch = []
+    for reservation in Reservation.objects.filter(status='active').iterator(chunk_size=5000):
+        day = reservation.arrivaldate
+        while day < reservation.departuredate:
+            batch.append(RoomNight(numberid_id=reservation.numberid_id, reservationid_id=reservation.pk, date=day))
+            day += timedelta(days=1)
+        if len(batch) >= 5000:
+            RoomNight.objects.bulk_create(batch)
+            batch = []
+    RoomNight.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0002_reservation_active_dates_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('numberid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel.number')),
+                ('reservationid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel.reservation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'numberid'], name='roomnight_date_room_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomnight',
+            constraint=models.UniqueConstraint(fields=('reservationid', 'date'), name='roomnight_reservation_date_uniq'),
+        ),
+        migrations.RunPython(fill_room_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    """Понятная ошибка вместо IntegrityError, если в базе уже есть дубликаты"""
+    Guest = apps.get_model('hotel', 'Guest')
+    Document = apps.get_model('hotel', 'Document')
+    problems = []
+
+    phones = (Guest.objects.values('phonenumber').annotate(n=Count('id')).filter(n__gt=1)
+              .values_list('phonenumber', flat=True)[:20])
+    if phones:
+        problems.append(f"телефоны гостей: {', '.join(map(str, phones))}")
+
+    documents = (Document.objects.values('series', 'number').annotate(n=Count('id')).filter(n__gt=1)
+                 .values_list('series', 'number')[:20])
+    if documents:
+        problems.append(f"документы: {', '.join(f'{s} {n}' for s, n in documents)}")
+
+    if problems:
+        raise RuntimeError('Перед миграцией устраните дубликаты - ' + '; '.join(problems))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0003_roomnight'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='guest',
+            name='phonenumber',
+            field=models.IntegerField(unique=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='document',
+            unique_together={('series', 'number')},
+        ),
+        migrations.AddIndex(
+            model_name='number',
+            index=models.Index(fields=['bedcount', 'is_available'], name='number_bedcount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status'], name='reservation_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name'], name='service_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceprovision',
+            index=models.Index(fields=['-dateofserviceprovision'], name='provision_date_idx'),
+        ),
+    ]
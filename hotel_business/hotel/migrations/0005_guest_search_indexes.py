@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+# Индексы только для PostgreSQL: выражения совпадают с SQL, который Django
+# строит для icontains (UPPER(...) LIKE) и SearchVector('fullname', config='simple')
+POSTGRES_INDEXES = [
+    ('guest_fullname_trgm_idx', 'hotel_guest', 'gin (UPPER(fullname::text) gin_trgm_ops)'),
+    ('customuser_username_trgm_idx', 'hotel_customuser', 'gin (UPPER(username::text) gin_trgm_ops)'),
+    ('customuser_email_trgm_idx', 'hotel_customuser', 'gin (UPPER(email::text) gin_trgm_ops)'),
+    ('guest_fullname_fts_idx', 'hotel_guest', "gin (to_tsvector('simple'::regconfig, COALESCE(fullname::text, '')))"),
+]
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, definition in POSTGRES_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING {definition}')
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0004_query_indexes_and_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['number'], name='document_number_idx'),
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0005_guest_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('rooms_available', models.IntegerField(default=0)),
+                ('rooms_sold', models.IntegerField(default=0)),
+                ('room_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('services_sold', models.IntegerField(default=0)),
+                ('service_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('categoryid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hotel.category')),
+                ('serviceid', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='hotel.service')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'categoryid'], name='dailystats_date_category_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('serviceid__isnull', True)), fields=('date', 'categoryid'), name='dailystats_room_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('serviceid__isnull', False)), fields=('date', 'categoryid', 'serviceid'), name='dailystats_service_uniq'),
+        ),
+    ]
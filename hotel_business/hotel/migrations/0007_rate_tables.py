@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0006_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeasonalRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('startdate', models.DateField()),
+                ('enddate', models.DateField()),
+                ('multiplier', models.DecimalField(decimal_places=3, max_digits=5)),
+                ('categoryid', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='hotel.category')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WeekdayRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, 'Понедельник'), (1, 'Вторник'), (2, 'Среда'), (3, 'Четверг'), (4, 'Пятница'), (5, 'Суббота'), (6, 'Воскресенье')])),
+                ('multiplier', models.DecimalField(decimal_places=3, max_digits=5)),
+                ('categoryid', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='hotel.category')),
+            ],
+            options={
+                'unique_together': {('categoryid', 'weekday')},
+            },
+        ),
+    ]
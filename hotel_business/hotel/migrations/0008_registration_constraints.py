@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:44
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+
+def check_duplicates(apps, schema_editor):
+    """Понятная ошибка вместо IntegrityError, если в базе уже есть дубликаты"""
+    CustomUser = apps.get_model('hotel', 'CustomUser')
+    problems = []
+
+    usernames = (CustomUser.objects.annotate(name=Lower('username')).values('name').annotate(n=Count('id'))
+                 .filter(n__gt=1).values_list('name', flat=True)[:20])
+    if usernames:
+        problems.append(f"логины (без учета регистра): {', '.join(usernames)}")
+
+    emails = (CustomUser.objects.exclude(email='').values('email').annotate(n=Count('id'))
+              .filter(n__gt=1).values_list('email', flat=True)[:20])
+    if emails:
+        problems.append(f"email: {', '.join(emails)}")
+
+    if problems:
+        raise RuntimeError('Перед миграцией устраните дубликаты - ' + '; '.join(problems))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0007_rate_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='customuser_username_ci_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('email', ''), _negated=True), fields=('email',), name='customuser_email_unique'),
+        ),
+    ]
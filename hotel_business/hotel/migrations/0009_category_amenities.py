@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:47
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_amenities(apps, schema_editor):
+    Category = apps.get_model('hotel', 'Category')
+    Equipment = apps.get_model('hotel', 'Equipment')
+    items = defaultdict(list)
+    for category_id, item_id in Equipment.objects.order_by('itemid_id').values_list('categoryid_id', 'itemid_id'):
+        items[category_id].append(item_id)
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.amenities = items.get(category.pk, [])
+    Category.objects.bulk_update(categories, ['amenities'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0008_registration_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='amenities',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(fill_amenities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+# Доступ, который раньше задавали декораторы admin_required, manager_required и
+# client_required, плюс страницы менеджера, которые были открыты всем
+STAFF_PAGES = [
+    'manager_dashboard', 'manager_guests', 'manager_services', 'manager_rooms', 'manager_assignment',
+    'create_booking', 'bulk_assign_services', 'export_data', 'manager_reports', 'manager_folios',
+]
+
+INITIAL_PERMISSIONS = (
+    [('admin', 'admin_dashboard')]
+    + [(role, name) for role in ('admin', 'manager') for name in STAFF_PAGES]
+    + [(role, 'client_dashboard') for role in ('admin', 'manager', 'client')]
+)
+
+
+def grant_initial(apps, schema_editor):
+    RolePermission = apps.get_model('hotel', 'RolePermission')
+    RolePermission.objects.bulk_create(
+        [RolePermission(role=role, url_name=name) for role, name in INITIAL_PERMISSIONS],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0009_category_amenities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('admin', 'Администратор'), ('manager', 'Менеджер'), ('client', 'Клиент'), ('guest', 'Гость')], max_length=10)),
+                ('url_name', models.CharField(max_length=100)),
+            ],
+            options={
+                'unique_together': {('role', 'url_name')},
+            },
+        ),
+        migrations.RunPython(grant_initial, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.db.models import ForeignKey
+from django.db.models import ForeignKey, Q
+from django.db.models.functions import Lower
 
 
 class CustomUser(AbstractUser):
@@ -16,10 +17,29 @@ class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     date_of_birth = models.DateField(blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Регистрация проверяет уникальность этими ограничениями (registration.py)
+            models.UniqueConstraint(Lower('username'), name='customuser_username_ci_unique'),
+            models.UniqueConstraint(fields=['email'], condition=~Q(email=''), name='customuser_email_unique'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
 
+class RolePermission(models.Model):
+    """Доступ роли к странице по имени маршрута (проверяется permissions.PermissionMiddleware)"""
+    role = models.CharField(max_length=10, choices=CustomUser.ROLE_CHOICES)
+    url_name = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = (('role', 'url_name'),)
+
+    def __str__(self):
+        return f"{self.get_role_display()}: {self.url_name}"
+
+
 class Document(models.Model):
     """Модель документа, удостоверяющего личность гостя (паспорт и т.д.)"""
     series = models.IntegerField()
@@ -27,6 +47,13 @@ class Document(models.Model):
     dateofissue = models.DateField()
     whoissued = models.CharField(max_length=255)
 
+    class Meta:
+        unique_together = (('series', 'number'),)
+        indexes = [
+            # Поиск гостя по префиксу номера документа (см. search.py)
+            models.Index(fields=['number'], name='document_number_idx'),
+        ]
+
     def __str__(self):
         return f"{self.series} {self.number}"
 
@@ -36,11 +63,48 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=9, decimal_places=2)
     description = models.TextField()
+    # Отсортированные id предметов оснащения (Equipment) - пересчитывается amenities.rebuild
+    amenities = models.JSONField(default=list, blank=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
+class SeasonalRate(models.Model):
+    """Сезонный коэффициент цены номера на период (категория не указана - для всех категорий)"""
+    name = models.CharField(max_length=100)
+    categoryid = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    startdate = models.DateField()
+    enddate = models.DateField()
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3)
+
+    def __str__(self):
+        return f"{self.name}: {self.startdate} - {self.enddate} ×{self.multiplier}"
+
+
+class WeekdayRate(models.Model):
+    """Коэффициент цены номера по дню недели (0 - понедельник)"""
+    WEEKDAY_CHOICES = (
+        (0, 'Понедельник'),
+        (1, 'Вторник'),
+        (2, 'Среда'),
+        (3, 'Четверг'),
+        (4, 'Пятница'),
+        (5, 'Суббота'),
+        (6, 'Воскресенье'),
+    )
+
+    categoryid = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    weekday = models.IntegerField(choices=WEEKDAY_CHOICES)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3)
+
+    class Meta:
+        unique_together = (('categoryid', 'weekday'),)
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} ×{self.multiplier}"
+
+
 class Item(models.Model):
     """Модель предмета/оборудования в номере (телевизор, холодильник и т.д.)"""
     name = models.CharField(max_length=100)
@@ -57,6 +121,11 @@ class Number(models.Model):
     categoryid = models.ForeignKey(Category, on_delete=models.CASCADE)
     is_available = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['bedcount', 'is_available'], name='number_bedcount_idx'),
+        ]
+
     def __str__(self):
         return f"Номер {self.id} - {self.floor} этаж"
 
@@ -74,7 +143,7 @@ class Guest(models.Model):
     """Модель гостя отеля"""
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='guest_profile')
     fullname = models.CharField(max_length=255)
-    phonenumber = models.IntegerField()
+    phonenumber = models.IntegerField(unique=True)
     dateofbirth = models.DateField()
     documentid = models.ForeignKey(Document, on_delete=models.CASCADE)
     discount = models.DecimalField(max_digits=3, decimal_places=2)
@@ -92,11 +161,17 @@ class Service(models.Model):
     description = models.TextField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='service_active_name_idx', condition=models.Q(is_active=True)),
+        ]
+
     def __str__(self):
         return self.name
 
     def discount_price(self, x):
-        return self.price * (1 - x.discount)
+        from .pricing import apply_discount
+        return apply_discount(self.price, x.discount)
 
 class Reservation(models.Model):
     """Модель бронирования номера"""
@@ -113,6 +188,17 @@ class Reservation(models.Model):
         ('cancelled', 'Отменено'),
     ))
 
+    class Meta:
+        indexes = [
+            # Поиск пересечений интервалов дат по номеру (см. availability.py)
+            models.Index(
+                fields=['numberid', 'arrivaldate', 'departuredate'],
+                name='reservation_active_dates_idx',
+                condition=models.Q(status='active'),
+            ),
+            models.Index(fields=['status'], name='reservation_status_idx'),
+        ]
+
     def __str__(self):
         return f"Бронь #{self.id} - {self.clientid}"
 
@@ -124,5 +210,68 @@ class ServiceProvision(models.Model):
     quantity = models.IntegerField()
     dateofserviceprovision = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-dateofserviceprovision'], name='provision_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.serviceid} для {self.reservationid}"
+
+class RoomNight(models.Model):
+    """Занятость номера по ночам: одна строка на каждую ночь активной брони (см. occupancy.py)"""
+    numberid = models.ForeignKey(Number, on_delete=models.CASCADE)
+    reservationid = models.ForeignKey(Reservation, on_delete=models.CASCADE)
+    date = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'numberid'], name='roomnight_date_room_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['reservationid', 'date'], name='roomnight_reservation_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Номер {self.numberid_id} занят {self.date}"
+
+
+class DailyStats(models.Model):
+    """
+    Суточная сводка для отчетов (см. reporting.py). Строка номеров - дата и
+    категория (serviceid пуст), строка услуг - дата, категория номера и услуга.
+    """
+    date = models.DateField()
+    categoryid = models.ForeignKey(Category, on_delete=models.CASCADE)
+    serviceid = models.ForeignKey(Service, on_delete=models.CASCADE, null=True, blank=True)
+    rooms_available = models.IntegerField(default=0)
+    rooms_sold = models.IntegerField(default=0)
+    room_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    services_sold = models.IntegerField(default=0)
+    service_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'categoryid'], name='dailystats_date_category_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'categoryid'], name='dailystats_room_uniq',
+                condition=models.Q(serviceid__isnull=True),
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'categoryid', 'serviceid'], name='dailystats_service_uniq',
+                condition=models.Q(serviceid__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Сводка за {self.date} ({self.categoryid_id}/{self.serviceid_id})"
+
+
+class DirtyDay(models.Model):
+    """День, сводку за который нужно пересчитать (заполняется сигналами, см. reporting.py)"""
+    date = models.DateField(unique=True)
+
     def __str__(self):
-        return f"{self.serviceid} для {self.reservationid}"
\ No newline at end of file
+        return f"Пересчитать {self.date}"
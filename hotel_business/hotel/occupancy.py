@@ -0,0 +1,85 @@
+# occupancy.py
+"""
+Поддержка таблицы RoomNight - занятости номеров по ночам.
+
+Таблица обновляется инкрементально сигналом post_save брони (signals.py),
+удаление брони каскадно удаляет ее ночи. Массовые операции в обход
+сигналов (queryset.update, bulk_create) требуют пересборки командой
+rebuild_occupancy.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import caching
+from .models import Number, Reservation, RoomNight
+
+BATCH_SIZE = 5000
+
+# Поля брони, от которых зависит занятость
+TRACKED_FIELDS = frozenset({'numberid', 'arrivaldate', 'departuredate', 'status'})
+
+
+def iter_nights(arrival, departure):
+    """Ночи проживания: с даты заезда включительно до даты выезда"""
+    day = arrival
+    while day < departure:
+        yield day
+        day += timedelta(days=1)
+
+
+def build_nights(reservation, model=RoomNight):
+    """Несохраненные строки занятости для брони (пусто для неактивной брони)"""
+    if reservation.status != 'active':
+        return []
+    return [
+        model(numberid_id=reservation.numberid_id, reservationid_id=reservation.pk, date=day)
+        for day in iter_nights(reservation.arrivaldate, reservation.departuredate)
+    ]
+
+
+@transaction.atomic
+def sync_reservation(reservation):
+    """Приводит ночи брони в соответствие с ее текущими датами, номером и статусом"""
+    RoomNight.objects.filter(reservationid_id=reservation.pk).delete()
+    RoomNight.objects.bulk_create(build_nights(reservation))
+
+
+def rebuild(batch_size=BATCH_SIZE, reservation_model=Reservation, room_night_model=RoomNight):
+    """Полная пересборка таблицы пачками bulk_create. Возвращает число строк"""
+    total = 0
+    with transaction.atomic():
+        room_night_model.objects.all().delete()
+        reservations = (
+            reservation_model.objects.filter(status='active')
+            .only('id', 'numberid_id', 'arrivaldate', 'departuredate', 'status')
+            .iterator(chunk_size=batch_size)
+        )
+        batch = []
+        for reservation in reservations:
+            batch.extend(build_nights(reservation, model=room_night_model))
+            if len(batch) >= batch_size:
+                room_night_model.objects.bulk_create(batch, batch_size=batch_size)
+                total += len(batch)
+                batch = []
+        if batch:
+            room_night_model.objects.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+    # bulk_create не отправляет сигналы - закешированная занятость сбрасывается явно
+    caching.bump('occupancy')
+    return total
+
+
+def occupied_rooms(date=None):
+    """Занятые на ночь номера - точечный поиск по индексу (date, numberid)"""
+    date = date or timezone.now().date()
+    return RoomNight.objects.filter(date=date).values('numberid')
+
+
+def free_rooms_on(date=None):
+    """Номера в эксплуатации, свободные на указанную ночь"""
+    date = date or timezone.now().date()
+    taken = RoomNight.objects.filter(date=date, numberid=OuterRef('pk'))
+    return Number.objects.filter(is_available=True).filter(~Exists(taken))
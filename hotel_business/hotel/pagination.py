@@ -0,0 +1,228 @@
+# pagination.py
+"""
+Keyset-пагинация: следующая страница ищется условием «после последней строки»
+по ключу сортировки, а не OFFSET, поэтому любая страница стоит как первая.
+"""
+import base64
+import hashlib
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Q
+
+from . import caching
+
+DEFAULT_PER_PAGE = 24
+
+# Время жизни закешированного количества строк, секунды
+COUNT_CACHE_TIMEOUT = 60
+
+# Для таблиц больше этого на PostgreSQL берется оценка из статистики планировщика
+ESTIMATE_THRESHOLD = 10000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_cursor(direction, values):
+    payload = json.dumps([direction, values], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+class KeysetPage:
+    """Страница с объектами и курсорами соседних страниц (интерфейс близок к Page)"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки ordering, например ('-discount', 'id').
+    Последнее поле должно быть уникальным, чтобы ключ однозначно задавал позицию.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Аннотация (например, ранг поиска)
+            return value
+        return field.to_python(value)
+
+    def _key(self, obj):
+        values = []
+        for name in self.fields:
+            value = getattr(obj, name)
+            if isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        return json.loads(json.dumps(values, default=str))
+
+    def _after(self, values, reverse):
+        """Условие «строго после ключа values» в порядке ordering (или обратном)"""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            value = self._to_python(field, value)
+            condition |= equal & Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _query(self, cursor):
+        """Запрос строк страницы (на одну больше per_page), направление и ключ курсора"""
+        direction, values = 'next', None
+        if cursor:
+            direction, values = _decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+
+        reverse = direction == 'prev'
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset[:self.per_page + 1], reverse, values
+
+    def _build(self, rows, reverse, values):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage([], None, None)
+
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows,
+            _encode_cursor('next', self._key(rows[-1])) if has_next else None,
+            _encode_cursor('prev', self._key(rows[0])) if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        queryset, reverse, values = self._query(cursor)
+        return self._build(list(queryset), reverse, values)
+
+    async def apage(self, cursor=None):
+        queryset, reverse, values = self._query(cursor)
+        return self._build([obj async for obj in queryset], reverse, values)
+
+
+def paginate(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """Страница по параметру ?cursor=...; битый курсор открывает первую страницу"""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return paginator.page(request.GET.get('cursor'))
+    except (InvalidCursor, ValueError):
+        return paginator.page()
+
+
+async def apaginate(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """Асинхронный paginate для async-представлений"""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return await paginator.apage(request.GET.get('cursor'))
+    except (InvalidCursor, ValueError):
+        return await paginator.apage()
+
+
+def estimated_count(model):
+    """Оценка числа строк таблицы из статистики PostgreSQL или None"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    if not row or row[0] < ESTIMATE_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+def _count_namespaces(queryset, namespaces):
+    label = queryset.model._meta.label_lower
+    return label, namespaces or caching.MODEL_NAMESPACES.get(label, ()) or label
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT, namespaces=None):
+    """
+    Количество строк запроса без COUNT на каждый запрос страницы: для
+    нефильтрованной большой таблицы - оценка планировщика, иначе COUNT,
+    закешированный по тексту запроса. Изменение модели сбрасывает кеш
+    через версию ее пространства имен (caching.MODEL_NAMESPACES); запрос,
+    зависящий от других таблиц, передает их пространства в namespaces.
+    """
+    query = queryset.query
+    if not query.where:
+        estimate = estimated_count(queryset.model)
+        if estimate is not None:
+            return estimate
+
+    sql, params = query.sql_with_params()
+    digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    label, namespaces = _count_namespaces(queryset, namespaces)
+    return caching.get_or_set(namespaces, f'count:{label}:{digest}', queryset.count, timeout=timeout)
+
+
+async def acached_count(queryset, timeout=COUNT_CACHE_TIMEOUT, namespaces=None):
+    """Асинхронный cached_count: COUNT через async ORM, кеш - через асинхронный API"""
+    query = queryset.query
+    if not query.where:
+        estimate = await sync_to_async(estimated_count)(queryset.model)
+        if estimate is not None:
+            return estimate
+
+    sql, params = query.sql_with_params()
+    digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    label, namespaces = _count_namespaces(queryset, namespaces)
+    return await caching.aget_or_set(namespaces, f'count:{label}:{digest}', queryset.acount, timeout=timeout)
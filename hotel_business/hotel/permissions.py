@@ -0,0 +1,83 @@
+# permissions.py
+"""
+Доступ к страницам по ролям.
+
+Таблица RolePermission задает, каким ролям открыт маршрут (по имени из
+urls.py). PermissionMiddleware проверяет доступ один раз на запрос, до вызова
+представления: публичные маршруты (PUBLIC_URL_NAMES) пропускаются без
+обращения к пользователю, остальные открыты только ролям из таблицы. Новый
+маршрут закрыт, пока ему не выдан доступ (команда role_permissions или
+админка Django).
+
+Карта «маршрут -> роли» держится в памяти процесса и перечитывается, когда
+версия пространства кеша permissions изменилась (сигналы RolePermission) -
+проверка стоит одного чтения версии из кеша и поиска в словаре.
+
+Версию видят все процессы только при общем кеше (REDIS_URL): с кешем в
+памяти процесса сигнал сбрасывает карту лишь в том воркере, где изменили
+доступ, а остальные перечитывают ее по истечении PERMISSION_MAP_TIMEOUT.
+Поэтому без общего кеша этот срок в settings.py короткий.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.utils.deprecation import MiddlewareMixin
+
+from . import caching
+from .models import RolePermission
+
+NAMESPACE = 'permissions'
+
+DEFAULT_PUBLIC_URL_NAMES = ('services_list', 'room_search', 'room_search_api', 'login', 'logout', 'register')
+
+
+def public_url_names():
+    return frozenset(getattr(settings, 'PUBLIC_URL_NAMES', DEFAULT_PUBLIC_URL_NAMES))
+
+
+def _load():
+    roles = defaultdict(set)
+    for role, url_name in RolePermission.objects.values_list('role', 'url_name'):
+        roles[url_name].add(role)
+    return {url_name: frozenset(names) for url_name, names in roles.items()}
+
+
+# (версия пространства permissions, время загрузки, карта) в этом процессе
+_loaded = (None, 0.0, None)
+
+
+def map_timeout():
+    return getattr(settings, 'PERMISSION_MAP_TIMEOUT', caching.default_timeout())
+
+
+def get_map():
+    """{имя маршрута: frozenset(ролей)}; перечитывается при смене версии"""
+    global _loaded
+    current = caching.version(NAMESPACE)
+    version, loaded_at, permission_map = _loaded
+    if version != current or time.monotonic() - loaded_at >= map_timeout():
+        permission_map = _load()
+        _loaded = (current, time.monotonic(), permission_map)
+    return permission_map
+
+
+def is_allowed(role, url_name):
+    return role in get_map().get(url_name, ())
+
+
+class PermissionMiddleware(MiddlewareMixin):
+    """
+    Закрывает непубличные маршруты: анонимный пользователь или роль без
+    доступа перенаправляются на страницу входа (как user_passes_test).
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.view_name
+        if url_name in public_url_names():
+            return None
+        user = request.user
+        if user.is_authenticated and is_allowed(user.role, url_name):
+            return None
+        return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
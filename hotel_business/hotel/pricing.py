@@ -0,0 +1,286 @@
+# pricing.py
+"""
+Расчет цен: проживание по тарифам, скидки гостя, счет брони (folio).
+
+Вся арифметика - Decimal с округлением до копеек ROUND_HALF_UP: цена ночи
+= Category.price × сезонный коэффициент × коэффициент дня недели,
+округляется для каждой ночи, стоимость проживания - сумма ночей.
+
+RateTable загружает тарифы одним набором запросов и дальше считает без
+обращений к базе. Для пересчета тысяч броней (reprice) по каждой
+категории строятся накопленные суммы цен ночей, и стоимость брони -
+разность двух префиксов, независимо от длины проживания.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from . import reporting
+from .models import Category, Reservation, SeasonalRate, ServiceProvision, WeekdayRate
+
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+
+BATCH_SIZE = 2000
+
+
+def money(value):
+    """Округление до копеек"""
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def apply_discount(price, discount):
+    """Цена со скидкой discount (доля, например 0.15)"""
+    return money(Decimal(price) * (ONE - Decimal(discount or 0)))
+
+
+class RateTable:
+    """Снимок цен категорий и тарифных коэффициентов"""
+
+    def __init__(self, prices, seasons=(), weekdays=None):
+        # prices: {категория: цена}; seasons: [(категория|None, начало, конец, коэффициент)]
+        # weekdays: {(категория|None, день недели): коэффициент}
+        self.prices = prices
+        # Правило категории важнее общего, среди равных - с более поздним началом
+        self.seasons = sorted(seasons, key=lambda rule: (rule[0] is not None, rule[1]), reverse=True)
+        self.weekdays = weekdays or {}
+        self._nights = {}
+
+    @classmethod
+    def load(cls, category_ids=None, date_from=None, date_to=None):
+        """Тарифы из базы; можно ограничить категориями и периодом"""
+        categories = Category.objects.all()
+        seasons = SeasonalRate.objects.all()
+        weekdays = WeekdayRate.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+            seasons = seasons.filter(Q(categoryid__in=category_ids) | Q(categoryid__isnull=True))
+            weekdays = weekdays.filter(Q(categoryid__in=category_ids) | Q(categoryid__isnull=True))
+        if date_from is not None:
+            seasons = seasons.filter(enddate__gte=date_from)
+        if date_to is not None:
+            seasons = seasons.filter(startdate__lte=date_to)
+
+        return cls(
+            dict(categories.values_list('pk', 'price')),
+            list(seasons.values_list('categoryid', 'startdate', 'enddate', 'multiplier')),
+            {(category_id, weekday): multiplier
+             for category_id, weekday, multiplier in weekdays.values_list('categoryid', 'weekday', 'multiplier')},
+        )
+
+    def _season(self, category_id, day):
+        for rule_category, start, end, multiplier in self.seasons:
+            if rule_category in (category_id, None) and start <= day <= end:
+                return multiplier
+        return ONE
+
+    def _weekday(self, category_id, day):
+        weekday = day.weekday()
+        multiplier = self.weekdays.get((category_id, weekday))
+        if multiplier is None:
+            multiplier = self.weekdays.get((None, weekday), ONE)
+        return multiplier
+
+    def night_price(self, category_id, day):
+        """Цена ночи в категории (запомненная)"""
+        key = (category_id, day)
+        price = self._nights.get(key)
+        if price is None:
+            price = money(self.prices[category_id] * self._season(category_id, day) * self._weekday(category_id, day))
+            self._nights[key] = price
+        return price
+
+    def stay_price(self, category_id, arrival, departure):
+        """Стоимость проживания: сумма цен ночей с заезда до выезда"""
+        total = Decimal('0.00')
+        day = arrival
+        while day < departure:
+            total += self.night_price(category_id, day)
+            day += timedelta(days=1)
+        return total
+
+    def prefix_sums(self, category_id, first, last):
+        """Накопленные суммы цен ночей категории: sums[i] - стоимость ночей first..first+i-1"""
+        sums = [Decimal('0.00')]
+        day = first
+        while day < last:
+            sums.append(sums[-1] + self.night_price(category_id, day))
+            day += timedelta(days=1)
+        return sums
+
+
+def stay_price(category, arrival, departure):
+    """Стоимость проживания в категории по текущим тарифам"""
+    table = RateTable.load(category_ids=[category.pk], date_from=arrival, date_to=departure)
+    return table.stay_price(category.pk, arrival, departure)
+
+
+def stay_prices(stays, table=None):
+    """
+    Пакетный расчет: stays - список (ключ, категория, заезд, выезд),
+    результат - {ключ: стоимость}. Цена каждой ночи категории считается один
+    раз, стоимость проживания - разность накопленных сумм.
+    """
+    stays = list(stays)
+    if not stays:
+        return {}
+    if table is None:
+        table = RateTable.load(
+            category_ids={category_id for _, category_id, _, _ in stays},
+            date_from=min(arrival for _, _, arrival, _ in stays),
+            date_to=max(departure for _, _, _, departure in stays),
+        )
+
+    spans = defaultdict(lambda: [None, None])
+    for _, category_id, arrival, departure in stays:
+        span = spans[category_id]
+        span[0] = arrival if span[0] is None else min(span[0], arrival)
+        span[1] = departure if span[1] is None else max(span[1], departure)
+    sums = {category_id: (first, table.prefix_sums(category_id, first, last))
+            for category_id, (first, last) in spans.items()}
+
+    result = {}
+    for key, category_id, arrival, departure in stays:
+        first, prefix = sums[category_id]
+        result[key] = prefix[max((departure - first).days, 0)] - prefix[(arrival - first).days]
+    return result
+
+
+def open_reservations(today=None):
+    """Активные брони, проживание по которым еще не закончилось"""
+    today = today or timezone.now().date()
+    return Reservation.objects.filter(status='active', departuredate__gte=today)
+
+
+def reprice(reservations=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Пересчитывает Reservation.price по текущим тарифам пачками; по умолчанию -
+    только open_reservations(), цены завершенных броней не трогаются.
+    Возвращает (просмотрено, изменено). bulk_update не отправляет сигналы,
+    поэтому дни измененных броней отмечаются для сводок явно.
+    """
+    if reservations is None:
+        reservations = open_reservations()
+    rows = reservations.order_by('pk').values_list(
+        'pk', 'numberid__categoryid', 'arrivaldate', 'departuredate', 'price'
+    ).iterator(chunk_size=batch_size)
+
+    table = RateTable.load()
+    seen = updated = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            updated += _reprice_batch(batch, table, dry_run)
+            seen += len(batch)
+            batch = []
+    if batch:
+        updated += _reprice_batch(batch, table, dry_run)
+        seen += len(batch)
+    return seen, updated
+
+
+def _reprice_batch(rows, table, dry_run):
+    prices = stay_prices(((pk, category_id, arrival, departure) for pk, category_id, arrival, departure, _ in rows),
+                         table)
+    changed = [
+        Reservation(pk=pk, price=prices[pk], arrivaldate=arrival, departuredate=departure)
+        for pk, _, arrival, departure, price in rows
+        if prices[pk] != price
+    ]
+    if changed and not dry_run:
+        with transaction.atomic():
+            Reservation.objects.bulk_update(changed, ['price'])
+            reporting.mark_dirty(
+                day for reservation in changed
+                for day in reporting.stay_dates(reservation.arrivaldate, reservation.departuredate)
+            )
+    return len(changed)
+
+
+class Folio:
+    """Счет брони: проживание и оказанные услуги со скидкой гостя"""
+
+    def __init__(self, reservation, provisions):
+        self.reservation = reservation
+        self.discount = Decimal(reservation.clientid.discount or 0)
+        self.room_total = money(reservation.price)
+        self.lines = []
+        for provision in provisions:
+            service = provision.serviceid
+            unit_price = apply_discount(service.price, self.discount)
+            self.lines.append({
+                'provision': provision,
+                'service': service,
+                'date': provision.dateofserviceprovision,
+                'quantity': provision.quantity,
+                'base_price': money(service.price),
+                'unit_price': unit_price,
+                'total': money(unit_price * provision.quantity),
+            })
+        self.services_total = sum((line['total'] for line in self.lines), Decimal('0.00'))
+        self.total = self.room_total + self.services_total
+        self.paid = money(reservation.actuallypaid)
+        self.balance = self.total - self.paid
+
+
+def folio(reservation):
+    """Счет загруженной брони (clientid должен быть загружен); услуги - одним запросом"""
+    provisions = (
+        ServiceProvision.objects.filter(reservationid=reservation)
+        .select_related('serviceid').order_by('dateofserviceprovision', 'pk')
+    )
+    return Folio(reservation, provisions)
+
+
+MONEY_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+
+def service_charge(discount):
+    """
+    Сумма строки ServiceProvision в запросе, как в Folio: цена услуги со
+    скидкой discount (выражение), округленная до копеек, × количество
+    """
+    unit_price = Round(F('serviceid__price') * (Value(ONE) - discount), 2, output_field=MONEY_FIELD)
+    return ExpressionWrapper(unit_price * F('quantity'), output_field=MONEY_FIELD)
+
+
+def with_folio(reservations=None):
+    """
+    Брони с суммами счета, посчитанными в базе одним запросом:
+    room_charge (цена проживания), services_total (Σ количество × цена услуги
+    со скидкой гостя, цена за единицу округляется до копеек, как в Folio),
+    total, actuallypaid и balance. По умолчанию - активные брони.
+    """
+    if reservations is None:
+        reservations = Reservation.objects.filter(status='active')
+
+    services = (
+        ServiceProvision.objects.filter(reservationid=OuterRef('pk'))
+        .order_by().values('reservationid')
+        .annotate(total=Sum(service_charge(OuterRef('clientid__discount'))))
+        .values('total')
+    )
+    return (
+        reservations.select_related('clientid', 'numberid')
+        .annotate(
+            room_charge=F('price'),
+            services_total=Coalesce(Subquery(services, output_field=MONEY_FIELD), Value(Decimal('0.00')),
+                                    output_field=MONEY_FIELD),
+        )
+        .annotate(
+            total=ExpressionWrapper(F('room_charge') + F('services_total'), output_field=MONEY_FIELD),
+            balance=ExpressionWrapper(F('room_charge') + F('services_total') - F('actuallypaid'),
+                                      output_field=MONEY_FIELD),
+        )
+    )
+
+
+def guest_folios(guest):
+    """Счета всех неотмененных броней гостя"""
+    return with_folio(Reservation.objects.filter(clientid=guest).exclude(status='cancelled'))
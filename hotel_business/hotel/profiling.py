@@ -0,0 +1,244 @@
+# profiling.py
+"""
+Профилирование запросов (включается настройкой PROFILING_ENABLED).
+
+Для доли запросов PROFILING_SAMPLE_RATE ProfilingMiddleware измеряет
+общее время, время и число SQL-запросов, повторы SQL (один и тот же
+запрос много раз - признак N+1) и время рендеринга шаблонов.
+Результат пишется в лог hotel.profiling строкой JSON и в кольцевой буфер
+процесса, который показывается на панели администратора.
+
+SQL, выполнявшийся дольше PROFILING_SLOW_QUERY_MS, логируется для любого
+запроса (не только выбранного) вместе с именем view и стеком вызова.
+
+Текущий профиль хранится в contextvars: он виден и в потоках sync_to_async,
+поэтому асинхронные view измеряются так же, как обычные.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as BackendTemplate
+from django.utils import timezone
+
+logger = logging.getLogger('hotel.profiling')
+
+# Сколько повторяющихся SQL показывать в записи профиля
+TOP_REPEATED = 3
+
+# Глубина стека в логе медленного запроса
+STACK_DEPTH = 8
+
+_current = ContextVar('hotel_profile', default=None)
+_lock = threading.Lock()
+_profiles = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+_slow_queries = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+_installed = False
+
+
+class Profile:
+    """Измерения одного запроса"""
+
+    def __init__(self, request, sampled):
+        self.request = request
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.queries = Counter()
+
+    @property
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else None
+
+    def as_dict(self, response):
+        statements = Counter()
+        for (sql, _), count in self.queries.items():
+            statements[sql] += count
+        return {
+            'time': timezone.now().isoformat(timespec='seconds'),
+            'method': self.request.method,
+            'path': self.request.path,
+            'view': self.view_name,
+            'status': response.status_code,
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'db_ms': round(self.db_ms, 2),
+            'template_ms': round(self.template_ms, 2),
+            'queries': sum(self.queries.values()),
+            # Точные повторы: тот же SQL с теми же параметрами
+            'duplicates': sum(count - 1 for count in self.queries.values()),
+            # Один SQL с разными параметрами много раз - признак N+1
+            'repeated': [
+                {'sql': sql[:300], 'count': count}
+                for sql, count in statements.most_common(TOP_REPEATED) if count > 1
+            ],
+        }
+
+
+def _stack():
+    """Кадры стека из кода проекта (без Django и самого профилировщика)"""
+    base = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base) and not frame.filename.endswith('profiling.py')
+    ]
+    return [f'{frame.filename[len(base) + 1:]}:{frame.lineno} {frame.name}' for frame in frames[-STACK_DEPTH:]]
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        if profile.sampled:
+            profile.db_ms += elapsed
+            profile.queries[sql, repr(params)] += 1
+        if elapsed >= settings.PROFILING_SLOW_QUERY_MS:
+            _slow_query(profile, sql, elapsed)
+
+
+def _slow_query(profile, sql, elapsed):
+    entry = {
+        'time': timezone.now().isoformat(timespec='seconds'),
+        'view': profile.view_name,
+        'path': profile.request.path,
+        'ms': round(elapsed, 2),
+        'sql': sql[:1000],
+        'stack': _stack(),
+    }
+    with _lock:
+        _slow_queries.append(entry)
+    logger.warning('slow query %s', json.dumps(entry, ensure_ascii=False))
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+_render = BackendTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None or not profile.sampled:
+        return _render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _render(self, context, request)
+    finally:
+        profile.template_ms += (time.perf_counter() - started) * 1000
+
+
+def install():
+    """Подключает измерение SQL и шаблонов (один раз на процесс)"""
+    global _installed
+    if _installed:
+        return
+    connection_created.connect(_wrap_connection)
+    # Уже открытые соединения сигнала не получат
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    # Шаблоны, подключаемые через {% include %}, входят во время внешнего
+    BackendTemplate.render = _timed_render
+    _installed = True
+
+
+def _finish(profile, response):
+    if not profile.sampled:
+        return
+    entry = profile.as_dict(response)
+    with _lock:
+        _profiles.append(entry)
+    logger.info('request %s', json.dumps(entry, ensure_ascii=False))
+
+
+def recent():
+    """Последние профили запросов, новые первыми"""
+    with _lock:
+        return list(reversed(_profiles))
+
+
+def slow_queries():
+    """Последние медленные SQL-запросы, новые первыми"""
+    with _lock:
+        return list(reversed(_slow_queries))
+
+
+def summary():
+    """Сводка буфера по view: число запросов, среднее и максимальное время, SQL на запрос"""
+    views = {}
+    for entry in recent():
+        row = views.setdefault(entry['view'] or entry['path'], {
+            'view': entry['view'] or entry['path'], 'requests': 0, 'wall_ms': 0.0, 'max_ms': 0.0,
+            'db_ms': 0.0, 'template_ms': 0.0, 'queries': 0, 'duplicates': 0,
+        })
+        row['requests'] += 1
+        row['wall_ms'] += entry['wall_ms']
+        row['max_ms'] = max(row['max_ms'], entry['wall_ms'])
+        row['db_ms'] += entry['db_ms']
+        row['template_ms'] += entry['template_ms']
+        row['queries'] += entry['queries']
+        row['duplicates'] = max(row['duplicates'], entry['duplicates'])
+    result = []
+    for row in views.values():
+        count = row['requests']
+        for field in ('wall_ms', 'db_ms', 'template_ms', 'queries'):
+            row[field] = round(row[field] / count, 1)
+        result.append(row)
+    return sorted(result, key=lambda row: row['wall_ms'], reverse=True)
+
+
+class ProfilingMiddleware:
+    """Профилирование выборки запросов; без PROFILING_ENABLED не подключается"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install()
+
+    def _start(self, request):
+        return Profile(request, random.random() < settings.PROFILING_SAMPLE_RATE)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = self._start(request)
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        _finish(profile, response)
+        return response
+
+    async def __acall__(self, request):
+        profile = self._start(request)
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        _finish(profile, response)
+        return response
@@ -0,0 +1,115 @@
+# querybudget.py
+"""
+Проверка бюджета SQL-запросов: каждая страница из urls.py рендерится на
+двух объемах данных, и число запросов не должно расти вместе с числом строк.
+Рост означает N+1 - запрос на каждую строку в цикле шаблона.
+
+Каждая страница должна ответить ожидаемым для роли кодом (expected_status):
+иначе страница не отрисовалась, и ее число запросов ничего не говорит.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from . import datagen, permissions
+from .models import CustomUser, Reservation
+
+# Маршруты с побочными эффектами для сессии
+SKIP_ROUTES = {'logout'}
+
+# Маршруты, принимающие только POST: на GET отвечают 405
+POST_ONLY_ROUTES = {'create_booking', 'bulk_assign_services'}
+
+# Хост, с которым тестовый клиент Django отправляет запросы
+TEST_HOST = 'testserver'
+
+
+def allow_test_host():
+    """
+    override_settings, пропускающий хост тестового клиента: вне тестового
+    раннера ALLOWED_HOSTS его не содержит, и каждая страница отвечает 400.
+    """
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, TEST_HOST])
+
+
+def expected_status(role, name):
+    """Код ответа на GET маршрута name для пользователя с ролью role"""
+    if name not in permissions.public_url_names() and not permissions.is_allowed(role, name):
+        return 302
+    if name in POST_ONLY_ROUTES:
+        return 405
+    return 200
+
+
+def discover_routes(urlconf=None):
+    """Имена маршрутов без параметров из корневого urls.py"""
+    routes = []
+    for pattern in get_resolver(urlconf).url_patterns:
+        if (isinstance(pattern, URLPattern) and pattern.name and pattern.name not in SKIP_ROUTES
+                and not pattern.pattern.regex.groups):
+            routes.append(pattern.name)
+    return routes
+
+
+def seed(scale, rng):
+    """Данные всех видов, объем которых пропорционален scale"""
+    rooms = datagen.create_rooms(scale, rng=rng)
+    guests = datagen.create_guests(scale, prefix='budget', rng=rng)
+    datagen.ReservationTimeline(rooms, guests, active_share=0.5, rng=rng).extend(scale * 2)
+    services = datagen.create_services(scale, active_share=0.7, rng=rng)
+    reservation_ids = list(Reservation.objects.values_list('pk', flat=True))
+    datagen.create_provisions(scale * 2, reservation_ids, services, rng=rng)
+
+
+def login_client(role):
+    """Клиент, вошедший под временным пользователем с ролью role"""
+    user = CustomUser.objects.create_user(
+        username=f'budget_{role}_{random.randrange(10 ** 9)}',
+        password='budget-password',
+        role=role,
+    )
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def measure(client, routes):
+    """
+    {имя маршрута: (статус, число запросов)} для GET каждой страницы. Первый
+    запрос загружает карты, хранимые в памяти процесса (оснащение, права), и
+    не считается; общий кеш очищается перед каждым измерением.
+    """
+    results = {}
+    for name in routes:
+        client.get(reverse(name))
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(name))
+        results[name] = (response.status_code, len(queries))
+    return results
+
+
+def unexpected(role, results):
+    """[(маршрут, статус, ожидаемый статус)] для ответов с неожиданным кодом"""
+    return [
+        (name, status, expected_status(role, name))
+        for name, (status, _) in results.items()
+        if status != expected_status(role, name)
+    ]
+
+
+def compare(small, large, tolerance=0):
+    """Маршруты, где запросов на большом объеме больше, чем на малом"""
+    regressions = []
+    for name, (status, count) in large.items():
+        small_status, small_count = small[name]
+        if status == 405 or small_status == 405:
+            continue
+        if count > small_count + tolerance:
+            regressions.append((name, small_count, count))
+    return regressions
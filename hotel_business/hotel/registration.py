@@ -0,0 +1,116 @@
+# registration.py
+"""
+Регистрация клиента: пользователь, документ и профиль гостя.
+
+Формы валидируются один раз и без запросов к базе. Уникальность логина,
+email, телефона и документа обеспечивают ограничения базы: все три
+записи создаются в одной транзакции, а IntegrityError превращается в
+ошибку соответствующего поля формы. У пользователя два уникальных поля, и
+какое из них занято, выясняется запросом после отката: текст ошибки базы
+зависит от СУБД и имен ограничений. Так регистрация стоит три INSERT
+вместо четырех-шести проверок exists() перед ними, и параллельные
+регистрации с одинаковыми данными не проходят обе.
+"""
+from decimal import Decimal
+
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .forms import DocumentForm, GuestRegistrationForm, UserRegistrationForm
+from .models import CustomUser
+
+UNIQUE_ERRORS = {
+    'username': 'Пользователь с таким логином уже существует.',
+    'email': 'Пользователь с таким email уже существует.',
+    'phonenumber': 'Гость с таким номером телефона уже существует.',
+    'document': 'Документ с такой серией и номером уже существует.',
+}
+
+# Нарушение, которое не удалось отнести к полю (занятая запись успела исчезнуть)
+RETRY_ERROR = 'Не удалось завершить регистрацию, попробуйте еще раз.'
+
+
+class Registration:
+    """Три формы регистрации; после register() - пользователь или ошибки в формах"""
+
+    def __init__(self, data=None):
+        if data is not None and not data.get('dateofbirth') and data.get('date_of_birth'):
+            # Дата рождения гостя копируется скриптом страницы; без него - из поля пользователя
+            data = data.copy()
+            data['dateofbirth'] = data['date_of_birth']
+        self.user_form = UserRegistrationForm(data)
+        self.guest_form = GuestRegistrationForm(data)
+        self.document_form = DocumentForm(data)
+        self.user = None
+
+    @property
+    def forms(self):
+        return self.user_form, self.guest_form, self.document_form
+
+    def is_valid(self):
+        # Список, а не генератор: ошибки нужны для всех трех форм
+        return all([form.is_valid() for form in self.forms])
+
+    def register(self):
+        """Создает пользователя-клиента, документ и гостя; возвращает пользователя или None"""
+        if not self.is_valid():
+            return None
+        form = None
+        try:
+            with transaction.atomic():
+                form = self.document_form
+                document = self.document_form.save()
+
+                form = self.user_form
+                user = self.user_form.save(commit=False)
+                user.role = 'client'
+                user.save()
+
+                form = self.guest_form
+                guest = self.guest_form.save(commit=False)
+                guest.user = user
+                guest.documentid = document
+                guest.discount = Decimal('0.00')
+                guest.save()
+        except IntegrityError:
+            self._unique_error(form)
+            return None
+        self.user = user
+        return user
+
+    def _unique_error(self, form):
+        if form is self.document_form:
+            form.add_error(NON_FIELD_ERRORS, UNIQUE_ERRORS['document'])
+        elif form is self.guest_form:
+            form.add_error('phonenumber', UNIQUE_ERRORS['phonenumber'])
+        else:
+            fields = self._taken_user_fields()
+            for field in fields:
+                form.add_error(field, UNIQUE_ERRORS[field])
+            if not fields:
+                form.add_error(NON_FIELD_ERRORS, RETRY_ERROR)
+
+    def _taken_user_fields(self):
+        """Уникальные поля пользователя, значения которых уже заняты"""
+        username = self.user_form.cleaned_data['username'].lower()
+        email = self.user_form.cleaned_data.get('email') or ''
+        fields = []
+        # Логин уникален без учета регистра (customuser_username_ci_unique)
+        if CustomUser.objects.annotate(username_lower=Lower('username')).filter(username_lower=username).exists():
+            fields.append('username')
+        if email and CustomUser.objects.filter(email=email).exists():
+            fields.append('email')
+        return fields
+
+    def error_messages(self):
+        """Ошибки всех форм построчно, для messages"""
+        lines = []
+        for title, form in (('пользователя', self.user_form), ('гостя', self.guest_form),
+                            ('документа', self.document_form)):
+            if form.errors:
+                lines.append(f'Ошибки в данных {title}:')
+                for field, errors in form.errors.items():
+                    lines.append(f"- {field}: {', '.join(errors)}")
+        return lines
+
@@ -0,0 +1,381 @@
+# reporting.py
+"""
+Отчеты по выручке и загрузке на основе суточных сводок DailyStats.
+
+Сигналы броней и оказанных услуг отмечают затронутые дни в DirtyDay,
+команда rollup_stats пересчитывает только эти дни. Пересчет сначала
+забирает отметки (блокирует и удаляет), а потом считает: отметка,
+поставленная во время расчета, остается до следующего прохода. Отчеты читают одни
+сводки, поэтому их стоимость не зависит от длины истории.
+
+Выручка номера - цена брони, разложенная по ночам (остаток от деления
+копеек - на последнюю ночь), отмененные брони не учитываются. Выручка
+услуги считается так же, как в счете брони (pricing.service_charge):
+количество × текущая цена услуги со скидкой гостя. Число номеров в
+эксплуатации берется на момент расчета дня, поэтому изменение номеров
+отмечает текущий и будущие дни.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.utils import timezone
+
+from . import pricing
+from .models import DailyStats, DirtyDay, Number, Reservation, ServiceProvision
+
+# Соседние грязные дни с промежутком не больше этого пересчитываются одним проходом
+WINDOW_GAP = 31
+
+# Статусы броней, не приносящих выручки
+EXCLUDED_STATUS = 'cancelled'
+
+CENT = Decimal('0.01')
+
+
+def stay_dates(arrival, departure):
+    """Даты ночей проживания (с заезда включительно до выезда)"""
+    return [arrival + timedelta(days=i) for i in range((departure - arrival).days)]
+
+
+def _insert_dirty(dates):
+    DirtyDay.objects.bulk_create([DirtyDay(date=day) for day in dates], ignore_conflicts=True)
+
+
+def mark_dirty(dates):
+    """
+    Отмечает дни для пересчета сводок. Внутри транзакции отметка ставится
+    дважды: сразу - чтобы не потерять ее при сбое после фиксации, и после
+    фиксации - пересчет мог забрать существующую отметку раньше, чем
+    изменение стало ему видно.
+    """
+    dates = set(dates)
+    if not dates:
+        return
+    _insert_dirty(dates)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _insert_dirty(dates))
+
+
+def affected_dates(instance):
+    """Дни, сводки которых зависят от брони или оказанной услуги"""
+    if isinstance(instance, Reservation):
+        return stay_dates(instance.arrivaldate, instance.departuredate)
+    return [instance.dateofserviceprovision]
+
+
+def stored_dates(instance):
+    """affected_dates для версии объекта, сохраненной в базе (до изменения)"""
+    try:
+        return affected_dates(type(instance).objects.get(pk=instance.pk))
+    except type(instance).DoesNotExist:
+        return []
+
+
+def service_dates(service_id):
+    """Дни, в которые оказывалась услуга"""
+    return ServiceProvision.objects.filter(serviceid_id=service_id) \
+        .values_list('dateofserviceprovision', flat=True).distinct()
+
+
+def guest_service_dates(guest_id):
+    """Дни услуг по броням гостя: их выручка зависит от скидки гостя"""
+    return ServiceProvision.objects.filter(reservationid__clientid_id=guest_id) \
+        .values_list('dateofserviceprovision', flat=True).distinct()
+
+
+def room_dates(number_id):
+    """Ночи броней номера и дни услуг по ним: они учтены в категории номера"""
+    dates = set(
+        ServiceProvision.objects.filter(reservationid__numberid_id=number_id)
+        .values_list('dateofserviceprovision', flat=True).distinct()
+    )
+    for arrival, departure in Reservation.objects.filter(numberid_id=number_id) \
+            .values_list('arrivaldate', 'departuredate').iterator(chunk_size=2000):
+        dates.update(stay_dates(arrival, departure))
+    return dates
+
+
+def current_dates():
+    """
+    Сегодняшний и будущие дни, по которым уже есть сводки: в них число
+    номеров в эксплуатации - текущее, прошлые дни остаются снимком
+    """
+    return DailyStats.objects.filter(date__gte=timezone.now().date()) \
+        .values_list('date', flat=True).distinct()
+
+
+def nightly_shares(price, nights):
+    """Цена брони по ночам; сумма долей в точности равна цене"""
+    if nights <= 0:
+        return []
+    share = (price / nights).quantize(CENT)
+    return [share] * (nights - 1) + [price - share * (nights - 1)]
+
+
+def _windows(dates, gap=WINDOW_GAP):
+    """Группы отсортированных дат, соседние даты в группе ближе gap дней"""
+    window = []
+    for day in sorted(dates):
+        if window and (day - window[-1]).days > gap:
+            yield window
+            window = []
+        window.append(day)
+    if window:
+        yield window
+
+
+def _compute(dates):
+    """Строки DailyStats (без сохранения) для набора дат одного окна"""
+    wanted = set(dates)
+    first, last = min(dates), max(dates)
+
+    available = dict(
+        Number.objects.filter(is_available=True).values('categoryid')
+        .annotate(total=Count('pk')).values_list('categoryid', 'total')
+    )
+    categories = set(available) | set(Number.objects.values_list('categoryid', flat=True).distinct())
+
+    sold = defaultdict(int)
+    revenue = defaultdict(Decimal)
+    reservations = (
+        Reservation.objects.exclude(status=EXCLUDED_STATUS)
+        .filter(arrivaldate__lte=last, departuredate__gt=first)
+        .values_list('arrivaldate', 'departuredate', 'price', 'numberid__categoryid')
+        .iterator(chunk_size=2000)
+    )
+    for arrival, departure, price, category_id in reservations:
+        nights = stay_dates(arrival, departure)
+        for day, share in zip(nights, nightly_shares(price, len(nights))):
+            if day in wanted:
+                sold[day, category_id] += 1
+                revenue[day, category_id] += share
+                categories.add(category_id)
+
+    rows = [
+        DailyStats(
+            date=day,
+            categoryid_id=category_id,
+            rooms_available=available.get(category_id, 0),
+            rooms_sold=sold[day, category_id],
+            room_revenue=revenue[day, category_id],
+        )
+        for day in dates
+        for category_id in categories
+    ]
+
+    services = (
+        ServiceProvision.objects.filter(dateofserviceprovision__in=dates)
+        .values('dateofserviceprovision', 'reservationid__numberid__categoryid', 'serviceid')
+        .annotate(
+            sold=Sum('quantity'),
+            revenue=Sum(pricing.service_charge(F('reservationid__clientid__discount'))),
+        )
+        .order_by()
+    )
+    rows.extend(
+        DailyStats(
+            date=row['dateofserviceprovision'],
+            categoryid_id=row['reservationid__numberid__categoryid'],
+            serviceid_id=row['serviceid'],
+            services_sold=row['sold'],
+            service_revenue=Decimal(str(row['revenue'])).quantize(CENT),
+        )
+        for row in services
+    )
+    return rows
+
+
+def _claim(dates):
+    """
+    Забирает отметки дней до расчета: блокирует и удаляет их. Отметки,
+    заблокированные параллельным пересчетом, пропускаются. Возвращает даты
+    забранных отметок.
+    """
+    claimed = list(
+        DirtyDay.objects.select_for_update(skip_locked=True)
+        .filter(date__in=dates).values_list('pk', 'date')
+    )
+    DirtyDay.objects.filter(pk__in=[pk for pk, _ in claimed]).delete()
+    return [day for _, day in claimed]
+
+
+def rollup(dates, dirty_only=False):
+    """
+    Пересчитывает сводки за указанные дни. Возвращает (дней, строк). При
+    dirty_only пересчитываются только дни, отметки которых удалось забрать.
+    """
+    days = total = 0
+    for window in _windows(set(dates)):
+        with transaction.atomic():
+            claimed = _claim(window)
+            if dirty_only:
+                window = sorted(claimed)
+                if not window:
+                    continue
+            rows = _compute(window)
+            DailyStats.objects.filter(date__in=window).delete()
+            DailyStats.objects.bulk_create(rows, batch_size=2000)
+        days += len(window)
+        total += len(rows)
+    return days, total
+
+
+def process_dirty(limit=None):
+    """Пересчитывает отмеченные дни; возвращает (дней, строк)"""
+    dates = DirtyDay.objects.order_by('date').values_list('date', flat=True)
+    if limit:
+        dates = dates[:limit]
+    return rollup(list(dates), dirty_only=True)
+
+
+def history_bounds():
+    """Первая и последняя даты, по которым есть брони или услуги, либо (None, None)"""
+    bounds = Reservation.objects.exclude(status=EXCLUDED_STATUS).aggregate(
+        first=Min('arrivaldate'), last=Max('departuredate'))
+    services = ServiceProvision.objects.aggregate(
+        first=Min('dateofserviceprovision'), last=Max('dateofserviceprovision'))
+    firsts = [d for d in (bounds['first'], services['first']) if d]
+    lasts = [d for d in (bounds['last'] and bounds['last'] - timedelta(days=1), services['last']) if d]
+    if not firsts:
+        return None, None
+    return min(firsts), max(lasts)
+
+
+def rebuild(date_from=None, date_to=None):
+    """Полный пересчет сводок за период (по умолчанию - за всю историю)"""
+    first, last = history_bounds()
+    date_from = date_from or first
+    date_to = date_to or last
+    if date_from is None or date_to is None or date_to < date_from:
+        return 0, 0
+    dates = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    if date_from == first and date_to == last:
+        # За пределами истории сводок быть не должно
+        DailyStats.objects.exclude(date__range=(first, last)).delete()
+    return rollup(dates)
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+def category_report(date_from, date_to):
+    """Загрузка, ADR и RevPAR по категориям за период - только по сводкам"""
+    rows = (
+        DailyStats.objects.filter(date__range=(date_from, date_to), serviceid__isnull=True)
+        .values('categoryid', 'categoryid__name')
+        .annotate(
+            available=Sum('rooms_available'),
+            sold=Sum('rooms_sold'),
+            revenue=Sum('room_revenue'),
+        )
+        .order_by('categoryid__name', 'categoryid')
+    )
+    report = []
+    for row in rows:
+        revenue = Decimal(str(row['revenue'] or 0)).quantize(CENT)
+        adr = _ratio(revenue, row['sold'])
+        revpar = _ratio(revenue, row['available'])
+        occupancy = _ratio(row['sold'] * 100, row['available'])
+        report.append({
+            'category_id': row['categoryid'],
+            'category': row['categoryid__name'],
+            'rooms_available': row['available'],
+            'rooms_sold': row['sold'],
+            'revenue': revenue,
+            'occupancy': round(occupancy, 1) if occupancy is not None else None,
+            'adr': adr.quantize(CENT) if adr is not None else None,
+            'revpar': revpar.quantize(CENT) if revpar is not None else None,
+        })
+    return report
+
+
+def service_report(date_from, date_to):
+    """Продажи и выручка по услугам за период - только по сводкам"""
+    rows = (
+        DailyStats.objects.filter(date__range=(date_from, date_to), serviceid__isnull=False)
+        .values('serviceid', 'serviceid__name')
+        .annotate(sold=Sum('services_sold'), revenue=Sum('service_revenue'))
+        .order_by('-revenue', 'serviceid')
+    )
+    return [dict(row, revenue=Decimal(str(row['revenue'] or 0)).quantize(CENT)) for row in rows]
+
+
+def verify(sample_days=20, seed=0):
+    """
+    Сверка сводок с прямым пересчетом по броням и услугам. Дни для
+    поштучной сверки занятости выбираются генератором с зерном seed, так что
+    повторный запуск проверяет те же дни. Возвращает список расхождений
+    (пустой - сводки верны).
+    """
+    problems = []
+
+    # Выручка и проданные ночи по категориям за всю историю
+    expected_revenue = defaultdict(Decimal)
+    expected_nights = defaultdict(int)
+    for arrival, departure, price, category_id in (
+        Reservation.objects.exclude(status=EXCLUDED_STATUS)
+        .values_list('arrivaldate', 'departuredate', 'price', 'numberid__categoryid')
+        .iterator(chunk_size=2000)
+    ):
+        if departure > arrival:
+            expected_revenue[category_id] += price
+            expected_nights[category_id] += (departure - arrival).days
+
+    actual = {
+        row['categoryid']: row
+        for row in DailyStats.objects.filter(serviceid__isnull=True).values('categoryid')
+        .annotate(sold=Sum('rooms_sold'), revenue=Sum('room_revenue')).order_by()
+    }
+    for category_id in set(expected_revenue) | set(actual):
+        row = actual.get(category_id, {'sold': 0, 'revenue': Decimal('0')})
+        if row['sold'] != expected_nights[category_id]:
+            problems.append(f'категория {category_id}: ночей {row["sold"]}, ожидалось {expected_nights[category_id]}')
+        if Decimal(str(row['revenue'] or 0)) != expected_revenue[category_id]:
+            problems.append(f'категория {category_id}: выручка {row["revenue"]}, ожидалось {expected_revenue[category_id]}')
+
+    # Выручка услуг
+    expected_services = {
+        row['serviceid']: row
+        for row in ServiceProvision.objects.values('serviceid').annotate(
+            sold=Sum('quantity'),
+            revenue=Sum(pricing.service_charge(F('reservationid__clientid__discount'))),
+        ).order_by()
+    }
+    actual_services = {
+        row['serviceid']: row
+        for row in DailyStats.objects.filter(serviceid__isnull=False).values('serviceid')
+        .annotate(sold=Sum('services_sold'), revenue=Sum('service_revenue')).order_by()
+    }
+    for service_id in set(expected_services) | set(actual_services):
+        expected = expected_services.get(service_id, {'sold': 0, 'revenue': 0})
+        row = actual_services.get(service_id, {'sold': 0, 'revenue': 0})
+        if row['sold'] != expected['sold'] or \
+                Decimal(str(row['revenue'] or 0)).quantize(CENT) != Decimal(str(expected['revenue'] or 0)).quantize(CENT):
+            problems.append(f'услуга {service_id}: {row["sold"]} шт. на {row["revenue"]}, '
+                            f'ожидалось {expected["sold"]} шт. на {expected["revenue"]}')
+
+    # Выборочные дни: занятые номера по категориям напрямую из броней
+    days = list(
+        DailyStats.objects.filter(serviceid__isnull=True).order_by('date').values_list('date', flat=True).distinct()
+    )
+    days = random.Random(seed).sample(days, min(sample_days, len(days)))
+    for day in days:
+        expected = dict(
+            Reservation.objects.exclude(status=EXCLUDED_STATUS)
+            .filter(arrivaldate__lte=day, departuredate__gt=day)
+            .values('numberid__categoryid').annotate(total=Count('pk'))
+            .values_list('numberid__categoryid', 'total').order_by()
+        )
+        actual_day = dict(
+            DailyStats.objects.filter(date=day, serviceid__isnull=True, rooms_sold__gt=0)
+            .values_list('categoryid', 'rooms_sold')
+        )
+        if expected != actual_day:
+            problems.append(f'{day}: занято {actual_day}, ожидалось {expected}')
+
+    return problems
@@ -0,0 +1,199 @@
+# roomsearch.py
+"""
+Поиск свободных номеров с фасетами для виджета бронирования.
+
+Фасеты (категория, число кроватей, этаж) считаются одним запросом с
+GROUP BY по всем трем измерениям с остальными фильтрами (даты, гости,
+комнаты, цена, оснащение). Каждый фасет затем собирается в Python без
+учета собственного фильтра, но с фильтрами двух других: выбор категории
+не обнуляет счетчики остальных категорий.
+
+Счетчики кешируются по сигнатуре фильтра. Свободность номеров зависит от
+броней: их сигналы меняют версию пространства occupancy. Время жизни
+короткое (ROOM_FACETS_TIMEOUT) - без общего кеша версию видит только
+процесс, сохранивший бронь.
+
+Стоимость проживания считается по ночам, поэтому длина периода ограничена
+(ROOM_SEARCH_MAX_NIGHTS).
+"""
+import hashlib
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import amenities, caching
+from .availability import AvailabilityService
+from .search import MAX_INT
+
+# Фасетные измерения: имя параметра -> поле номера
+FACETS = {
+    'category': 'categoryid',
+    'bedcount': 'bedcount',
+    'floor': 'floor',
+}
+
+NAMESPACES = ('rooms', 'categories', 'occupancy', amenities.NAMESPACE)
+
+
+def max_nights():
+    return getattr(settings, 'ROOM_SEARCH_MAX_NIGHTS', 90)
+
+
+def bounded_int(value):
+    """Целое, которое поместится в IntegerField, или None"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if abs(number) <= MAX_INT else None
+
+
+def _int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    number = bounded_int(value)
+    if number is None:
+        raise ValueError(f'{name}: ожидается целое число')
+    return number
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'{name}: ожидается число')
+    if not number.is_finite():
+        raise ValueError(f'{name}: ожидается число')
+    return number
+
+
+def _date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f'{name}: ожидается дата ГГГГ-ММ-ДД')
+    return parsed
+
+
+class RoomQuery:
+    """Фильтр поиска номеров; ValueError в from_params - ошибка параметров"""
+
+    def __init__(self, arrival, departure, guests=None, roomcount=None, price_min=None, price_max=None,
+                 amenity_ids=(), category=None, bedcount=None, floor=None):
+        if departure <= arrival:
+            raise ValueError('Дата выезда должна быть позже даты заезда.')
+        if (departure - arrival).days > max_nights():
+            raise ValueError(f'Период поиска - не больше {max_nights()} ночей.')
+        self.arrival = arrival
+        self.departure = departure
+        self.guests = guests
+        self.roomcount = roomcount
+        self.price_min = price_min
+        self.price_max = price_max
+        self.amenity_ids = sorted(set(amenity_ids))
+        self.facets = {'category': category, 'bedcount': bedcount, 'floor': floor}
+
+    @classmethod
+    def from_params(cls, params):
+        """Фильтр из GET-параметров (QueryDict)"""
+        arrival = _date(params, 'arrival') or timezone.now().date()
+        departure = _date(params, 'departure') or arrival + timedelta(days=1)
+        return cls(
+            arrival, departure,
+            guests=_int(params, 'guests'),
+            roomcount=_int(params, 'roomcount'),
+            price_min=_decimal(params, 'price_min'),
+            price_max=_decimal(params, 'price_max'),
+            amenity_ids=amenities.parse_ids(params.getlist('amenity')),
+            category=_int(params, 'category'),
+            bedcount=_int(params, 'bedcount'),
+            floor=_int(params, 'floor'),
+        )
+
+    def signature(self):
+        """Стабильная строка фильтра для ключа кеша"""
+        parts = [
+            self.arrival.isoformat(), self.departure.isoformat(), self.guests, self.roomcount,
+            self.price_min, self.price_max, ','.join(map(str, self.amenity_ids)),
+            *(self.facets[name] for name in FACETS),
+        ]
+        return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+    def base_rooms(self, amenity_map):
+        """Свободные номера со всеми фильтрами, кроме фасетных"""
+        rooms = AvailabilityService(self.arrival, self.departure).free_rooms()
+        if self.guests:
+            rooms = rooms.filter(bedcount__gte=self.guests)
+        if self.roomcount:
+            rooms = rooms.filter(roomcount=self.roomcount)
+        if self.price_min is not None:
+            rooms = rooms.filter(categoryid__price__gte=self.price_min)
+        if self.price_max is not None:
+            rooms = rooms.filter(categoryid__price__lte=self.price_max)
+        return amenity_map.filter_rooms(rooms, self.amenity_ids)
+
+    def rooms(self, amenity_map):
+        """Номера со всеми фильтрами"""
+        rooms = self.base_rooms(amenity_map)
+        for name, field in FACETS.items():
+            if self.facets[name] is not None:
+                rooms = rooms.filter(**{field: self.facets[name]})
+        return rooms
+
+    def _matches(self, row, skip):
+        return all(
+            self.facets[name] is None or row[name] == self.facets[name]
+            for name in FACETS if name != skip
+        )
+
+    def facet_counts(self, amenity_map):
+        """{'total': n, 'category': [...], 'bedcount': [...], 'floor': [...]} - один запрос"""
+        rows = [
+            {'category': category_id, 'category_name': name, 'bedcount': bedcount, 'floor': floor, 'count': count}
+            for category_id, name, bedcount, floor, count in
+            self.base_rooms(amenity_map).order_by()
+            .values_list('categoryid', 'categoryid__name', 'bedcount', 'floor')
+            .annotate(count=Count('pk'))
+        ]
+        result = {'total': sum(row['count'] for row in rows if self._matches(row, None))}
+        for name in FACETS:
+            counts = {}
+            for row in rows:
+                if self._matches(row, name):
+                    counts[row[name]] = counts.get(row[name], 0) + row['count']
+            if name == 'category':
+                names = {row['category']: row['category_name'] for row in rows}
+                result[name] = [{'id': key, 'name': names[key], 'count': count}
+                                for key, count in sorted(counts.items(), key=lambda pair: names[pair[0]])]
+            else:
+                result[name] = [{'value': key, 'count': count} for key, count in sorted(counts.items())]
+        return result
+
+
+def _timeout():
+    return getattr(settings, 'ROOM_FACETS_TIMEOUT', 30)
+
+
+def cached_facets(query, amenity_map):
+    return caching.get_or_set(NAMESPACES, f'room_facets:{query.signature()}',
+                              lambda: query.facet_counts(amenity_map), timeout=_timeout(), group='rooms')
+
+
+async def acached_facets(query, amenity_map):
+    return await caching.aget_or_set(NAMESPACES, f'room_facets:{query.signature()}',
+                                     sync_to_async(lambda: query.facet_counts(amenity_map)),
+                                     timeout=_timeout(), group='rooms')
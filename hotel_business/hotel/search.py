@@ -0,0 +1,147 @@
+# search.py
+"""
+Поиск гостей для manager_guests.
+
+Каждое условие ищется отдельным подзапросом по своему индексу, а id гостей
+объединяются через UNION - так OR по разным таблицам не превращается в
+полный просмотр гостей. На PostgreSQL текстовые поля ищутся через
+триграммные GIN-индексы (pg_trgm) и полнотекстовый индекс по ФИО, а
+результат ранжируется по похожести. Телефон и номер документа - целые
+числа, поэтому префикс превращается в набор диапазонов по обычному
+btree-индексу вместо приведения каждой строки к тексту. На остальных базах
+(SQLite для локальной разработки) ранжирование выполняется в Python.
+
+Ранг - целое число (похожесть, умноженная на RANK_SCALE): он входит в ключ
+keyset-пагинации, а дробное значение после JSON курсора могло бы не совпасть
+с вычисленным базой и сдвинуть границу страницы.
+"""
+from difflib import SequenceMatcher
+
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+
+from .models import CustomUser, Document, Guest
+
+# IntegerField хранит значения не больше этого
+MAX_INT = 2147483647
+
+# Первичные ключи (BigAutoField) - не больше этого
+MAX_BIGINT = 9223372036854775807
+
+# Сколько найденных гостей ранжировать в Python (остальные получают ранг 0)
+FALLBACK_RANK_LIMIT = 200
+
+# Точность ранга: похожесть 0.87654 -> 8765
+RANK_SCALE = 10000
+
+
+def numeric_prefix_q(field, digits):
+    """Числа, десятичная запись которых начинается с digits: 12 -> 12, 120..129, 1200..1299, ..."""
+    if not digits.isdigit() or digits.startswith('0') or int(digits) > MAX_INT:
+        return None
+    prefix = int(digits)
+    condition = Q(**{field: prefix})
+    scale = 10
+    while prefix * scale <= MAX_INT:
+        condition |= Q(**{f'{field}__gte': prefix * scale, f'{field}__lt': (prefix + 1) * scale})
+        scale *= 10
+    return condition
+
+
+def _digits(query):
+    digits = query.replace(' ', '').replace('+', '').replace('-', '')
+    return digits if digits.isdigit() else None
+
+
+def matching_guest_ids(query):
+    """UNION id гостей, найденных по каждому индексируемому условию"""
+    branches = [
+        Guest.objects.filter(fullname__icontains=query).values('pk'),
+        Guest.objects.filter(
+            user__in=CustomUser.objects.filter(
+                Q(username__icontains=query) | Q(email__icontains=query)
+            ).values('pk')
+        ).values('pk'),
+    ]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        branches.append(
+            Guest.objects.annotate(search_vector=SearchVector('fullname', config='simple'))
+            .filter(search_vector=SearchQuery(query, config='simple'))
+            .values('pk')
+        )
+
+    digits = _digits(query)
+    if digits:
+        phone = numeric_prefix_q('phonenumber', digits)
+        if phone is not None:
+            branches.append(Guest.objects.filter(phone).values('pk'))
+        series = numeric_prefix_q('series', digits)
+        number = numeric_prefix_q('number', digits)
+        if series is not None:
+            documents = Document.objects.filter(series | number).values('pk')
+            branches.append(Guest.objects.filter(documentid__in=documents).values('pk'))
+
+    first, *rest = branches
+    return first.union(*rest)
+
+
+def search_guests(queryset, query):
+    """
+    Фильтрует гостей по запросу и добавляет целочисленную аннотацию search_rank
+    (чем больше, тем ближе). Пустой запрос не фильтрует, ранг у всех 0.
+    """
+    query = query.strip()
+    if not query:
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField()))
+    queryset = queryset.filter(pk__in=matching_guest_ids(query))
+    if connection.vendor == 'postgresql':
+        return queryset.annotate(search_rank=Cast(_postgres_rank(query) * RANK_SCALE, IntegerField()))
+    return _annotate_python_rank(queryset, query)
+
+
+def _postgres_rank(query):
+    # Импорт здесь: модулю нужен psycopg, которого нет в окружениях на SQLite
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+    from django.db.models.functions import Greatest
+
+    rank = Greatest(
+        TrigramSimilarity('fullname', query),
+        TrigramSimilarity('user__username', query),
+        TrigramSimilarity('user__email', query),
+    ) + SearchRank(SearchVector('fullname', config='simple'), SearchQuery(query, config='simple'))
+
+    digits = _digits(query)
+    if digits and int(digits) <= MAX_INT:
+        exact = Q(phonenumber=int(digits)) | Q(documentid__number=int(digits))
+        rank = rank + Case(When(exact, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+    return rank
+
+
+def _score(query, values):
+    query = query.lower()
+    best = 0.0
+    for value in values:
+        value = str(value or '').lower()
+        if not value:
+            continue
+        if value.startswith(query):
+            return 1.0
+        best = max(best, SequenceMatcher(None, query, value).ratio())
+    return best
+
+
+def _annotate_python_rank(queryset, query):
+    fields = ('fullname', 'user__username', 'user__email', 'phonenumber', 'documentid__number')
+    candidates = queryset.order_by().values_list('pk', *fields)[:FALLBACK_RANK_LIMIT]
+    ranks = {pk: round(_score(query, values) * RANK_SCALE) for pk, *values in candidates}
+    if not ranks:
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField()))
+    return queryset.annotate(search_rank=Case(
+        *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
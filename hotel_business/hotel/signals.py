@@ -0,0 +1,154 @@
+# signals.py
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import amenities, caching, occupancy, reporting
+from .backends import user_cache_key
+from .context_processors import guest_cache_key
+from .models import (
+    Category, CustomUser, Equipment, Guest, Item, Number, Reservation, RolePermission, Service, ServiceProvision,
+)
+
+
+@receiver(post_save, sender=Reservation)
+def sync_room_nights(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет занятость номера при создании, отмене или переносе брони"""
+    if raw:
+        return
+    if update_fields and not occupancy.TRACKED_FIELDS.intersection(update_fields):
+        return
+    occupancy.sync_reservation(instance)
+
+
+@receiver(post_save, sender=Guest)
+@receiver(post_delete, sender=Guest)
+def invalidate_guest_profile(sender, instance, **kwargs):
+    """Сбрасывает закешированный профиль гостя (context_processors.guest_profile)"""
+    cache.delete(guest_cache_key(instance.user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает пользователя в кеше аутентификации (backends.CachedModelBackend)"""
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Number)
+@receiver(post_delete, sender=Number)
+@receiver(post_save, sender=Guest)
+@receiver(post_delete, sender=Guest)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_cached_catalogues(sender, **kwargs):
+    """Новая версия пространства имен кеша при изменении справочных данных (caching.py)"""
+    caching.bump_for_model(sender)
+
+
+@receiver(pre_save, sender=Reservation)
+@receiver(pre_save, sender=ServiceProvision)
+def remember_report_dates(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние дни брони или услуги: после переноса устаревают и они"""
+    if raw or instance.pk is None:
+        return
+    instance._report_dates = reporting.stored_dates(instance)
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=ServiceProvision)
+@receiver(post_delete, sender=ServiceProvision)
+def mark_report_days(sender, instance, raw=False, **kwargs):
+    """Отмечает дни, сводки DailyStats за которые нужно пересчитать (reporting.py)"""
+    if raw:
+        return
+    dates = reporting.affected_dates(instance)
+    reporting.mark_dirty(dates + getattr(instance, '_report_dates', []))
+
+
+@receiver(pre_save, sender=Service)
+def remember_service_price(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._stored_price = Service.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Service)
+def mark_service_days(sender, instance, raw=False, created=False, **kwargs):
+    """Смена цены услуги меняет выручку всех дней, когда она оказывалась"""
+    if raw or created or getattr(instance, '_stored_price', instance.price) == instance.price:
+        return
+    reporting.mark_dirty(reporting.service_dates(instance.pk))
+
+
+@receiver(pre_save, sender=Number)
+def remember_room_state(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._stored_state = Number.objects.filter(pk=instance.pk) \
+        .values_list('categoryid', 'is_available').first()
+
+
+@receiver(post_save, sender=Number)
+@receiver(post_delete, sender=Number)
+def mark_room_days(sender, instance, raw=False, **kwargs):
+    """
+    Номер в эксплуатации учитывается в текущих и будущих сводках; смена
+    категории переносит ночи и услуги его броней в другую категорию
+    """
+    if raw:
+        return
+    stored = getattr(instance, '_stored_state', None)
+    if stored == (instance.categoryid_id, instance.is_available):
+        return
+    dates = set(reporting.current_dates())
+    if stored is not None and stored[0] != instance.categoryid_id:
+        dates |= reporting.room_dates(instance.pk)
+    reporting.mark_dirty(dates)
+
+
+@receiver(pre_save, sender=Guest)
+def remember_guest_discount(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._stored_discount = Guest.objects.filter(pk=instance.pk).values_list('discount', flat=True).first()
+
+
+@receiver(post_save, sender=Guest)
+def mark_guest_days(sender, instance, raw=False, created=False, **kwargs):
+    """Скидка гостя входит в выручку его услуг (pricing.service_charge)"""
+    if raw or created or getattr(instance, '_stored_discount', instance.discount) == instance.discount:
+        return
+    reporting.mark_dirty(reporting.guest_service_dates(instance.pk))
+
+
+@receiver(pre_save, sender=Equipment)
+def remember_equipment_category(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._stored_category = Equipment.objects.filter(pk=instance.pk) \
+        .values_list('categoryid', flat=True).first()
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def rebuild_category_amenities(sender, instance, raw=False, **kwargs):
+    """Пересчитывает индекс оснащения категории (amenities.py), в том числе прежней"""
+    if raw:
+        return
+    amenities.rebuild({instance.categoryid_id, getattr(instance, '_stored_category', None)} - {None})
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_amenity_names(sender, raw=False, **kwargs):
+    """Названия предметов входят в карту оснащения"""
+    if not raw:
+        amenities.invalidate()
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from django import template
 from django.utils.safestring import mark_safe
 
+from ..pricing import apply_discount, money
+
 register = template.Library()
 
 
@@ -15,32 +19,32 @@ def format_price_with_discount(service, guest):
         return mark_safe('<span>0.00 руб.</span>')
 
     try:
-        service_price = float(service.price)
-    except (AttributeError, TypeError, ValueError):
+        service_price = money(service.price)
+    except (AttributeError, TypeError, ArithmeticError):
         return mark_safe(f'<span>0.00 руб.</span>')
 
     # Если гость не передан или нет скидки
     if not guest or not hasattr(guest, 'discount'):
-        return mark_safe(f'<span>{service_price:.2f} руб.</span>')
+        return mark_safe(f'<span>{service_price} руб.</span>')
 
     try:
-        guest_discount = float(guest.discount)
-    except (TypeError, ValueError):
-        guest_discount = 0
+        guest_discount = Decimal(guest.discount or 0)
+    except (TypeError, ArithmeticError):
+        guest_discount = Decimal('0')
 
     if guest_discount > 0:
-        # Рассчитываем цену со скидкой
-        discounted_price = service_price * (1 - guest_discount)
+        # Рассчитываем цену со скидкой (Decimal, как и в счете брони)
+        discounted_price = apply_discount(service_price, guest_discount)
 
         # Формируем HTML с зачеркнутой старой ценой и красной новой
         html = f'''
-        <span class="price-old">{service_price:.2f} руб.</span>
-        <span class="price-new">{discounted_price:.2f} руб.</span>
+        <span class="price-old">{service_price} руб.</span>
+        <span class="price-new">{discounted_price} руб.</span>
         '''
         return mark_safe(html)
     else:
         # Если скидки нет
-        return mark_safe(f'<span>{service_price:.2f} руб.</span>')
+        return mark_safe(f'<span>{service_price} руб.</span>')
 
 
 @register.filter(name='has_high_discount')
@@ -50,7 +54,14 @@ def has_high_discount(guest):
         return False
 
     try:
-        guest_discount = float(guest.discount)
-        return guest_discount > 0.10  # Более 10%
-    except (TypeError, ValueError):
-        return False
\ No newline at end of file
+        return Decimal(guest.discount) > Decimal('0.10')  # Более 10%
+    except (TypeError, ArithmeticError):
+        return False
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """Текущий адрес страницы с другим курсором пагинации (остальные GET-параметры сохраняются)."""
+    params = context['request'].GET.copy()
+    params['cursor'] = cursor
+    return '?' + params.urlencode()
@@ -0,0 +1,115 @@
+"""
+Навигация панели менеджера: шапка и боковое меню.
+
+Разметка меню одинакова для всех пользователей одной роли на одной странице,
+поэтому отрисованный HTML хранится в памяти процесса по ключу (роль,
+страница, префикс адресов). Запись действительна, пока не сменились карта
+прав (permissions.get_map) и объект шаблона частичного представления - при
+правке шаблона автоперезагрузка сбрасывает кешированный загрузчик, и меню
+отрисовывается заново. Имя пользователя в шапке в кеш не попадает: шапка
+разбита на части до и после имени, и имя экранируется при каждом запросе.
+Адреса разрешаются reverse() один раз на процесс.
+"""
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.template.loader import get_template
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from .. import permissions
+
+register = template.Library()
+
+# Пункты бокового меню: маршрут, подпись, иконка, цвет кнопки
+MENU = (
+    ('manager_dashboard', 'Главная', 'fa-home', 'secondary'),
+    ('manager_guests', 'Гости', 'fa-users', 'primary'),
+    ('manager_services', 'Услуги', 'fa-concierge-bell', 'success'),
+    ('manager_rooms', 'Номера', 'fa-bed', 'warning'),
+    ('manager_assignment', 'Назначить услугу', 'fa-calendar-plus', 'danger'),
+    ('manager_reports', 'Отчеты', 'fa-chart-line', 'dark'),
+    ('manager_folios', 'Счета', 'fa-file-invoice', 'dark'),
+)
+
+# Заголовок в шапке по маршруту страницы
+TITLES = {
+    'manager_dashboard': 'Панель менеджера',
+    **{url_name: label for url_name, label, _, _ in MENU[1:]},
+    'manager_assignment': 'Назначение услуг',
+}
+
+# {(часть, роль, страница, префикс): (шаблон, карта прав, html)}
+_rendered = {}
+
+
+@lru_cache(maxsize=None)
+def _reverse(name, urlconf, root_urlconf, prefix):
+    return reverse(name, urlconf=urlconf)
+
+
+def memo_reverse(name):
+    """reverse() маршрута без параметров, один раз на процесс и набор URL"""
+    return _reverse(name, get_urlconf(), settings.ROOT_URLCONF, get_script_prefix())
+
+
+@register.simple_tag
+def memo_url(name):
+    """{% url %} для маршрутов без параметров с запоминанием результата"""
+    return memo_reverse(name)
+
+
+def _page(context):
+    match = getattr(context['request'], 'resolver_match', None)
+    return match.url_name if match else None
+
+
+def _render_cached(part, role, page, build):
+    partial = get_template(f'manager/partials/{part}.html')
+    permission_map = permissions.get_map()
+    key = (part, role, page, get_script_prefix())
+    entry = _rendered.get(key)
+    if entry is None or entry[0] is not partial or entry[1] is not permission_map:
+        html = partial.render(build(lambda url_name: role in permission_map.get(url_name, ())))
+        entry = _rendered[key] = (partial, permission_map, html)
+    return entry[2]
+
+
+@register.simple_tag(takes_context=True)
+def manager_sidebar(context):
+    """Боковое меню: только страницы, доступные роли; текущая выделена"""
+    role = context['request'].user.role
+    page = _page(context)
+
+    def build(allowed):
+        links = [
+            {'url': memo_reverse(url_name), 'label': label, 'icon': icon,
+             'css': f'btn-{color}' if url_name == page else f'btn-outline-{color}'}
+            for url_name, label, icon, color in MENU if allowed(url_name)
+        ]
+        return {'links': links}
+
+    return mark_safe(_render_cached('sidebar', role, page, build))
+
+
+@register.simple_tag(takes_context=True)
+def manager_navbar(context):
+    """Шапка с заголовком страницы, ссылкой на главную (если доступна) и выходом"""
+    user = context['request'].user
+    page = _page(context)
+
+    def build(allowed):
+        return {
+            'title': TITLES.get(page, 'Панель менеджера'),
+            'home_url': memo_reverse('manager_dashboard'),
+            'show_home': page != 'manager_dashboard' and allowed('manager_dashboard'),
+            'logout_url': memo_reverse('logout'),
+        }
+
+    return mark_safe(
+        _render_cached('navbar_start', user.role, page, build)
+        + conditional_escape(user.username)
+        + _render_cached('navbar_end', user.role, page, build)
+    )
@@ -1,3 +1,763 @@
-from django.test import TestCase
+import http.server
+import io
+import random
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    amenities, assignment, benchsuite, booking, caching, context_processors, dashboard, datagen, importer, loadtest,
+    occupancy, pagination, permissions, pricing, querybudget, queryplans, reporting, views,
+)
+from .availability import AvailabilityService
+from .backends import CachedModelBackend, user_cache_key
+from .models import (
+    Category, CustomUser, DailyStats, DirtyDay, Guest, Item, Number, Reservation, RolePermission, RoomNight, Service,
+)
+from .registration import Registration
+
+
+class QueryPlanTests(TestCase):
+    """Горячие запросы обслуживаются индексами, а не сканированием таблицы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        queryplans.seed(
+            {'rooms': 200, 'guests': 2000, 'reservations': 10000, 'provisions': 10000, 'services': 500},
+            random.Random(42),
+        )
+
+    def test_hot_queries_use_indexes(self):
+        queryplans.prepare()
+        for title, plan, table_scan in queryplans.plans():
+            with self.subTest(title):
+                self.assertFalse(table_scan, f'{title}:\n{plan}')
+
+
+class ManagerGuestsSearchTests(TestCase):
+    """Поиск гостей в панели менеджера"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create(username='search_manager', role='manager')
+        datagen.create_guests(60, prefix='searchable', rng=random.Random(1))
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def test_blank_query_lists_all_guests(self):
+        response = self.client.get(reverse('manager_guests'), {'q': '  '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['guests_count'], 60)
+
+    def test_ranked_pages_do_not_overlap(self):
+        seen = []
+        params = {'q': 'searchable_'}
+        while True:
+            response = self.client.get(reverse('manager_guests'), params)
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page_obj']
+            seen.extend(guest.pk for guest in page)
+            if not page.has_next():
+                break
+            params['cursor'] = page.next_cursor
+        self.assertEqual(len(seen), 60)
+        self.assertEqual(len(set(seen)), 60)
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов каждой страницы не растет вместе с объемом данных (N+1)"""
+
+    SMALL, LARGE = 5, 50
+
+    def _check_role(self, role):
+        rng = random.Random(42)
+        routes = querybudget.discover_routes()
+        self.client.force_login(CustomUser.objects.create(username=f'budget_{role}', role=role))
+
+        querybudget.seed(self.SMALL, rng)
+        small = querybudget.measure(self.client, routes)
+        self.assertEqual(querybudget.unexpected(role, small), [])
+
+        querybudget.seed(self.LARGE - self.SMALL, rng)
+        for name in routes:
+            with self.subTest(role=role, route=name):
+                self.client.get(reverse(name))
+                cache.clear()
+                with self.assertNumQueries(small[name][1]):
+                    response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, querybudget.expected_status(role, name))
+
+    def test_admin_pages(self):
+        self._check_role('admin')
+
+    def test_manager_pages(self):
+        self._check_role('manager')
+
+    def test_client_pages(self):
+        self._check_role('client')
+
+
+class DashboardStatsTests(TestCase):
+    """Показатели панели менеджера одним запросом совпадают с отдельными подсчетами"""
+
+    def test_empty_database(self):
+        with self.assertNumQueries(1):
+            stats = dashboard.collect_stats()
+        self.assertEqual(stats['rooms_count'], 0)
+        self.assertEqual(stats['occupancy_percent'], 0)
+        self.assertEqual(stats['revenue_month'], Decimal('0.00'))
+
+    def test_matches_separate_counts(self):
+        querybudget.seed(20, random.Random(7))
+        occupancy.rebuild()
+        today = RoomNight.objects.order_by('date').values_list('date', flat=True).first()
+        Number.objects.filter(pk=Number.objects.order_by('pk').values('pk')[:1]).update(is_available=False)
+
+        with self.assertNumQueries(1):
+            stats = dashboard.collect_stats(today)
+
+        booked = Reservation.objects.exclude(status='cancelled')
+        month_start, month_end = dashboard._month_bounds(today)
+        occupied = Number.objects.filter(is_available=True, roomnight__date=today).distinct().count()
+        self.assertEqual(stats['guests_count'], Guest.objects.count())
+        self.assertEqual(stats['services_count'], Service.objects.filter(is_active=True).count())
+        self.assertEqual(stats['rooms_count'], Number.objects.count())
+        self.assertEqual(stats['in_service_rooms_count'], Number.objects.filter(is_available=True).count())
+        self.assertEqual(stats['occupied_rooms_count'], occupied)
+        self.assertEqual(stats['available_rooms_count'], stats['in_service_rooms_count'] - occupied)
+        self.assertEqual(stats['arrivals_today'], booked.filter(arrivaldate=today).count())
+        self.assertEqual(stats['departures_today'], booked.filter(departuredate=today).count())
+        self.assertEqual(stats['active_reservations_count'], Reservation.objects.filter(status='active').count())
+        self.assertEqual(stats['revenue_month'], sum(
+            booked.filter(arrivaldate__gte=month_start, arrivaldate__lt=month_end)
+            .values_list('actuallypaid', flat=True),
+            Decimal('0.00'),
+        ))
+        self.assertGreater(occupied, 0)
+
+
+class AssignServicesTests(TestCase):
+    """Массовое назначение услуг: ошибки в строках не прерывают пакет"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(3)
+        rooms = datagen.create_rooms(1, rng=rng)
+        guests = datagen.create_guests(1, prefix='assign', rng=rng)
+        datagen.ReservationTimeline(rooms, guests, rng=rng).extend(1)
+        cls.reservation = Reservation.objects.get()
+        cls.service = datagen.create_services(1, rng=rng)[0]
+
+    def _row(self, **values):
+        return {'reservation': self.reservation.pk, 'service': self.service.pk, 'quantity': 1,
+                'date': self.reservation.arrivaldate.isoformat(), **values}
+
+    def test_invalid_date_types_are_row_errors(self):
+        rows = [self._row(date=value) for value in (20240101, ['2024-01-01'], {'d': 1}, None, '2024-13-45')]
+        created, errors = assignment.assign_services(rows + [self._row()])
+        self.assertEqual(len(created), 1)
+        self.assertEqual([error.index for error in errors], [0, 1, 2, 3, 4])
+
+    def test_json_endpoint_rejects_non_string_date(self):
+        self.client.force_login(CustomUser.objects.create(username='assign_manager', role='manager'))
+        response = self.client.post(reverse('bulk_assign_services'), {'rows': [self._row(date=1)]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'row': 0, 'error': 'неверная дата оказания услуги'}])
+
+
+class GuestImporterTests(TestCase):
+    """Загрузка: ключи отклоненной пачки свободны, неверные значения - ошибки строк"""
+
+    def _row(self, index, **values):
+        return {
+            'fullname': f'Гость {index}', 'phonenumber': 910000000 + index, 'dateofbirth': '1990-01-01',
+            'series': 4500, 'number': 100000 + index, 'dateofissue': '2015-01-01', 'whoissued': 'ОВД',
+            'username': f'imported_{index}', 'email': '', **values,
+        }
+
+    def test_rejected_batch_keys_are_released(self):
+        guest_importer = importer.GuestImporter(batch_size=2)
+        # Логин занят после чтения словарей загрузчика, как при параллельной регистрации
+        CustomUser.objects.create(username='imported_2')
+        rows = [self._row(1), self._row(2), self._row(3, phonenumber=910000001, number=100001)]
+
+        result = guest_importer.run(rows)
+
+        self.assertEqual([line for line, _ in result.errors], [1, 2])
+        self.assertEqual(result.created, 1)
+        guest = Guest.objects.select_related('documentid').get(phonenumber=910000001)
+        self.assertEqual(guest.fullname, 'Гость 3')
+        self.assertEqual(guest.documentid.number, 100001)
+
+    def test_existing_document_is_a_conflict(self):
+        datagen.create_guests(1, prefix='owner', rng=random.Random(5))
+        owner = Guest.objects.select_related('documentid').get()
+        row = self._row(1, series=owner.documentid.series, number=owner.documentid.number)
+
+        result = importer.GuestImporter().run([row, self._row(2), self._row(3, number=100002)])
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _ in result.errors], [1, 3])
+        self.assertEqual(Guest.objects.filter(documentid=owner.documentid).count(), 1)
+
+    def test_values_beyond_field_limits_are_row_errors(self):
+        rows = [
+            self._row(1, discount='15'),
+            self._row(2, discount='NaN'),
+            self._row(3, phonenumber=10 ** 20),
+            self._row(4, fullname='Г' * 300),
+            self._row(5, username='bad name!'),
+            self._row(6),
+        ]
+
+        result = importer.GuestImporter().run(rows)
+
+        self.assertEqual([line for line, _ in result.errors], [1, 2, 3, 4, 5])
+        self.assertIn('discount', result.errors[0][1])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Guest.objects.get().phonenumber, 910000006)
+
+    def test_invalid_category_price_is_row_error(self):
+        rows = [
+            {'name': 'Люкс', 'price': 'NaN'},
+            {'name': 'Пентхаус', 'price': '10000000000'},
+            {'name': 'Стандарт', 'price': '3500.00'},
+        ]
+
+        result = importer.CategoryImporter().run(rows)
+
+        self.assertEqual([line for line, _ in result.errors], [1, 2])
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Стандарт'])
+
+
+class RollupTests(TestCase):
+    """Суточные сводки совпадают с прямым пересчетом по броням и услугам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(11)
+        rooms = datagen.create_rooms(10, rng=rng)
+        guests = datagen.create_guests(10, prefix='rollup', rng=rng)
+        datagen.ReservationTimeline(rooms, guests, active_share=0.8, rng=rng).extend(40)
+        services = datagen.create_services(5, rng=rng)
+        reservation_ids = list(Reservation.objects.values_list('pk', flat=True))
+        datagen.create_provisions(60, reservation_ids, services, days=60, rng=rng)
+
+    def test_rebuild_matches_direct_recount(self):
+        reporting.rebuild()
+        self.assertEqual(reporting.verify(sample_days=1000), [])
+
+    def test_service_revenue_matches_folios(self):
+        reporting.rebuild()
+        folios = pricing.with_folio(Reservation.objects.all()).aggregate(total=Sum('services_total'))
+        stats = DailyStats.objects.aggregate(total=Sum('service_revenue'))
+        self.assertEqual(Decimal(str(stats['total'])), Decimal(str(folios['total'])))
+
+    def test_room_category_change_marks_its_days(self):
+        reporting.rebuild()
+        room = Number.objects.filter(reservation__isnull=False).first()
+        room.categoryid = Category.objects.exclude(pk=room.categoryid_id).first()
+        room.save()
+        self.assertTrue(DirtyDay.objects.exists())
+        reporting.process_dirty()
+        self.assertEqual(reporting.verify(sample_days=1000), [])
+
+    def test_discount_change_marks_service_days(self):
+        reporting.rebuild()
+        guest = Guest.objects.filter(reservation__serviceprovision__isnull=False).first()
+        guest.discount = Decimal('0.50') if guest.discount != Decimal('0.50') else Decimal('0.00')
+        guest.save()
+        reporting.process_dirty()
+        self.assertEqual(reporting.verify(sample_days=1000), [])
+
+    def test_mark_during_compute_survives(self):
+        day = Reservation.objects.order_by('arrivaldate').first().arrivaldate
+        reporting.mark_dirty([day])
+        compute = reporting._compute
+
+        def concurrent_change(dates):
+            # Изменение, отмеченное, пока окно считается
+            reporting.mark_dirty([day])
+            return compute(dates)
+
+        with mock.patch.object(reporting, '_compute', side_effect=concurrent_change):
+            self.assertEqual(reporting.process_dirty()[0], 1)
+        self.assertTrue(DirtyDay.objects.filter(date=day).exists())
+
+    def test_mark_repeated_after_commit(self):
+        day = Reservation.objects.order_by('arrivaldate').first().arrivaldate
+        with self.captureOnCommitCallbacks() as callbacks:
+            reporting.mark_dirty([day])
+        self.assertTrue(DirtyDay.objects.filter(date=day).exists())
+        DirtyDay.objects.all().delete()
+        callbacks[0]()
+        self.assertTrue(DirtyDay.objects.filter(date=day).exists())
+
+
+class RepriceTests(TestCase):
+    """Пересчет цен броней по умолчанию не трогает завершенные брони"""
+
+    def test_only_open_reservations_by_default(self):
+        rng = random.Random(13)
+        rooms = datagen.create_rooms(2, rng=rng)
+        guests = datagen.create_guests(2, prefix='reprice', rng=rng)
+        today = timezone.now().date()
+        # Четыре брони 2020 года (две из них завершены) и по одной текущей на номер
+        datagen.ReservationTimeline(rooms, guests, rng=rng).extend(4)
+        Reservation.objects.filter(pk__in=Reservation.objects.order_by('pk').values('pk')[:2]) \
+            .update(status='completed')
+        datagen.ReservationTimeline(rooms, guests, start=today - timedelta(days=1), rng=rng).extend(2)
+        Reservation.objects.update(price=Decimal('1.00'))
+
+        seen, changed = pricing.reprice()
+
+        self.assertEqual(seen, 2)
+        self.assertEqual(changed, 2)
+        self.assertFalse(Reservation.objects.filter(status='completed').exclude(price=Decimal('1.00')).exists())
+
+    def test_invalid_date_is_a_command_error(self):
+        with self.assertRaisesMessage(CommandError, 'Неверная дата: 2024-13-45'):
+            call_command('reprice_reservations', '--from', '2024-13-45')
+
+
+class BenchSuiteTests(TestCase):
+    """Набор бенчмарков страниц: все ответы ожидаемые, регрессии находятся"""
+
+    def test_pages_answer_expected_status(self):
+        volumes = {'rooms': 5, 'guests': 10, 'reservations': 20, 'services': 3, 'provisions': 20}
+        report = benchsuite.run(volumes, iterations=1, rng=random.Random(42))
+        self.assertEqual(
+            [(row['role'], row['url'], row['status'], row['expected_status']) for row in benchsuite.unexpected(report)],
+            [],
+        )
+        self.assertEqual({row['role'] for row in report['results']}, set(benchsuite.ROLES))
+
+    def test_compare_flags_status_change(self):
+        row = {'role': 'manager', 'url': '/manager/', 'status': 200, 'queries': 5,
+               'p95_ms': 10.0, 'memory_kb': 100.0}
+        baseline = {'results': [row]}
+        self.assertEqual(benchsuite.compare(baseline, baseline), [])
+        for status in (302, 400, 500):
+            with self.subTest(status=status):
+                regressions = benchsuite.compare(baseline, {'results': [dict(row, status=status)]})
+                self.assertEqual(regressions, [f'manager /manager/: статус 200 -> {status}'])
+
+
+class RoomSearchTests(TestCase):
+    """Поиск номеров: неверные параметры - 400, а не долгий запрос или ошибка сервера"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datagen.create_rooms(3, rng=random.Random(17))
+
+    def test_api_search(self):
+        response = self.client.get(reverse('room_search_api'), {'arrival': '2030-01-01', 'departure': '2030-01-04'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['nights'], 3)
+
+    def test_stay_length_is_limited(self):
+        params = {'arrival': '2030-01-01', 'departure': '9999-12-31'}
+        for name in ('room_search', 'room_search_api'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 400)
+
+    def test_non_finite_prices_are_rejected(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf'):
+            with self.subTest(value):
+                response = self.client.get(reverse('room_search_api'), {'price_min': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['errors'], {'__all__': ['price_min: ожидается число']})
+
+    def test_out_of_range_integers(self):
+        huge = str(10 ** 20)
+        for name in ('guests', 'bedcount', 'category', 'floor', 'roomcount'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse('room_search_api'), {name: huge}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('room_search'), {'guests': huge, 'category': huge}).status_code, 200)
+
+
+@override_settings(USER_CACHE_TIMEOUT=300)
+class CachedUserTests(TestCase):
+    """Кеш пользователя для AuthenticationMiddleware"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='cached_client', password='pass-12345', role='client')
+        self.client.force_login(self.user)
+
+    def test_cached_user_has_no_password_hash(self):
+        self.assertEqual(self.client.get(reverse('client_dashboard')).status_code, 200)
+        snapshot = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', dict(snapshot['fields']))
+        self.assertNotIn(self.user.password, str(snapshot))
+
+    def test_restored_user_save_keeps_password(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        cached = backend.get_user(self.user.pk)
+        cached.first_name = 'Новое имя'
+        cached.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Новое имя')
+        self.assertTrue(self.user.check_password('pass-12345'))
+
+    def test_password_change_ends_cached_session(self):
+        url = reverse('client_dashboard')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.set_password('another-pass-123')
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_restored_user_session_hash(self):
+        backend = CachedModelBackend()
+        expected = backend.get_user(self.user.pk).get_session_auth_hash()
+        cached = backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached.get_session_auth_hash(), expected)
+        cached.set_password('another-pass-123')
+        self.assertNotEqual(cached.get_session_auth_hash(), expected)
+
+
+class PermissionMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permissions._loaded = (None, 0.0, None)
+
+    def tearDown(self):
+        permissions._loaded = (None, 0.0, None)
+
+    def _grant_without_signal(self):
+        # bulk_create не отправляет сигналы - как изменение прав в другом процессе
+        RolePermission.objects.bulk_create([RolePermission(role='client', url_name='manager_reports')])
+
+    @override_settings(PERMISSION_MAP_TIMEOUT=300)
+    def test_map_kept_until_timeout(self):
+        self.assertFalse(permissions.is_allowed('client', 'manager_reports'))
+        self._grant_without_signal()
+        self.assertFalse(permissions.is_allowed('client', 'manager_reports'))
+
+    @override_settings(PERMISSION_MAP_TIMEOUT=0)
+    def test_map_reloaded_after_timeout(self):
+        self.assertFalse(permissions.is_allowed('client', 'manager_reports'))
+        self._grant_without_signal()
+        self.assertTrue(permissions.is_allowed('client', 'manager_reports'))
+
+
+class ManagerNavbarTests(TestCase):
+    """Шапка менеджера кешируется без имени пользователя"""
+
+    def setUp(self):
+        cache.clear()
+
+    def _dashboard(self, username):
+        self.client.force_login(CustomUser.objects.create(username=username, role='manager'))
+        response = self.client.get(reverse('manager_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_username_escaped_per_request(self):
+        first = self._dashboard('<b>manager</b>')
+        self.assertContains(first, '&lt;b&gt;manager&lt;/b&gt;')
+        self.assertNotContains(first, '<b>manager</b>')
+
+        second = self._dashboard('other_manager')
+        self.assertContains(second, 'other_manager')
+        self.assertNotContains(second, 'manager&lt;')
+
+
+class _RedirectHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(302)
+        self.send_header('Location', '/login/')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestTests(TestCase):
+    """Перенаправление на вход - ошибка нагрузочной проверки, а не быстрый ответ"""
+
+    def test_closed_pages_need_username(self):
+        with self.assertRaisesMessage(CommandError, '--username'):
+            call_command('load_test', requests=1, concurrency=1, stdout=io.StringIO())
+
+    def test_expected_status_by_role(self):
+        self.assertEqual(loadtest.expected_status('/manager/', None), 302)
+        self.assertEqual(loadtest.expected_status('/manager/', 'manager'), 200)
+
+    def test_in_process_redirect_is_error(self):
+        result = loadtest.WsgiTarget().run('/manager/', 3, 1)
+        self.assertEqual(result.errors, 3)
+        self.assertEqual(result.latencies, [])
+        self.assertEqual(result.unexpected, {302: 3})
+
+    def test_http_redirect_not_followed(self):
+        server = http.server.HTTPServer(('127.0.0.1', 0), _RedirectHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            target = loadtest.HttpTarget('wsgi', f'http://127.0.0.1:{server.server_port}')
+            result = target.run('/manager/', 2, 1)
+            with self.assertRaises(ValueError):
+                target.login('manager', 'wrong')
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(result.errors, 2)
+        self.assertEqual(result.unexpected, {302: 2})
+
+
+class ExportStreamingTests(TestCase):
+    """Выгрузка отдается потоком и под WSGI, и под ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datagen.create_guests(5, prefix='export', rng=random.Random(17))
+
+    def test_wsgi_response_is_streamed(self):
+        self.client.force_login(CustomUser.objects.create(username='export_manager', role='manager'))
+        response = self.client.get(reverse('export_data', args=['guests']), {'format': 'jsonl'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+    async def test_asgi_response_is_async_iterator(self):
+        request = AsyncRequestFactory().get(reverse('export_data', args=['guests']), {'format': 'jsonl'})
+        response = await sync_to_async(views.export_data)(request, 'guests')
+        # Синхронный итератор Django под ASGI собрал бы в список целиком
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+@override_settings(GUEST_PROFILE_CACHE_TIMEOUT=300)
+class GuestProfileCacheTests(TestCase):
+    """Закешированный профиль гостя сбрасывается при изменении гостя"""
+
+    def setUp(self):
+        cache.clear()
+        datagen.create_guests(1, prefix='profile', rng=random.Random(19))
+        self.guest = Guest.objects.get()
+
+    def _load(self):
+        request = RequestFactory().get('/')
+        request.user = self.guest.user
+        return context_processors.get_guest(request)
+
+    def test_profile_cached_between_requests(self):
+        self._load()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._load().pk, self.guest.pk)
+
+    def test_discount_change_invalidates_profile(self):
+        self.assertEqual(self._load().discount, self.guest.discount)
+        self.guest.discount = Decimal('0.25') if self.guest.discount != Decimal('0.25') else Decimal('0.10')
+        self.guest.save()
+        self.assertEqual(self._load().discount, self.guest.discount)
+
+    def test_deleted_guest_invalidates_profile(self):
+        user = self.guest.user
+        self._load()
+        self.guest.delete()
+        request = RequestFactory().get('/')
+        request.user = user
+        self.assertIsNone(context_processors.get_guest(request))
+
+
+class CachingTests(TestCase):
+    """Кеш справочников и счетчики, зависящие от броней"""
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(HOTEL_CACHE_TIMEOUT=0)
+    def test_zero_timeout_is_not_cached(self):
+        calls = []
+        for _ in range(2):
+            caching.get_or_set('services', 'probe', lambda: calls.append(1) or len(calls))
+        self.assertEqual(len(calls), 2)
+
+    def test_booking_resets_free_room_count(self):
+        rng = random.Random(23)
+        rooms = datagen.create_rooms(3, rng=rng)
+        datagen.create_guests(1, prefix='caching', rng=rng)
+        arrival = timezone.now().date() + timedelta(days=400)
+        free = AvailabilityService(arrival, arrival + timedelta(days=2)).free_rooms()
+        before = pagination.cached_count(free, namespaces=('rooms', 'occupancy'))
+
+        booking.book_room(Guest.objects.get(), rooms[0].pk, arrival, arrival + timedelta(days=2))
+
+        self.assertEqual(pagination.cached_count(free, namespaces=('rooms', 'occupancy')), before - 1)
+
+
+class AmenityMapTests(TestCase):
+    """Карта оснащения в памяти процесса: перечитывается по версии и по сроку"""
+
+    def setUp(self):
+        cache.clear()
+        amenities._loaded = (None, 0.0, None)
+        self.category = Category.objects.create(name='Стандарт', price=Decimal('3000.00'), description='')
+        self.item = Item.objects.create(name='Холодильник')
+
+    def tearDown(self):
+        amenities._loaded = (None, 0.0, None)
+
+    def _equip_in_other_process(self):
+        # update() не отправляет сигналов - как изменение, сделанное другим воркером
+        Category.objects.filter(pk=self.category.pk).update(amenities=[self.item.pk])
+
+    def _has_item(self):
+        return self.category.pk in amenities.get_map().categories_with([self.item.pk])
+
+    @override_settings(AMENITY_MAP_TIMEOUT=300)
+    def test_map_kept_until_timeout(self):
+        self.assertFalse(self._has_item())
+        self._equip_in_other_process()
+        self.assertFalse(self._has_item())
+
+    @override_settings(AMENITY_MAP_TIMEOUT=300)
+    def test_map_reloaded_on_shared_version(self):
+        self.assertFalse(self._has_item())
+        self._equip_in_other_process()
+        caching.bump(amenities.NAMESPACE)
+        self.assertTrue(self._has_item())
+
+    @override_settings(AMENITY_MAP_TIMEOUT=0)
+    def test_map_reloaded_after_timeout(self):
+        self.assertFalse(self._has_item())
+        self._equip_in_other_process()
+        self.assertTrue(self._has_item())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationTests(TestCase):
+    """Нарушение уникальности при сохранении - ошибка нужного поля формы"""
+
+    def setUp(self):
+        self.existing = Registration(self._data())
+        self.assertIsNotNone(self.existing.register(), self.existing.error_messages())
+
+    @staticmethod
+    def _data(**values):
+        return {
+            'username': 'new_guest', 'email': 'guest@example.com',
+            'password1': 'Sunny-Harbor-2024', 'password2': 'Sunny-Harbor-2024',
+            'fullname': 'Новый Гость', 'phonenumber': '9161234567', 'dateofbirth': '1990-01-01',
+            'series': '4500', 'number': '123456', 'dateofissue': '2015-01-01', 'whoissued': 'ОВД',
+            **values,
+        }
+
+    def _register(self, **values):
+        registration = Registration(self._data(phonenumber='9167654321', number='654321', **values))
+        self.assertIsNone(registration.register())
+        return registration
+
+    def test_taken_username_ignores_case(self):
+        registration = self._register(username='NEW_GUEST', email='other@example.com')
+        self.assertEqual(list(registration.user_form.errors), ['username'])
+
+    def test_taken_email(self):
+        registration = self._register(username='other_guest')
+        self.assertEqual(list(registration.user_form.errors), ['email'])
+
+    def test_taken_username_and_email(self):
+        registration = self._register()
+        self.assertEqual(sorted(registration.user_form.errors), ['email', 'username'])
+
+    def test_taken_phone_rolls_back_user_and_document(self):
+        registration = Registration(self._data(username='other_guest', email='other@example.com', number='654321'))
+        self.assertIsNone(registration.register())
+        self.assertEqual(list(registration.guest_form.errors), ['phonenumber'])
+        self.assertFalse(CustomUser.objects.filter(username='other_guest').exists())
+        self.assertEqual(Guest.objects.count(), 1)
+
+    def test_taken_document(self):
+        registration = Registration(self._data(username='other_guest', email='other@example.com',
+                                               phonenumber='9167654321'))
+        self.assertIsNone(registration.register())
+        self.assertEqual(list(registration.document_form.errors), ['__all__'])
+
+
+class BookingTests(TestCase):
+    """Бронь не пересекается с активными бронями номера; ночи брони уникальны"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(29)
+        cls.room = datagen.create_rooms(1, rng=rng)[0]
+        Number.objects.filter(pk=cls.room.pk).update(is_available=True)
+        datagen.create_guests(1, prefix='booking', rng=rng)
+        cls.guest = Guest.objects.get()
+        cls.arrival = timezone.now().date() + timedelta(days=400)
+
+    def _book(self, offset, nights):
+        arrival = self.arrival + timedelta(days=offset)
+        return booking.book_room(self.guest, self.room.pk, arrival, arrival + timedelta(days=nights))
+
+    def test_overlapping_booking_rejected(self):
+        self._book(0, 3)
+        with self.assertRaises(booking.BookingError):
+            self._book(2, 2)
+        # Заезд в день выезда предыдущей брони - не пересечение
+        self._book(3, 1)
+        self.assertEqual(Reservation.objects.filter(numberid=self.room).count(), 2)
+        self.assertFalse(booking.overlapping_reservations().exists())
+
+    def test_closed_room_rejected(self):
+        Number.objects.filter(pk=self.room.pk).update(is_available=False)
+        with self.assertRaises(booking.BookingError):
+            self._book(0, 1)
+
+    def test_view_statuses(self):
+        self.client.force_login(CustomUser.objects.create(username='booking_manager', role='manager'))
+        data = {'guest': self.guest.pk, 'number': self.room.pk,
+                'arrivaldate': self.arrival.isoformat(), 'departuredate': (self.arrival + timedelta(days=2)).isoformat()}
+        url = reverse('create_booking')
+        self.assertEqual(self.client.post(url, data).status_code, 201)
+        self.assertEqual(self.client.post(url, data).status_code, 409)
+        for name in ('guest', 'number'):
+            with self.subTest(field=name):
+                response = self.client.post(url, {**data, name: 10 ** 30})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.json()['errors'])
+
+    def test_room_nights_follow_reservation(self):
+        reservation = self._book(0, 3)
+        reservation.departuredate = self.arrival + timedelta(days=2)
+        reservation.save()
+        self.assertEqual(RoomNight.objects.filter(reservationid=reservation).count(), 2)
+        reservation.status = 'cancelled'
+        reservation.save()
+        self.assertFalse(RoomNight.objects.filter(reservationid=reservation).exists())
+
+    def test_room_night_unique_per_reservation(self):
+        reservation = self._book(0, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoomNight.objects.create(numberid=self.room, reservationid=reservation, date=self.arrival)
+
+
+class StressBookingTests(TransactionTestCase):
+    """Команда stress_booking: брони без пересечений, данные удаляются"""
+    # Права из миграции 0010 нужны тестам, которые выполняются после этого
+    serialized_rollback = True
+
+    def test_single_thread_run(self):
+        output = io.StringIO()
+        call_command('stress_booking', bookings=20, threads=1, rooms=2, days=5, stdout=output, stderr=io.StringIO())
+        self.assertIn('Пересечений броней нет', output.getvalue())
+        self.assertFalse(Reservation.objects.exists())
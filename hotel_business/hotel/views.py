@@ -1,116 +1,41 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
-from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from .models import Service, CustomUser, Guest, Document, ServiceProvision
-from .forms import LoginForm, UserRegistrationForm, GuestRegistrationForm, DocumentForm
+from .forms import LoginForm, BookingForm
+from .registration import Registration
+from . import caching, profiling
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from asgiref.sync import sync_to_async
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Рендеринг шаблона для async-представлений (шаблоны и контекст-процессоры синхронные)
+arender = sync_to_async(render)
+
 
 def register_view(request):
     if request.method == 'POST':
-        user_form = UserRegistrationForm(request.POST)
-        guest_form = GuestRegistrationForm(request.POST)
-        document_form = DocumentForm(request.POST)
-
-        # Логируем сырые данные POST для отладки
-        logger.debug(f"POST data: {request.POST}")
-
-        # Логируем данные форм для отладки
-        logger.debug(f"User form valid: {user_form.is_valid()}")
-        logger.debug(f"Guest form valid: {guest_form.is_valid()}")
-        logger.debug(f"Document form valid: {document_form.is_valid()}")
-
-        if user_form.is_valid():
-            logger.debug("User form is valid")
-            logger.debug(f"User cleaned data: {user_form.cleaned_data}")
-        else:
-            logger.debug(f"User form errors: {user_form.errors}")
-
-        if guest_form.is_valid():
-            logger.debug("Guest form is valid")
-            logger.debug(f"Guest cleaned data: {guest_form.cleaned_data}")
-        else:
-            logger.debug(f"Guest form errors: {guest_form.errors}")
-            logger.debug(f"Guest form data: {guest_form.data}")
-
-        if document_form.is_valid():
-            logger.debug("Document form is valid")
-            logger.debug(f"Document cleaned data: {document_form.cleaned_data}")
-        else:
-            logger.debug(f"Document form errors: {document_form.errors}")
-
-
-        if user_form.is_valid() and document_form.is_valid():
-            try:
-                # Сохраняем документ
-                document = document_form.save()
-                logger.debug(f"Document saved: {document}")
-
-                # Сохраняем пользователя с ролью клиента
-                user = user_form.save(commit=False)
-                user.role = 'client'  # При регистрации назначаем роль клиента
-                user.save()
-                logger.debug(f"User saved: {user.username}")
-
-
-                guest_data = {
-                    'user': user,
-                    'documentid': document,
-                    'fullname': request.POST.get('fullname', ''),
-                    'phonenumber': request.POST.get('phonenumber', ''),
-                    'discount': 0.00,  # Начальная скидка 0%
-                }
-
-                # Берем дату рождения из пользовательской формы
-                if user_form.cleaned_data.get('date_of_birth'):
-                    guest_data['dateofbirth'] = user_form.cleaned_data['date_of_birth']
-                else:
-                    # Или из POST данных напрямую
-                    guest_data['dateofbirth'] = request.POST.get('date_of_birth')
-
-                # Создаем гостя
-                guest = Guest(**guest_data)
-                guest.save()
-                logger.debug(f"Guest saved: {guest.fullname}, dateofbirth: {guest.dateofbirth}")
-
-                # Автоматически авторизуем пользователя
-                login(request, user)
-                messages.success(request, f'Регистрация прошла успешно! Добро пожаловать, {user.username}!')
-                return redirect('client_dashboard')
-
-            except Exception as e:
-                logger.error(f"Error during registration: {str(e)}")
-                messages.error(request, f'Произошла ошибка при регистрации: {str(e)}')
-        else:
-            # Подробное сообщение об ошибках
-            error_messages = []
-            if not user_form.is_valid():
-                error_messages.append("Ошибки в данных пользователя:")
-                for field, errors in user_form.errors.items():
-                    error_messages.append(f"- {field}: {', '.join(errors)}")
-            if not guest_form.is_valid():
-                error_messages.append("Ошибки в данных гостя:")
-                for field, errors in guest_form.errors.items():
-                    error_messages.append(f"- {field}: {', '.join(errors)}")
-            if not document_form.is_valid():
-                error_messages.append("Ошибки в данных документа:")
-                for field, errors in document_form.errors.items():
-                    error_messages.append(f"- {field}: {', '.join(errors)}")
-
-            messages.error(request, '\n'.join(error_messages))
-
+        registration = Registration(request.POST)
+        user = registration.register()
+        if user is not None:
+            # Автоматически авторизуем пользователя
+            login(request, user)
+            messages.success(request, f'Регистрация прошла успешно! Добро пожаловать, {user.username}!')
+            return redirect('client_dashboard')
+        errors = registration.error_messages()
+        logger.debug('Ошибки регистрации: %s', errors)
+        messages.error(request, '\n'.join(errors))
     else:
-        user_form = UserRegistrationForm()
-        guest_form = GuestRegistrationForm()
-        document_form = DocumentForm()
+        registration = Registration()
 
     return render(request, 'auth/register.html', {
-        'user_form': user_form,
-        'guest_form': guest_form,
-        'document_form': document_form
+        'user_form': registration.user_form,
+        'guest_form': registration.guest_form,
+        'document_form': registration.document_form
     })
 
 
@@ -150,109 +75,130 @@ def logout_view(request):
     return redirect('services_list')
 
 
-def services_list(request):
-    """Список услуг - доступен всем, включая неавторизованных пользователей"""
-    services = Service.objects.all()
-    return render(request, 'services/list.html', {
-        'services': services,
-        'user': request.user
-    })
+def service_catalogue():
+    """Каталог услуг из кеша (сбрасывается сигналами при изменении Service)"""
+    return caching.get_or_set('services', 'catalogue', lambda: list(Service.objects.all()))
 
 
-# Декораторы для проверки прав доступа
-def admin_required(function=None):
-    actual_decorator = user_passes_test(
-        lambda u: u.is_authenticated and u.role == 'admin',
-        login_url='/login/'
-    )
-    if function:
-        return actual_decorator(function)
-    return actual_decorator
+def catalogue_context():
+    """Каталог для шаблонов с кешируемыми карточками услуг"""
+    return {
+        # Ленивый список: при попадании во фрагментный кеш каталог не загружается
+        'services': SimpleLazyObject(service_catalogue),
+        'services_version': caching.version('services'),
+        'cache_timeout': settings.HOTEL_CACHE_TIMEOUT,
+    }
 
 
-def manager_required(function=None):
-    actual_decorator = user_passes_test(
-        lambda u: u.is_authenticated and u.role in ['admin', 'manager'],
-        login_url='/login/'
-    )
-    if function:
-        return actual_decorator(function)
-    return actual_decorator
+async def acatalogue_context():
+    """catalogue_context для async-представлений"""
+    return {
+        'services': SimpleLazyObject(service_catalogue),
+        'services_version': await caching.aversion('services'),
+        'cache_timeout': settings.HOTEL_CACHE_TIMEOUT,
+    }
 
 
-def client_required(function=None):
-    actual_decorator = user_passes_test(
-        lambda u: u.is_authenticated and u.role in ['admin', 'manager', 'client'],
-        login_url='/login/'
-    )
-    if function:
-        return actual_decorator(function)
-    return actual_decorator
+async def services_list(request):
+    """Список услуг - доступен всем, включая неавторизованных пользователей"""
+    # Шаблон рендерится в потоке: ленивый каталог и request.user обращаются к базе синхронно
+    return await arender(request, 'services/list.html', {
+        **await acatalogue_context(),
+        'user': request.user
+    })
 
 
-@admin_required
 def admin_dashboard(request):
-    return render(request, 'dashboard/admin.html')
+    context = {'cache_stats': caching.stats(), 'profiling_enabled': settings.PROFILING_ENABLED}
+    if settings.PROFILING_ENABLED:
+        context.update(
+            profiling_summary=profiling.summary(),
+            profiling_recent=profiling.recent()[:20],
+            slow_queries=profiling.slow_queries()[:20],
+        )
+    return render(request, 'dashboard/admin.html', context)
 
 
 # views.py
 from django.shortcuts import render
 from django.db.models import Q
 from django.utils import timezone
-from .models import Guest, Service, Number, Category, Reservation
-
-
-def manager_dashboard(request):
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from decimal import Decimal
+from .models import Guest, Service, Number, Category, Reservation, DirtyDay
+from .availability import AvailabilityService
+from . import amenities, dashboard, export, pricing, reporting, roomsearch
+from .assignment import assign_services, parse_rows, rows_for_reservations
+from .booking import BookingError, book_room
+from .roomsearch import RoomQuery
+from .search import search_guests
+from .pagination import acached_count, apaginate, cached_count, paginate
+import json
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_POST
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def _get_date_param(request, name):
+    """Дата из GET-параметра в формате ГГГГ-ММ-ДД или None"""
+    try:
+        return parse_date(request.GET.get(name) or '')
+    except ValueError:
+        return None
+
+
+async def manager_dashboard(request):
     """Главная страница панели менеджера"""
-    context = {
-        'guests_count': Guest.objects.count(),
-        'services_count': Service.objects.filter(is_active=True).count(),
-        'rooms_count': Number.objects.count(),
-        'available_rooms_count': Number.objects.filter(is_available=True).count(),
-    }
-    return render(request, 'manager/manager_dashboard.html', context)
+    # Все показатели - одним запросом; занятость зависит и от броней,
+    # поэтому кроме версий у значения короткое время жизни
+    context = await dashboard.aget_stats()
+    return await arender(request, 'manager/manager_dashboard.html', context)
 
 
 def manager_guests(request):
     guests = Guest.objects.select_related('user', 'documentid').all()
 
     # Поиск
-    search_query = request.GET.get('q', '')
+    search_query = request.GET.get('q', '').strip()
     if search_query:
-        guests = guests.filter(
-            Q(fullname__icontains=search_query) |
-            Q(phonenumber__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(documentid__series__icontains=search_query) |
-            Q(documentid__number__icontains=search_query)
-        )
+        guests = search_guests(guests, search_query)
 
-    # Сортировка
+    # Сортировка: последним полем всегда id, чтобы ключ keyset-пагинации был уникальным
     sort = request.GET.get('sort', '')
     if sort == 'name_asc':
-        guests = guests.order_by('fullname')
+        ordering = ('fullname', 'id')
     elif sort == 'name_desc':
-        guests = guests.order_by('-fullname')
+        ordering = ('-fullname', '-id')
     elif sort == 'discount_desc':
-        guests = guests.order_by('-discount')
+        ordering = ('-discount', 'id')
     elif sort == 'date_asc':
-        guests = guests.order_by('dateofbirth')
+        ordering = ('dateofbirth', 'id')
+    elif search_query:
+        # При поиске без явной сортировки - по релевантности
+        ordering = ('-search_rank', 'id')
     else:
         # Сортировка по умолчанию (по ID)
-        guests = guests.order_by('id')
+        ordering = ('id',)
 
+    page = paginate(request, guests, ordering)
     context = {
-        'guests': guests,
+        'guests': page,
+        'guests_count': cached_count(guests),
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
         'sort': sort,
     }
     return render(request, 'manager/guests.html', context)
 
 
-def manager_services(request):
+async def manager_services(request):
     """Страница услуг"""
     services = Service.objects.filter(is_active=True)
-    all_services_count = Service.objects.count()
 
     # Поиск услуг
     query = request.GET.get('q', '')
@@ -262,38 +208,170 @@ def manager_services(request):
             Q(description__icontains=query)
         )
 
+    page, services_count, all_services_count = await asyncio.gather(
+        apaginate(request, services, ('id',)),
+        acached_count(services),
+        caching.aget_or_set('services', 'count_all', Service.objects.acount),
+    )
     context = {
-        'services': services,
+        'services': page,
+        'services_count': services_count,
         'all_services_count': all_services_count,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
     }
-    return render(request, 'manager/services.html', context)
+    return await arender(request, 'manager/services.html', context)
 
 
-def manager_rooms(request):
+async def manager_rooms(request):
     """Страница номеров с фильтрацией"""
-    rooms = Number.objects.all()
-    categories = Category.objects.all()
+    rooms = Number.objects.select_related('categoryid')
 
     # Фильтрация номеров
     bed_count = request.GET.get('bed_count')
     category_id = request.GET.get('category')
+    free_only = request.GET.get('free_only')
+    selected_amenities = amenities.parse_ids(request.GET.getlist('amenity'))
+    amenity_map = await amenities.aget_map()
 
     if bed_count:
         rooms = rooms.filter(bedcount=bed_count)
     if category_id:
         rooms = rooms.filter(categoryid_id=category_id)
-
-    # Уникальные значения количества кроватей для фильтра
+    # Оснащение - по индексу категорий в памяти, без соединения с Equipment
+    rooms = amenity_map.filter_rooms(rooms, selected_amenities)
+
+    # Занятость номеров на выбранный период (по умолчанию - на сегодняшнюю ночь)
+    arrival = _get_date_param(request, 'arrival') or timezone.now().date()
+    departure = _get_date_param(request, 'departure')
+    if not departure or departure <= arrival:
+        departure = arrival + timedelta(days=1)
+    availability = AvailabilityService(arrival, departure)
+    if free_only:
+        rooms = availability.free_rooms(rooms=rooms)
+    rooms = availability.annotate_rooms(rooms)
+
+    # Справочники фильтров меняются редко: из кеша до изменения номеров или категорий
     bed_counts = Number.objects.values_list('bedcount', flat=True).distinct().order_by('bedcount')
 
+    page, rooms_count, categories, bed_counts = await asyncio.gather(
+        apaginate(request, rooms, ('id',)),
+        # Свободность номеров зависит от броней - счетчик сбрасывают и они
+        acached_count(rooms, namespaces=('rooms', 'occupancy')),
+        caching.aget_or_set('categories', 'list', lambda: _alist(Category.objects.all())),
+        caching.aget_or_set('rooms', 'bed_counts', lambda: _alist(bed_counts)),
+    )
+    amenity_map.annotate(page)
     context = {
-        'rooms': rooms,
+        'rooms': page,
+        'rooms_count': rooms_count,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
         'categories': categories,
         'bed_counts': bed_counts,
         'selected_bed_count': bed_count,
         'selected_category': category_id,
+        'amenity_items': amenity_map.items.items(),
+        'selected_amenities': selected_amenities,
+        'arrival': arrival,
+        'departure': departure,
+        'free_only': free_only,
     }
-    return render(request, 'manager/rooms.html', context)
+    return await arender(request, 'manager/rooms.html', context)
+
+
+async def room_search(request):
+    """Публичный поиск свободных номеров по датам, числу гостей, категории и оснащению"""
+    arrival = _get_date_param(request, 'arrival') or timezone.now().date()
+    departure = _get_date_param(request, 'departure')
+    if not departure or departure <= arrival:
+        departure = arrival + timedelta(days=1)
+    guests = request.GET.get('guests', '')
+    category_id = request.GET.get('category', '')
+    selected_amenities = amenities.parse_ids(request.GET.getlist('amenity'))
+    amenity_map = await amenities.aget_map()
+
+    try:
+        query = RoomQuery(
+            arrival, departure,
+            guests=roomsearch.bounded_int(guests) if guests.isdigit() else None,
+            category=roomsearch.bounded_int(category_id) if category_id.isdigit() else None,
+            amenity_ids=selected_amenities,
+        )
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    page, categories = await asyncio.gather(
+        apaginate(request, query.rooms(amenity_map).select_related('categoryid'), ('id',)),
+        _alist(Category.objects.order_by('name')),
+    )
+    amenity_map.annotate(page)
+    await _set_stay_prices(page, arrival, departure)
+
+    return await arender(request, 'rooms/search.html', {
+        'rooms': page,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'categories': categories,
+        'amenity_items': amenity_map.items.items(),
+        'selected_amenities': selected_amenities,
+        'selected_category': category_id,
+        'guests': guests,
+        'arrival': arrival,
+        'departure': departure,
+        'nights': (departure - arrival).days,
+        'user': request.user,
+    })
+
+
+async def _set_stay_prices(rooms, arrival, departure):
+    """Стоимость проживания на выбранные даты - по категориям номеров страницы"""
+    category_ids = {room.categoryid_id for room in rooms}
+    prices = await sync_to_async(pricing.stay_prices)(
+        [(category, category, arrival, departure) for category in category_ids]
+    )
+    for room in rooms:
+        room.stay_price = prices[room.categoryid_id]
+
+
+async def room_search_api(request):
+    """
+    Поиск номеров (JSON) с фасетами: arrival, departure, guests, bedcount,
+    roomcount, floor, category, price_min, price_max, amenity (несколько).
+    Фасеты - одним сгруппированным запросом, из кеша по сигнатуре фильтра.
+    """
+    try:
+        query = RoomQuery.from_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'errors': {'__all__': [str(e)]}}, status=400)
+    amenity_map = await amenities.aget_map()
+
+    page, facets = await asyncio.gather(
+        apaginate(request, query.rooms(amenity_map).select_related('categoryid'), ('id',)),
+        roomsearch.acached_facets(query, amenity_map),
+    )
+    await _set_stay_prices(page, query.arrival, query.departure)
+
+    return JsonResponse({
+        'arrival': query.arrival.isoformat(),
+        'departure': query.departure.isoformat(),
+        'nights': (query.departure - query.arrival).days,
+        'facets': facets,
+        'results': [
+            {
+                'id': room.id,
+                'floor': room.floor,
+                'roomcount': room.roomcount,
+                'bedcount': room.bedcount,
+                'category': {'id': room.categoryid_id, 'name': room.categoryid.name},
+                'price': str(pricing.money(room.categoryid.price)),
+                'stay_price': str(pricing.money(room.stay_price)),
+                'amenities': amenity_map.names(room.categoryid_id),
+            }
+            for room in page
+        ],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
 
 
 def manager_assignment(request):
@@ -345,10 +423,160 @@ def manager_assignment(request):
     return render(request, 'manager/assignment.html', context)
 
 
-@client_required
-def client_dashboard(request):
-    services = Service.objects.all()
-    users = CustomUser.objects.all()
-    guests = Guest.objects.all()
+@require_POST
+def bulk_assign_services(request):
+    """
+    Массовое назначение услуг. Форма: выбранные брони (reservations) с одной
+    услугой или строки «бронь;услуга;количество;дата» в поле rows.
+    JSON-запрос {"rows": [...]} получает ответ {"created": n, "errors": [...]}.
+    """
+    if request.content_type == 'application/json':
+        try:
+            rows = json.loads(request.body)['rows']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'errors': 'Ожидается JSON вида {"rows": [...]}'}, status=400)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return JsonResponse({'errors': 'rows должен быть списком объектов'}, status=400)
+        created, errors = assign_services(rows)
+        return JsonResponse({'created': len(created), 'errors': [error.as_dict() for error in errors]},
+                            status=201 if created else 400)
+
+    rows = rows_for_reservations(
+        request.POST.getlist('reservations'),
+        request.POST.get('service'),
+        request.POST.get('quantity', 1),
+        request.POST.get('date_of_service'),
+    ) if request.POST.getlist('reservations') else []
+    rows += parse_rows(request.POST.get('rows', ''))
+
+    if not rows:
+        messages.error(request, 'Не выбрано ни одного бронирования')
+        return redirect('manager_assignment')
+
+    created, errors = assign_services(rows)
+    if created:
+        messages.success(request, f'Назначено услуг: {len(created)}')
+    for error in errors:
+        messages.error(request, str(error))
+    return redirect('manager_assignment')
+
+
+def export_data(request, dataset):
+    """
+    Потоковая выгрузка набора данных: ?format=csv|json|jsonl, период
+    ?from=ГГГГ-ММ-ДД&to=ГГГГ-ММ-ДД, ?gzip=1 - сжатие.
+    """
+    if dataset not in export.DATASETS:
+        raise Http404('Неизвестный набор данных')
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    compress = request.GET.get('gzip') == '1'
+
+    # Под ASGI синхронный итератор был бы прочитан в память целиком
+    stream = export.astream if isinstance(request, ASGIRequest) else export.stream
+    response = StreamingHttpResponse(
+        stream(dataset, fmt, _get_date_param(request, 'from'), _get_date_param(request, 'to'), compress),
+        content_type='application/gzip' if compress else export.CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(dataset, fmt, compress)}"'
+    return response
 
-    return render(request, 'client/client_dashboard.html', {'services': services, 'users': users, 'guests': guests})
+
+def manager_reports(request):
+    """Отчеты по загрузке и выручке за период (только по суточным сводкам)"""
+    today = timezone.now().date()
+    date_from = _get_date_param(request, 'from') or today.replace(day=1)
+    date_to = _get_date_param(request, 'to') or today
+    if date_to < date_from:
+        date_from, date_to = date_to, date_from
+
+    categories = reporting.category_report(date_from, date_to)
+    services = reporting.service_report(date_from, date_to)
+    context = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'categories': categories,
+        'services': services,
+        'room_revenue': sum((row['revenue'] for row in categories), Decimal('0')),
+        'service_revenue': sum((row['revenue'] for row in services), Decimal('0')),
+        'pending_days': DirtyDay.objects.count(),
+    }
+    return render(request, 'manager/reports.html', context)
+
+
+def manager_folios(request):
+    """
+    Счета броней (все суммы считаются в базе одним запросом): по умолчанию -
+    активные брони, ?guest=id - брони гостя, ?format=json - ответ в JSON.
+    """
+    guest = None
+    guest_id = request.GET.get('guest', '')
+    if guest_id:
+        guest = Guest.objects.filter(pk=guest_id).first() if guest_id.isdigit() else None
+        if guest is None:
+            raise Http404('Гость не найден')
+    reservations = pricing.guest_folios(guest) if guest else pricing.with_folio()
+    folios = list(reservations.order_by('numberid_id', 'arrivaldate', 'pk'))
+    for reservation in folios:
+        for name in ('room_charge', 'services_total', 'total', 'balance'):
+            setattr(reservation, name, pricing.money(getattr(reservation, name)))
+
+    totals = {
+        name: sum((getattr(reservation, name) for reservation in folios), Decimal('0.00'))
+        for name in ('room_charge', 'services_total', 'total', 'actuallypaid', 'balance')
+    }
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'folios': [
+                {
+                    'reservation': reservation.pk,
+                    'guest': reservation.clientid_id,
+                    'room': reservation.numberid_id,
+                    'arrivaldate': reservation.arrivaldate.isoformat(),
+                    'departuredate': reservation.departuredate.isoformat(),
+                    'room_charge': str(reservation.room_charge),
+                    'services_total': str(reservation.services_total),
+                    'actuallypaid': str(reservation.actuallypaid),
+                    'balance': str(reservation.balance),
+                }
+                for reservation in folios
+            ],
+            'totals': {name: str(value) for name, value in totals.items()},
+        })
+
+    return render(request, 'manager/folios.html', {'folio_guest': guest, 'folios': folios, 'totals': totals})
+
+
+@require_POST
+def create_booking(request):
+    """Создание брони (JSON): 201 - создана, 409 - номер занят, 400 - ошибка в данных"""
+    form = BookingForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    data = form.cleaned_data
+    try:
+        reservation = book_room(
+            guest=data['guest'],
+            number_id=data['number'],
+            arrival=data['arrivaldate'],
+            departure=data['departuredate'],
+            actuallypaid=data['actuallypaid'] or 0,
+        )
+    except BookingError as e:
+        return JsonResponse({'errors': {'__all__': [str(e)]}}, status=409)
+
+    return JsonResponse({
+        'id': reservation.id,
+        'number': reservation.numberid_id,
+        'arrivaldate': reservation.arrivaldate,
+        'departuredate': reservation.departuredate,
+        'price': reservation.price,
+    }, status=201)
+
+
+def client_dashboard(request):
+    # Профиль текущего гостя приходит из context_processors.guest_profile
+    return render(request, 'client/client_dashboard.html', catalogue_context())
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -29,23 +30,37 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hotel.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Доступ к страницам по ролям из таблицы RolePermission (hotel/permissions.py)
+    'hotel.permissions.PermissionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'hotel_business.urls'
 
+# Загрузчики шаблонов. Кешированный загрузчик компилирует шаблон один раз на
+# процесс (в режиме разработки автоперезагрузка сбрасывает его при правке
+# файла); HOTEL_TEMPLATE_CACHE=0 - читать и компилировать шаблоны на каждый запрос
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+if os.environ.get('HOTEL_TEMPLATE_CACHE', '1') != '0':
+    template_loaders = [('django.template.loaders.cached.Loader', template_loaders)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': template_loaders,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -75,6 +90,91 @@ DATABASES = {
 }
 
 
+# Cache
+# По умолчанию кеш в памяти процесса; при заданном REDIS_URL - общий Redis
+# (нужен для общих счетчиков и версий ключей между несколькими процессами)
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'hotel',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hotel',
+        }
+    }
+
+# Время жизни справочных данных и фрагментов шаблонов в кеше, секунды.
+# Справочники сбрасываются версиями в кеше (hotel.caching); с кешем в памяти
+# процесса новую версию видит только один воркер, поэтому между запросами
+# справочники кешируются только с общим кешем
+HOTEL_CACHE_TIMEOUT = 300 if os.environ.get('REDIS_URL') else 0
+
+# Как долго процесс держит карту прав доступа (hotel.permissions), секунды.
+# Изменение прав сбрасывает версию в кеше; с кешем в памяти процесса ее
+# видит только один воркер, остальные отдавали бы старые права до истечения
+# срока - поэтому без общего кеша карта перечитывается каждые 5 секунд
+PERMISSION_MAP_TIMEOUT = HOTEL_CACHE_TIMEOUT if os.environ.get('REDIS_URL') else 5
+
+# То же для карты оснащения номеров (hotel.amenities), секунды
+AMENITY_MAP_TIMEOUT = HOTEL_CACHE_TIMEOUT if os.environ.get('REDIS_URL') else 5
+
+# Время жизни статистики панели менеджера, секунды
+DASHBOARD_STATS_TIMEOUT = 30
+
+# Время жизни фасетов поиска номеров (свободность зависит от броней), секунды
+ROOM_FACETS_TIMEOUT = 30
+
+# Наибольшая длина периода в поиске номеров, ночей (цена проживания считается по ночам)
+ROOM_SEARCH_MAX_NIGHTS = 90
+
+
+# Профилирование запросов (hotel.profiling): по умолчанию выключено,
+# включается переменной окружения HOTEL_PROFILING=1
+
+PROFILING_ENABLED = os.environ.get('HOTEL_PROFILING') == '1'
+
+# Доля профилируемых запросов (0..1)
+PROFILING_SAMPLE_RATE = float(os.environ.get('HOTEL_PROFILING_SAMPLE_RATE', '0.1'))
+
+# SQL дольше этого логируется со стеком вызова, миллисекунды
+PROFILING_SLOW_QUERY_MS = 200
+
+# Размер буфера последних профилей и медленных запросов на процесс
+PROFILING_BUFFER_SIZE = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hotel.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Хеширование паролей: число итераций PBKDF2 задается HOTEL_PASSWORD_ITERATIONS
+# (только для нагрузочных окружений; по умолчанию - значение Django)
+
+PASSWORD_HASHERS = [
+    'hotel.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('HOTEL_PASSWORD_ITERATIONS', '0')) or None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -117,11 +217,27 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'hotel.CustomUser'
 
+# Время кеширования профиля гостя между запросами, секунды (0 - только в пределах запроса).
+# Как и пользователь (USER_CACHE_TIMEOUT), профиль со скидкой сбрасывается сигналом
+# только в кеше своего процесса - между запросами он кешируется только с общим кешем
+GUEST_PROFILE_CACHE_TIMEOUT = 300 if os.environ.get('REDIS_URL') else 0
+
+# Время кеширования пользователя для AuthenticationMiddleware, секунды (0 - без кеша).
+# Сигналы сбрасывают пользователя только в кеше своего процесса, поэтому с кешем
+# в памяти (без REDIS_URL) другие воркеры видели бы старую роль и пароль -
+# кеш пользователя включается только с общим кешем
+USER_CACHE_TIMEOUT = 300 if os.environ.get('REDIS_URL') else 0
+
+# Хранилище сессий: cached_db (по умолчанию), db, cache или signed_cookies.
+# cached_db читает сессию из кеша и пишет в базу; signed_cookies вообще не
+# обращается к серверу, но сессия ограничена размером cookie
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('HOTEL_SESSION_BACKEND', 'cached_db')
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
 # Настройки аутентификации
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'hotel.backends.CachedModelBackend',
 ]
\ No newline at end of file
@@ -19,6 +19,8 @@ from hotel import views
 
 urlpatterns = [
     path('', views.services_list, name='services_list'),
+    path('rooms/search/', views.room_search, name='room_search'),
+    path('api/rooms/search/', views.room_search_api, name='room_search_api'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register_view, name='register'),
@@ -28,5 +30,10 @@ urlpatterns = [
     path('manager/services/', views.manager_services, name='manager_services'),
     path('manager/rooms/', views.manager_rooms, name='manager_rooms'),
     path('manager/assignment/', views.manager_assignment, name='manager_assignment'),
+    path('manager/bookings/', views.create_booking, name='create_booking'),
+    path('manager/assignment/bulk/', views.bulk_assign_services, name='bulk_assign_services'),
+    path('manager/export/<str:dataset>/', views.export_data, name='export_data'),
+    path('manager/reports/', views.manager_reports, name='manager_reports'),
+    path('manager/folios/', views.manager_folios, name='manager_folios'),
     path('client/dashboard/', views.client_dashboard, name='client_dashboard')
 ]
\ No newline at end of file